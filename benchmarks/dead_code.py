@@ -0,0 +1,58 @@
+"""Benchmark how many AST nodes dead code elimination keeps from reaching the
+passes after it
+
+Generated functions bind a variable in every statement but only read some of
+them, so most of what is removed is unused `let` bindings. Functions are
+removed if the entry point can't reach them.
+
+    python -m benchmarks.dead_code --declarations 1000 --entry-point f0
+"""
+import argparse
+import time
+
+from llvm_lang.ast.iter import walk
+from llvm_lang.compiler import Compiler, passes
+from llvm_lang.passes.eliminate_dead_code import (eliminate_dead_code,
+                                                  eliminate_dead_functions)
+
+from .generator import Shape, generate_program
+
+check = Compiler(passes=passes[:passes.index(eliminate_dead_code)])
+
+
+def nodes(ctx) -> int:
+    return sum(1 for _ in walk(ctx.ast_root))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--declarations', type=int, default=1000)
+    parser.add_argument('--body-lengths',
+                        nargs='*',
+                        type=int,
+                        default=[4, 8, 16, 32])
+    parser.add_argument('--entry-point', default='f0')
+    args = parser.parse_args()
+
+    print(f'{"body":>5} {"checked":>9} {"live code":>10} {"time":>11}'
+          f' {"live functions":>15} {"time":>11}')
+    for body_length in args.body_lengths:
+        ctx = check.compile(
+            generate_program(
+                Shape(declarations=args.declarations,
+                      body_length=body_length)))
+        checked = nodes(ctx)
+        start = time.perf_counter()
+        ctx = eliminate_dead_code(ctx)
+        code_time = time.perf_counter() - start
+        live_code = nodes(ctx)
+        start = time.perf_counter()
+        ctx = eliminate_dead_functions([args.entry_point])(ctx)
+        functions_time = time.perf_counter() - start
+        print(f'{body_length:>5} {checked:>9} {live_code:>10}'
+              f' {code_time * 1000:>8.2f} ms {nodes(ctx):>15}'
+              f' {functions_time * 1000:>8.2f} ms')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,79 @@
+"""Benchmark checking programs with many type errors, stopping at the first
+error and collecting every one of them, and the cost of rendering the
+collected errors' messages
+
+Errors are added by declaring a fraction of the variables as int32 rather
+than int64.
+
+    python -m benchmarks.diagnostics --declarations 1000 --errors 0 0.1 0.5
+"""
+import argparse
+import random
+import re
+import statistics
+import time
+
+from llvm_lang import errors
+from llvm_lang.compiler import Compiler, collecting_compiler, passes
+from llvm_lang.passes.annotate_expressions import annotate_expressions
+
+from .generator import Shape, generate_program
+
+front_end = Compiler(passes=passes[:passes.index(annotate_expressions)])
+checker = Compiler(passes=passes[passes.index(annotate_expressions):])
+
+
+def with_errors(source: str, fraction: float, seed: int = 0) -> str:
+    rng = random.Random(seed)
+    return re.sub(
+        r'(let v\d+: )int64', lambda m: m.group(1) +
+        ('int32' if rng.random() < fraction else 'int64'), source)
+
+
+def first_error(ctx):
+    try:
+        checker.compile(ctx)
+    except errors.BaseException:
+        pass
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--declarations', type=int, default=1000)
+    parser.add_argument('--errors',
+                        nargs='*',
+                        type=float,
+                        default=[0.0, 0.01, 0.1, 0.5])
+    parser.add_argument('--runs', type=int, default=5)
+    args = parser.parse_args()
+
+    source = generate_program(Shape(declarations=args.declarations))
+    print(f'{"errors":>8} {"found":>8} {"first error":>14}'
+          f' {"collect all":>14} {"render all":>14}')
+    for fraction in args.errors:
+        ctx = front_end.compile(with_errors(source, fraction))
+
+        first, collect, render = [], [], []
+        for _ in range(args.runs):
+            start = time.perf_counter()
+            first_error(ctx)
+            first.append(time.perf_counter() - start)
+
+            diagnostics = []
+            start = time.perf_counter()
+            collecting_compiler(checker, diagnostics).compile(ctx)
+            collect.append(time.perf_counter() - start)
+
+            start = time.perf_counter()
+            for error in diagnostics:
+                str(error)
+            render.append(time.perf_counter() - start)
+
+        print(f'{fraction:>8.0%} {len(diagnostics):>8}'
+              f' {statistics.median(first) * 1000:>11.2f} ms'
+              f' {statistics.median(collect) * 1000:>11.2f} ms'
+              f' {statistics.median(render) * 1000:>11.2f} ms')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,69 @@
+"""Benchmark typing expressions into a side table
+
+Counts the AST nodes left by the type checking passes, and times those
+passes, on large programs from `benchmarks.resolve_names`.
+
+    python -m benchmarks.expression_types
+"""
+import argparse
+import timeit
+import tracemalloc
+
+from llvm_lang import ast
+from llvm_lang.ast.iter import iter_node
+from llvm_lang.compiler import Compiler, passes
+from llvm_lang.parser import parse
+from llvm_lang.passes.annotate_expressions import annotate_expressions
+
+from .resolve_names import generate_program
+
+
+def count_nodes(node):
+    counts = {'nodes': 0, 'expressions': 0, 'typed expressions': 0}
+    stack = [node]
+    while stack:
+        node = stack.pop()
+        counts['nodes'] += 1
+        if isinstance(node, ast.Expression):
+            counts['expressions'] += 1
+        if isinstance(node, ast.TypedExpression):
+            counts['typed expressions'] += 1
+        stack.extend(iter_node(node))
+    return counts
+
+
+def best_of(fn, repeat):
+    return min(timeit.repeat(fn, number=1, repeat=repeat))
+
+
+def run(n_functions: int, repeat: int):
+    program = parse(generate_program(n_functions))
+    split = passes.index(annotate_expressions)
+    before = Compiler(passes=passes[1:split]).compile(program)
+    typing = Compiler(passes=passes[split:])
+
+    tracemalloc.start()
+    result = typing.compile(before)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    print(f'{n_functions} functions')
+    for label, count in count_nodes(result.ast_root).items():
+        print(f'  {label:<30} {count:10}')
+    print(f'  {"peak memory":<30} {peak / 2**20:10.2f} MB')
+    print(f'  {"typing passes":<30} '
+          f'{best_of(lambda: typing.compile(before), repeat) * 1000:10.2f} ms')
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('sizes', nargs='*', type=int, default=[500, 2000])
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    for size in args.sizes:
+        run(size, args.repeat)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,59 @@
+"""Benchmark constant folding on programs with more and more literal operands
+
+There's no code generation yet, so the size of the generated code is
+measured as the number of arithmetic operations left in the program, each of
+which would become an instruction.
+
+    python -m benchmarks.fold_constants --literals 0.15 0.5 0.9 1.0
+"""
+import argparse
+import time
+
+from llvm_lang import ast
+from llvm_lang.ast.iter import walk
+from llvm_lang.compiler import Compiler, passes
+from llvm_lang.passes.fold_constants import fold_constants
+
+from .generator import Shape, generate_program
+
+check = Compiler(passes=passes[:passes.index(fold_constants)])
+
+
+def operations(program: ast.Program) -> int:
+    return sum(1 for node in walk(program)
+               if isinstance(node, ast.UnaryOperation) or (
+                   isinstance(node, ast.BinaryOperation) and node.op not in
+                   (ast.Op.field, ast.Op.index)))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--declarations', type=int, default=500)
+    parser.add_argument('--expression-depth', type=int, default=4)
+    parser.add_argument('--literals',
+                        nargs='*',
+                        type=float,
+                        default=[0.15, 0.5, 0.9, 1.0])
+    args = parser.parse_args()
+
+    print(f'{"literals":>8} {"operations":>11} {"folded":>11}'
+          f' {"nodes":>9} {"folded":>9} {"fold time":>12}')
+    for literals in args.literals:
+        ctx = check.compile(
+            generate_program(
+                Shape(declarations=args.declarations,
+                      expression_depth=args.expression_depth,
+                      literals=literals)))
+        before = operations(ctx.ast_root)
+        nodes = sum(1 for _ in walk(ctx.ast_root))
+        start = time.perf_counter()
+        folded = fold_constants(ctx)
+        elapsed = time.perf_counter() - start
+        print(
+            f'{literals:>8.0%} {before:>11} {operations(folded.ast_root):>11}'
+            f' {nodes:>9} {sum(1 for _ in walk(folded.ast_root)):>9}'
+            f' {elapsed * 1000:>9.2f} ms')
+
+
+if __name__ == '__main__':
+    main()
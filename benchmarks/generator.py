@@ -0,0 +1,144 @@
+"""Seeded generator of valid programs for benchmarking the compiler
+
+Every knob of `Shape` scales one aspect of the program independently:
+
+- `declarations`: number of functions (plus a struct for every fourth one)
+- `body_length`: statements in each function body
+- `expression_depth`: nesting depth of the expression in each statement
+- `generics`: fraction of functions that take an instance of a generic struct
+- `struct_width`: number of fields in each struct
+- `literals`: fraction of the operands in expressions that are literals
+
+    python -m benchmarks.generator --declarations 10 > program.ll
+"""
+import argparse
+import random
+from dataclasses import dataclass, fields
+from typing import Dict, List
+
+FIELD_TYPES = ('float64', 'bool', 'uint8', 'uint8[]', '(int32, float32)')
+
+
+@dataclass(frozen=True)
+class Shape:
+    declarations: int = 100
+    body_length: int = 8
+    expression_depth: int = 3
+    generics: float = 0.25
+    struct_width: int = 4
+    literals: float = 0.15
+    seed: int = 0
+
+    @property
+    def structs(self) -> int:
+        return max(1, self.declarations // 4)
+
+
+def struct(name: str, fields: List[str], generic: bool) -> str:
+    params = '<T>' if generic else ''
+    body = '\n'.join(f'    f{i}: {ty}' for i, ty in enumerate(fields))
+    return f'struct {name}{params} {{\n{body}\n}}'
+
+
+class Generator:
+    def __init__(self, shape: Shape):
+        self.shape = shape
+        self.rng = random.Random(shape.seed)
+
+    def structs(self) -> List[str]:
+        declarations = []
+        for i in range(self.shape.structs):
+            # the first field is the one expressions read
+            fields = ['int64'] + [
+                self.rng.choice(FIELD_TYPES)
+                for _ in range(self.shape.struct_width - 1)
+            ]
+            declarations.append(struct(f'S{i}', fields, generic=False))
+            declarations.append(
+                struct(f'G{i}', ['T'] + fields[1:], generic=True))
+        return declarations
+
+    def expression(self, depth: int, names: List[str], callees: List[str]):
+        rng = self.rng
+        if depth <= 0:
+            kind = rng.random()
+            if kind < self.shape.literals:
+                return str(rng.randrange(100))
+            return rng.choice(names)
+
+        if callees and rng.random() < 0.2:
+            args = ', '.join(
+                self.expression(depth - 1, names, callees) for _ in range(2))
+            return f'{rng.choice(callees)}(s, {args})'
+
+        lhs = self.expression(depth - 1, names, callees)
+        rhs = self.expression(rng.randrange(depth), names, callees)
+        return f'{lhs} {rng.choice("+-*")} {rhs}'
+
+    def function(self, i: int) -> str:
+        shape = self.shape
+        struct_index = i % shape.structs
+        generic = self.generic[i]
+
+        params = [f's: S{struct_index}', 'a: int64', 'b: int64']
+        names = ['a', 'b', 's.f0']
+        if generic:
+            params.append(f'g: G{struct_index}<int64>')
+            names.append('g.f0')
+
+        # only functions taking the same struct can be called with `s`, and
+        # only the ones that don't take a generic struct
+        callees = [
+            f'f{j}'
+            for j in range(struct_index, shape.declarations, shape.structs)
+            if not self.generic[j]
+        ]
+
+        body = []
+        for j in range(shape.body_length):
+            value = self.expression(shape.expression_depth, names, callees)
+            body.append(f'    let v{j}: int64 = {value};')
+            names.append(f'v{j}')
+        body.append(f'    return {names[-1]};')
+
+        return (f'function f{i}({", ".join(params)}): int64 {{\n' +
+                '\n'.join(body) + '\n}')
+
+    def declarations(self) -> List[str]:
+        # decide up front which functions are generic so calls can avoid them
+        self.generic = [
+            self.rng.random() < self.shape.generics
+            for _ in range(self.shape.declarations)
+        ]
+        declarations = self.structs()
+        declarations.extend(
+            self.function(i) for i in range(self.shape.declarations))
+        return declarations
+
+
+def generate_program(shape: Shape) -> str:
+    return '\n\n'.join(Generator(shape).declarations()) + '\n'
+
+
+def generate_project(shape: Shape, files: int) -> Dict[str, str]:
+    """Spread the declarations of a program over `files` files, so most
+    functions use types and call functions declared in other files"""
+    declarations = Generator(shape).declarations()
+    return {
+        f'file{i}.ll': '\n\n'.join(declarations[i::files]) + '\n'
+        for i in range(files)
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    for field in fields(Shape):
+        parser.add_argument(f'--{field.name.replace("_", "-")}',
+                            type=field.type,
+                            default=field.default)
+    args = parser.parse_args()
+    print(generate_program(Shape(**vars(args))), end='')
+
+
+if __name__ == '__main__':
+    main()
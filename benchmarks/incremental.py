@@ -0,0 +1,54 @@
+"""Benchmark rebuilding a large program after editing one function
+
+    python -m benchmarks.incremental --declarations 2000
+"""
+import argparse
+import tempfile
+import time
+
+from llvm_lang.compiler import compiler
+from llvm_lang.incremental import IncrementalCompiler
+
+from .generator import Generator, Shape
+
+
+def timed(fn, *args) -> float:
+    start = time.perf_counter()
+    fn(*args)
+    return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--declarations', type=int, default=2000)
+    args = parser.parse_args()
+
+    declarations = Generator(
+        Shape(declarations=args.declarations)).declarations()
+    source = '\n\n'.join(declarations) + '\n'
+    # edit the body of the function in the middle of the program
+    edited = declarations[:]
+    middle = len(declarations) - args.declarations // 2
+    edited[middle] = edited[middle].replace('    return ', '    return 1 + ')
+    edited_source = '\n\n'.join(edited) + '\n'
+
+    with tempfile.TemporaryDirectory() as directory:
+        incremental = IncrementalCompiler(directory)
+        rows = [
+            ('full compile', timed(compiler.compile, source)),
+            ('cold incremental build', timed(incremental.compile, source)),
+            ('no-op rebuild', timed(incremental.compile, source)),
+            ('rebuild after one edit', timed(incremental.compile,
+                                             edited_source)),
+            # a new compiler has to load the cache from disk
+            ('rebuild in new process',
+             timed(IncrementalCompiler(directory).compile, source)),
+        ]
+
+    print(f'{args.declarations} functions, {len(source)} bytes')
+    for name, seconds in rows:
+        print(f'  {name:<24} {seconds * 1000:10.2f} ms')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,59 @@
+"""Benchmark how many calls inlining removes from call-heavy programs, and
+what it costs
+
+Generated functions call each other at random, so many of them are part of
+recursive call chains, which are never inlined. Shorter bodies mean smaller
+functions, and more of them fit the size budget.
+
+    python -m benchmarks.inline_functions --declarations 1000 --max-size 40
+"""
+import argparse
+import time
+
+from llvm_lang import ast
+from llvm_lang.ast.iter import walk
+from llvm_lang.compiler import Compiler, passes
+from llvm_lang.passes.inline_functions import INLINE_SIZE, inline_functions
+
+from .generator import Shape, generate_program
+
+check = Compiler(passes=passes[:passes.index(inline_functions)])
+
+
+def count(ctx):
+    calls = nodes = 0
+    for node in walk(ctx.ast_root):
+        nodes += 1
+        calls += isinstance(node, ast.CallExpression)
+    return calls, nodes
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--declarations', type=int, default=1000)
+    parser.add_argument('--body-lengths',
+                        nargs='*',
+                        type=int,
+                        default=[1, 2, 4, 8])
+    parser.add_argument('--max-size', type=int, default=INLINE_SIZE)
+    args = parser.parse_args()
+
+    print(f'{"body":>5} {"calls":>7} {"left":>7} {"nodes":>8} {"after":>8}'
+          f' {"time":>11}')
+    for body_length in args.body_lengths:
+        ctx = check.compile(
+            generate_program(
+                Shape(declarations=args.declarations,
+                      body_length=body_length,
+                      expression_depth=2)))
+        calls, nodes = count(ctx)
+        start = time.perf_counter()
+        ctx = inline_functions(ctx, args.max_size)
+        elapsed = time.perf_counter() - start
+        calls_left, nodes_left = count(ctx)
+        print(f'{body_length:>5} {calls:>7} {calls_left:>7} {nodes:>8}'
+              f' {nodes_left:>8} {elapsed * 1000:>8.2f} ms')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,71 @@
+"""Benchmark loading programs into the JIT cold and from its cache, and
+calling a function in them
+
+Each program is a generated one plus a small `main`. A cold load parses the
+IR and compiles it to machine code; a cached load only hashes the IR.
+
+    python -m benchmarks.jit --declarations 10 100 1000
+"""
+import argparse
+import statistics
+import time
+
+from llvm_lang.compiler import compiler
+from llvm_lang.jit import JIT
+
+from .generator import Shape, generate_program
+
+MAIN = '''
+function main(a: int64, b: int64): int64 {
+    return a * b + 1;
+}
+'''
+
+
+def timed(fn, *args) -> float:
+    start = time.perf_counter()
+    fn(*args)
+    return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--declarations',
+                        nargs='*',
+                        type=int,
+                        default=[10, 100, 1000])
+    parser.add_argument('--runs', type=int, default=5)
+    parser.add_argument('--calls', type=int, default=10_000)
+    args = parser.parse_args()
+
+    print(f'{"functions":>10} {"cold load":>12} {"cached load":>12}'
+          f' {"first call":>12} {"call":>10}')
+    for declarations in args.declarations:
+        ctx = compiler.compile(
+            generate_program(Shape(declarations=declarations, body_length=2)) +
+            MAIN)
+
+        cold = []
+        for _ in range(args.runs):
+            cold.append(timed(JIT().load, ctx))
+
+        jit = JIT()
+        jit.load(ctx)
+        cached = [timed(jit.load, ctx) for _ in range(args.runs)]
+
+        program = jit.load(ctx)
+        first_call = timed(program.function('main'), 6, 7)
+        function = program.function('main')
+        start = time.perf_counter()
+        for _ in range(args.calls):
+            function(6, 7)
+        call = (time.perf_counter() - start) / args.calls
+
+        print(f'{declarations:>10}'
+              f' {statistics.median(cold) * 1000:>9.2f} ms'
+              f' {statistics.median(cached) * 1000:>9.2f} ms'
+              f' {first_call * 1e6:>9.1f} us {call * 1e6:>7.2f} us')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,187 @@
+"""Report memory saved by reordering struct fields
+
+Lays out a corpus of struct definitions modelled on well known C and Rust
+structures, once in declaration order and once with `reorder_fields`, and
+prints how many bytes each struct and an array of each struct saves.
+
+    python -m benchmarks.layout
+"""
+import argparse
+import timeit
+
+from llvm_lang import types
+from llvm_lang.parser import parse
+from llvm_lang.passes.resolve_declared_types import resolve_declared_types
+from llvm_lang.scopes import Scopes
+from llvm_lang.types.instantiate import instantiate
+from llvm_lang.types.layout import LayoutEngine
+
+CORPUS = '''
+newtype string = uint8[];
+
+enum TokenType {
+    IDENTIFIER
+    INTEGER
+    STRING
+    PUNCTUATION
+}
+
+struct Token {
+    type: TokenType
+    offset: uint32
+    length: uint16
+    line: int32
+    has_escapes: bool
+    value: float64
+    column: uint16
+}
+
+struct SourceLocation {
+    file: string
+    line: uint32
+    is_macro_expansion: bool
+    offset: uint64
+    column: uint16
+}
+
+struct FileStat {
+    device: uint64
+    mode: uint32
+    links: uint64
+    user: uint32
+    group: uint32
+    special_device: uint64
+    size: int64
+    block_size: int32
+    blocks: int64
+    access_time: (int64, int32)
+    modify_time: (int64, int32)
+    change_time: (int64, int32)
+}
+
+struct HttpRequest {
+    method: uint8
+    url: string
+    keep_alive: bool
+    content_length: int64
+    major_version: uint8
+    minor_version: uint8
+    headers: (string, string)[]
+    chunked: bool
+    status: uint16
+    body: string
+}
+
+struct TcpHeader {
+    source_port: uint16
+    destination_port: uint16
+    sequence: uint32
+    acknowledgement: uint32
+    data_offset: uint8
+    flags: uint8
+    window: uint16
+    checksum: uint16
+    urgent_pointer: uint16
+}
+
+struct ListNode {
+    is_sentinel: bool
+    value: int64
+    generation: uint32
+    next: symbol
+    marked: bool
+    previous: symbol
+}
+
+struct Color {
+    red: uint8
+    green: uint8
+    blue: uint8
+    alpha: uint8
+}
+
+struct Particle {
+    alive: bool
+    position: float32[3]
+    mass: float64
+    kind: uint8
+    velocity: float32[3]
+    id: uint64
+    charge: int8
+}
+
+struct GCHeader {
+    marked: bool
+    size: uint64
+    kind: uint8
+    next: symbol
+    pinned: bool
+    forwarding: symbol
+    age: uint16
+}
+
+struct CompileOptions {
+    optimize: bool
+    opt_level: uint8
+    debug_info: bool
+    output: string
+    target_cpu: string
+    jobs: uint32
+    verbose: bool
+    warnings_as_errors: bool
+    max_errors: uint32
+}
+'''
+
+
+def load_corpus():
+    ctx = resolve_declared_types(parse(CORPUS))
+    scopes = Scopes(ctx.declared_types.items())
+    return [
+        instantiate(ty, {}, scopes) for ty in ctx.declared_types.values()
+        if isinstance(ty, types.StructType)
+    ]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--array-length',
+                        type=int,
+                        default=1000,
+                        help='length of the arrays reported on')
+    args = parser.parse_args()
+
+    structs = load_corpus()
+    declared = LayoutEngine()
+    reordered = LayoutEngine(reorder_fields=True)
+
+    total_before = total_after = 0
+    print(f'{"struct":<16} {"declared":>9} {"reordered":>10} {"saved":>6}'
+          f' {"saved/" + str(args.array_length):>12}')
+    for ty in structs:
+        before = declared.size_of(ty)
+        after = reordered.size_of(ty)
+        total_before += before
+        total_after += after
+        print(f'{ty.name:<16} {before:>9} {after:>10} {before - after:>6}'
+              f' {(before - after) * args.array_length:>12}')
+
+    saved = total_before - total_after
+    print(f'{"total":<16} {total_before:>9} {total_after:>10} {saved:>6}'
+          f' {saved * args.array_length:>12}'
+          f'  ({saved / total_before:.1%} smaller)')
+
+    def layout_all(engine):
+        for ty in structs:
+            engine.layout(ty)
+
+    cold = min(
+        timeit.repeat(lambda: layout_all(LayoutEngine()), number=1, repeat=20))
+    warm = min(timeit.repeat(lambda: layout_all(declared), number=1,
+                             repeat=20))
+    print(f'\nlayout of the corpus: cold {cold * 1e6:.0f} us,'
+          f' cached {warm * 1e6:.0f} us')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,81 @@
+"""Report memory saved by storing union tags in niches
+
+Lays out arrays of typical `Option`/`Result`-style unions with and without
+niche filling, and prints the size of each array.
+
+    python -m benchmarks.niche_layout
+"""
+import argparse
+
+from llvm_lang import types
+from llvm_lang.types import primitive_types as p
+from llvm_lang.types.layout import LayoutEngine
+
+
+def option(typ):
+    return types.UnionType("Option",
+                           variants=(("Some", types.TupleType(
+                               (typ, ))), ("None", types.TupleType())),
+                           type_parameters=(types.TypeVariable("T"), ),
+                           type_arguments=(typ, ))
+
+
+def result(ok, err):
+    return types.UnionType("Result",
+                           variants=(("Ok", types.TupleType(
+                               (ok, ))), ("Err", types.TupleType((err, )))),
+                           type_parameters=(types.TypeVariable("T"),
+                                            types.TypeVariable("E")),
+                           type_arguments=(ok, err))
+
+
+ordering = types.EnumType("Ordering", ("Less", "Equal", "Greater"))
+token = types.StructType("Token",
+                         fields=(("kind", ordering), ("offset", p['uint32']),
+                                 ("length", p['uint16'])))
+entry = types.StructType("Entry",
+                         fields=(("key", p['int64']), ("value", p['float64']),
+                                 ("occupied", p['bool'])))
+
+UNIONS = (
+    option(p['bool']),
+    option(ordering),
+    option(option(p['bool'])),
+    option(token),
+    option(entry),
+    option(option(entry)),
+    result(entry, p['int32']),
+    result(token, ordering),
+    result(p['int64'], p['int32']),
+    option(result(p['int64'], p['int32'])),
+)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--length',
+                        type=int,
+                        default=100_000,
+                        help='number of elements in each array')
+    args = parser.parse_args()
+
+    tagged = LayoutEngine(niche_filling=False)
+    niche_filled = LayoutEngine()
+
+    total_before = total_after = 0
+    print(f'{"type":<38} {"tagged":>7} {"niche":>6} '
+          f'{"array bytes (tagged -> niche)":>32}')
+    for ty in UNIONS:
+        before = tagged.size_of(types.ArrayType(args.length, ty))
+        after = niche_filled.size_of(types.ArrayType(args.length, ty))
+        total_before += before
+        total_after += after
+        print(f'{str(ty):<38} {tagged.size_of(ty):>7} '
+              f'{niche_filled.size_of(ty):>6} {before:>15} -> {after:>13}')
+
+    print(f'\ntotal: {total_before} -> {total_after} bytes'
+          f' ({1 - total_after / total_before:.1%} smaller)')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,58 @@
+"""Benchmark loading a large program into the JIT with an empty and a warm
+object cache
+
+Each load is by a new JIT, like a new process would make, so only the object
+cache on disk is shared between loads.
+
+    python -m benchmarks.object_cache --declarations 1000 --level O2
+"""
+import argparse
+import os
+import statistics
+import tempfile
+import time
+
+from llvm_lang.compiler import Compiler, passes
+from llvm_lang.jit import JIT
+from llvm_lang.object_cache import ObjectCache
+from llvm_lang.passes.optimize_ir import LEVELS, OptimizationOptions
+
+from .generator import Shape, generate_program
+
+
+def timed(fn, *args) -> float:
+    start = time.perf_counter()
+    fn(*args)
+    return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--declarations', type=int, default=1000)
+    parser.add_argument('--level', choices=LEVELS, default='O2')
+    parser.add_argument('--runs', type=int, default=3)
+    args = parser.parse_args()
+
+    compiler = Compiler(passes=passes,
+                        optimization=OptimizationOptions(args.level))
+    ctx = compiler.compile(
+        generate_program(Shape(declarations=args.declarations)))
+
+    cold = []
+    warm = []
+    for _ in range(args.runs):
+        with tempfile.TemporaryDirectory() as cache_dir:
+            cold.append(timed(JIT(ObjectCache(cache_dir)).load, ctx))
+            warm.append(timed(JIT(ObjectCache(cache_dir)).load, ctx))
+            size = sum(entry.stat().st_size for entry in os.scandir(cache_dir))
+    uncached = [timed(JIT().load, ctx) for _ in range(args.runs)]
+
+    print(f'{args.declarations} functions at {args.level},'
+          f' {size / 1024:.0f} KiB of object files')
+    for name, times in [('no cache', uncached), ('cold', cold),
+                        ('warm', warm)]:
+        print(f'  {name:<10} {statistics.median(times) * 1000:10.2f} ms')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,74 @@
+"""Benchmark compile time against the speed of the generated code, for each
+optimization level
+
+The sample programs are trees of calls, since the language has no loops:
+each function calls the next one twice, so `main` makes 2 ** depth calls.
+In the linear tree every function is a linear function of its argument, and
+can collapse into one once inlined; in the division tree it can't. The
+generated program is only compiled, since its functions call each other at
+random and never return.
+
+    python -m benchmarks.optimize --depth 16 --levels O0 O2
+"""
+import argparse
+import time
+
+from llvm_lang.compiler import Compiler, passes
+from llvm_lang.jit import JIT
+from llvm_lang.passes.optimize_ir import LEVELS, OptimizationOptions
+
+from .generator import Shape, generate_program
+
+
+def call_tree(depth: int, step: str) -> str:
+    functions = [f'function t{depth}(x: int64): int64 {{ return x * 7 + 1; }}']
+    for i in reversed(range(depth)):
+        functions.append(f'function t{i}(x: int64): int64 {{\n'
+                         f'    return {step.format(f"t{i + 1}")};\n}}')
+    functions.append('function main(x: int64): int64 { return t0(x); }')
+    return '\n\n'.join(functions)
+
+
+def samples(depth: int, declarations: int):
+    yield 'linear tree', call_tree(depth, '{0}(x) * 3 + {0}(x + 1)')
+    yield 'division tree', call_tree(depth, '{0}(x) / 3 + {0}(x + 1)')
+    yield 'generated', (generate_program(Shape(declarations=declarations)) +
+                        '\nfunction main(x: int64): int64 { return x; }')
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--levels', nargs='*', default=list(LEVELS))
+    parser.add_argument('--depth', type=int, default=16)
+    parser.add_argument('--declarations', type=int, default=500)
+    parser.add_argument('--calls', type=int, default=20)
+    args = parser.parse_args()
+
+    print(f'{"program":<14} {"level":>5} {"passes":>12} {"optimize":>12}'
+          f' {"codegen":>12} {"main":>12}')
+    for name, source in samples(args.depth, args.declarations):
+        for level in args.levels:
+            compiler = Compiler(passes=passes,
+                                optimization=OptimizationOptions(level))
+            start = time.perf_counter()
+            ctx = compiler.compile(source)
+            total = time.perf_counter() - start
+
+            start = time.perf_counter()
+            main = JIT().load(ctx)['main']
+            codegen = time.perf_counter() - start
+
+            best = float('inf')
+            for _ in range(args.calls):
+                start = time.perf_counter()
+                main(1)
+                best = min(best, time.perf_counter() - start)
+
+            print(f'{name:<14} {level:>5}'
+                  f' {(total - ctx.optimization_time) * 1000:>9.2f} ms'
+                  f' {ctx.optimization_time * 1000:>9.2f} ms'
+                  f' {codegen * 1000:>9.2f} ms {best * 1e6:>9.1f} us')
+
+
+if __name__ == '__main__':
+    main()
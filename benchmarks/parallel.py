@@ -0,0 +1,69 @@
+"""Benchmark compiling a large program to machine code serially and in 1 to 8
+worker processes
+
+Times the back end only: generating IR, optimizing and compiling it, and
+loading the result into the JIT. With workers, the program is split into a
+module per worker (`llvm_lang.passes.compile_objects`).
+
+    python -m benchmarks.parallel --declarations 2000 --workers 1 2 4 8
+"""
+import argparse
+import os
+import time
+
+from llvm_lang.compiler import Compiler, passes
+from llvm_lang.jit import JIT
+from llvm_lang.passes.compile_objects import compile_objects
+from llvm_lang.passes.evaluate_globals import evaluate_globals
+from llvm_lang.passes.generate_ir import generate_ir
+from llvm_lang.passes.optimize_ir import (LEVELS, OptimizationOptions,
+                                          optimize_ir)
+
+from .generator import Shape, generate_program
+
+checker = Compiler(passes=passes[:passes.index(evaluate_globals) + 1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--declarations', type=int, default=2000)
+    parser.add_argument('--body-length', type=int, default=4)
+    parser.add_argument('--level', choices=LEVELS, default='O2')
+    parser.add_argument('--workers', nargs='*', type=int, default=[1, 2, 4, 8])
+    args = parser.parse_args()
+
+    options = OptimizationOptions(args.level)
+    ctx = checker.compile(
+        generate_program(
+            Shape(declarations=args.declarations,
+                  body_length=args.body_length)))
+
+    print(f'{args.declarations} functions at {args.level},'
+          f' {os.cpu_count()} CPUs')
+    print(f'{"workers":>8} {"generate":>12} {"compile":>12} {"load":>12}'
+          f' {"total":>12}')
+
+    def report(name, generate, compile_, result):
+        start = time.perf_counter()
+        JIT().load(result)
+        load = time.perf_counter() - start
+        print(
+            f'{name:>8} {generate * 1000:>9.0f} ms {compile_ * 1000:>9.0f} ms'
+            f' {load * 1000:>9.0f} ms'
+            f' {(generate + compile_ + load) * 1000:>9.0f} ms')
+
+    start = time.perf_counter()
+    generated = generate_ir(ctx)
+    generate = time.perf_counter() - start
+    optimized = optimize_ir(generated, options)
+    # loading the serial module into the JIT is when its machine code is
+    # generated
+    report('serial', generate, optimized.optimization_time, optimized)
+
+    for workers in args.workers:
+        result = compile_objects(ctx, workers, options)
+        report(str(workers), result.generate_time, result.compile_time, result)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,47 @@
+"""Benchmark checking a small program that uses a large prelude, in full and
+only from its entry point
+
+    python -m benchmarks.prelude --declarations 1000
+"""
+import argparse
+import timeit
+
+from llvm_lang.compiler import compiler, lazy_compiler
+from llvm_lang.passes.prune_unreachable import reachable
+
+from .generator import Shape, generate_program
+
+MAIN = '''
+function main(s: S0): int64 {
+    let a: int64 = f0(s, 1, 2);
+    return a;
+}
+'''
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--declarations', type=int, default=1000)
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    # f0 takes S0 and isn't generic, so main can call it
+    source = generate_program(
+        Shape(declarations=args.declarations, generics=0.0)) + MAIN
+    lazy = lazy_compiler(['main'])
+    program = compiler.passes[0](source)
+    print(f'prelude of {args.declarations} functions, main reaches'
+          f' {len(reachable(program, ["main"]))} of {len(program)}'
+          ' declarations')
+
+    for name, compile_ in (('full', compiler.compile), ('from main',
+                                                        lazy.compile)):
+        seconds = min(
+            timeit.repeat(lambda: compile_(source),
+                          number=1,
+                          repeat=args.repeat))
+        print(f'  {name:<10} {seconds * 1000:10.2f} ms')
+
+
+if __name__ == '__main__':
+    main()
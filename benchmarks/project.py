@@ -0,0 +1,40 @@
+"""Benchmark compiling a multi-file project with different worker counts
+
+    python -m benchmarks.project --workers 1 2 4
+"""
+import argparse
+import os
+import timeit
+
+from llvm_lang.project import compile_project
+
+from .generator import Shape, generate_project
+
+
+def run(files: int, workers: int, repeat: int, baseline=None) -> float:
+    sources = generate_project(Shape(declarations=files * 4), files)
+    seconds = min(
+        timeit.repeat(lambda: compile_project(sources, workers=workers),
+                      number=1,
+                      repeat=repeat))
+    speedup = f'{baseline / seconds:6.2f}x' if baseline else ''
+    print(f'  {workers:>2} workers {seconds * 1000:10.2f} ms {speedup}')
+    return seconds
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--files', type=int, default=500)
+    parser.add_argument('--workers', nargs='*', type=int, default=[1, 2, 4, 8])
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    print(f'{args.files} files, {os.cpu_count()} CPUs')
+    baseline = None
+    for workers in args.workers:
+        seconds = run(args.files, workers, args.repeat, baseline)
+        baseline = baseline or seconds
+
+
+if __name__ == '__main__':
+    main()
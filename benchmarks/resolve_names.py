@@ -0,0 +1,86 @@
+"""Benchmark the compiler pipeline with and without name resolution
+
+Runs every pass after parsing on programs made of functions whose bodies are
+mostly references to parameters, locals and other functions, once with the
+`resolve_names` pass giving identifiers slots and once with later passes
+resolving them by name.
+
+    python -m benchmarks.resolve_names
+"""
+import argparse
+import random
+import timeit
+
+from llvm_lang.compiler import Compiler, passes
+from llvm_lang.parser import parse
+from llvm_lang.passes.resolve_names import resolve_names
+
+
+def generate_program(n_functions: int,
+                     *,
+                     n_parameters: int = 6,
+                     n_locals: int = 12,
+                     terms: int = 6,
+                     seed: int = 0) -> str:
+    """Generate functions whose locals each combine `terms` identifiers, with
+    every fourth local calling another (possibly later) function"""
+    rng = random.Random(seed)
+    params = [f'p{i}' for i in range(n_parameters)]
+    param_list = ', '.join(f'{p}: int64' for p in params)
+    functions = []
+
+    for i in range(n_functions):
+        names = list(params)
+        body = []
+        for j in range(n_locals):
+            if j % 4 == 3:
+                args = ', '.join(rng.choice(names) for _ in params)
+                value = f'f{rng.randrange(n_functions)}({args})'
+            else:
+                value = ' + '.join(rng.choice(names) for _ in range(terms))
+            body.append(f'    let v{j}: int64 = {value};')
+            names.append(f'v{j}')
+        body.append(f'    return v{n_locals - 1};')
+        functions.append(f'function f{i}({param_list}): int64 {{\n' +
+                         '\n'.join(body) + '\n}')
+
+    return '\n\n'.join(functions)
+
+
+def best_of(fn, repeat):
+    return min(timeit.repeat(fn, number=1, repeat=repeat))
+
+
+def run(n_functions: int, repeat: int):
+    program = parse(generate_program(n_functions))
+    split = passes.index(resolve_names)
+    # everything before name resolution is shared by both pipelines
+    declared = Compiler(passes=passes[1:split]).compile(program)
+    later = Compiler(passes=passes[split + 1:])
+    resolved = resolve_names(declared)
+
+    results = (
+        ('later passes, by name',
+         best_of(lambda: later.compile(declared), repeat)),
+        ('later passes, by slot',
+         best_of(lambda: later.compile(resolved), repeat)),
+        ('resolve_names', best_of(lambda: resolve_names(declared), repeat)),
+    )
+
+    print(f'{n_functions} functions')
+    for label, seconds in results:
+        print(f'  {label:<30} {seconds * 1000:10.2f} ms')
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('sizes', nargs='*', type=int, default=[200, 1000])
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    for size in args.sizes:
+        run(size, args.repeat)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,90 @@
+"""Benchmark name resolution in deeply nested scopes
+
+Compares `Scopes` with the stack of dicts it replaced, resolving a global name
+from the innermost of `depth` nested scopes, and entering and leaving scopes.
+
+    python -m benchmarks.scopes
+"""
+import argparse
+import timeit
+
+from llvm_lang.scopes import Scopes
+
+
+class StackOfDicts:
+    """The previous implementation, walking scopes from the innermost one"""
+    def __init__(self, it=None):
+        self.scopes = [dict(it or ())]
+
+    def push_scope(self):
+        self.scopes.append({})
+
+    def pop_scope(self):
+        self.scopes.pop()
+
+    def add_binding(self, name, typ):
+        if name in self.scopes[-1]:
+            raise SyntaxError(name)
+        self.scopes[-1][name] = typ
+
+    def resolve_binding(self, name):
+        for scope in reversed(self.scopes):
+            if name in scope:
+                return scope[name]
+        raise ReferenceError(name)
+
+
+def nested(cls, depth):
+    scopes = cls([('global', 0)])
+    for i in range(depth):
+        scopes.push_scope()
+        scopes.add_binding(f'local{i}', i)
+        scopes.add_binding('shadowed', i)
+    return scopes
+
+
+def time_resolve(cls, depth, number):
+    scopes = nested(cls, depth)
+    resolve = scopes.resolve_binding
+    return min(
+        timeit.repeat(lambda: resolve('global'), number=number,
+                      repeat=5)) / number
+
+
+def time_push_pop(cls, depth, number):
+    def enter_and_leave():
+        scopes = cls()
+        for i in range(depth):
+            scopes.push_scope()
+            scopes.add_binding('x', i)
+        for _ in range(depth):
+            scopes.pop_scope()
+
+    return min(timeit.repeat(enter_and_leave, number=number,
+                             repeat=5)) / number / depth
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('depths',
+                        nargs='*',
+                        type=int,
+                        default=[1, 10, 100, 1000])
+    parser.add_argument('--number', type=int, default=10000)
+    args = parser.parse_args()
+
+    print(f'{"depth":>6} {"resolve (ns)":>24} {"push+bind+pop (ns)":>24}')
+    print(f'{"":>6} {"old":>11} {"new":>12} {"old":>11} {"new":>12}')
+    for depth in args.depths:
+        resolve_old = time_resolve(StackOfDicts, depth, args.number)
+        resolve_new = time_resolve(Scopes, depth, args.number)
+        scope_number = max(1, args.number // depth)
+        push_old = time_push_pop(StackOfDicts, depth, scope_number)
+        push_new = time_push_pop(Scopes, depth, scope_number)
+        print(
+            f'{depth:>6} {resolve_old * 1e9:>11.0f} {resolve_new * 1e9:>12.0f}'
+            f' {push_old * 1e9:>11.0f} {push_new * 1e9:>12.0f}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,92 @@
+"""Benchmark compile latency with and without a compile server
+
+Compares compiling a generated program with a one-shot `python -m llvm_lang`,
+with the same command line forwarding to a running server, and with a
+request from a client that is already connected.
+
+    python -m benchmarks.server --runs 20
+"""
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+from llvm_lang.client import Client
+
+from .generator import Shape, generate_program
+
+
+def latencies(fn, runs: int):
+    times = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - start)
+    return times
+
+
+def start_server(path: str, workers: int) -> subprocess.Popen:
+    server = subprocess.Popen([
+        sys.executable, '-m', 'llvm_lang.server', '--socket', path,
+        '--workers',
+        str(workers)
+    ])
+    while not os.path.exists(path):
+        if server.poll() is not None:
+            raise RuntimeError('Compile server exited')
+        time.sleep(0.01)
+    return server
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--declarations', type=int, default=20)
+    parser.add_argument('--runs', type=int, default=20)
+    parser.add_argument('--workers', type=int, default=2)
+    args = parser.parse_args()
+
+    source = generate_program(Shape(declarations=args.declarations))
+    with tempfile.TemporaryDirectory() as directory:
+        file = os.path.join(directory, 'program.ll')
+        with open(file, 'w') as f:
+            f.write(source)
+        socket_path = os.path.join(directory, 'server.sock')
+        server = start_server(socket_path, args.workers)
+
+        try:
+            with Client(socket_path) as client:
+                # the first request to each worker warms it up
+                for _ in range(args.workers):
+                    client.compile(source)
+                rows = [
+                    ('one-shot CLI',
+                     latencies(
+                         lambda: subprocess.run(
+                             [sys.executable, '-m', 'llvm_lang', file],
+                             check=True), args.runs)),
+                    ('CLI with --server',
+                     latencies(
+                         lambda: subprocess.run([
+                             sys.executable, '-m', 'llvm_lang', '--server',
+                             socket_path, file
+                         ],
+                                                check=True), args.runs)),
+                    ('connected client',
+                     latencies(lambda: client.compile(source), args.runs)),
+                ]
+        finally:
+            server.terminate()
+            server.wait()
+
+    print(f'{args.declarations} declarations, {len(source)} bytes,'
+          f' {args.runs} runs')
+    for name, times in rows:
+        print(f'  {name:<20} median {statistics.median(times) * 1000:8.2f} ms'
+              f'  min {min(times) * 1000:8.2f} ms')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,54 @@
+"""Benchmark compiling a small program against preludes of different sizes,
+from scratch and with a `CompilerSession`
+
+    python -m benchmarks.session --sizes 10 100 1000 10000
+"""
+import argparse
+import statistics
+import time
+
+from llvm_lang.compiler import compiler
+from llvm_lang.session import CompilerSession
+
+from .generator import Shape, generate_program
+
+PROGRAM = '''
+function main(s: S0): int64 {
+    let a: int64 = f0(s, 1, 2);
+    return a;
+}
+'''
+
+
+def timed(fn, *args) -> float:
+    start = time.perf_counter()
+    fn(*args)
+    return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--sizes',
+                        nargs='*',
+                        type=int,
+                        default=[10, 100, 1000, 10000])
+    parser.add_argument('--runs', type=int, default=20)
+    args = parser.parse_args()
+
+    print(f'{"prelude":>8} {"from scratch":>14} {"prelude once":>14}'
+          f' {"per program":>14}')
+    for size in args.sizes:
+        # f0 takes S0 and isn't generic, so the program can call it
+        prelude = generate_program(Shape(declarations=size, generics=0.0))
+        scratch = timed(compiler.compile, prelude + PROGRAM)
+        start = time.perf_counter()
+        session = CompilerSession(prelude)
+        once = time.perf_counter() - start
+        per_program = statistics.median(
+            timed(session.compile, PROGRAM) for _ in range(args.runs))
+        print(f'{size:>8} {scratch * 1000:>11.2f} ms {once * 1000:>11.2f} ms'
+              f' {per_program * 1000:>11.3f} ms')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,200 @@
+"""Compiler benchmark suite
+
+Times lexing, parsing and every pass of `llvm_lang.compiler.passes` on
+programs from `benchmarks.generator`, one workload per dimension the generator
+scales in. Results are saved as JSON and compared with a baseline, failing if
+any stage got slower than the threshold allows.
+
+    python -m benchmarks.suite --output results.json
+    python -m benchmarks.suite --baseline baseline.json
+"""
+import argparse
+import gc
+import json
+import os
+import platform
+import sys
+import time
+from dataclasses import asdict
+from typing import Any, Dict, List, Tuple
+
+from llvm_lang import parser as llvm_lang_parser
+from llvm_lang.compiler import Compiler, passes
+from llvm_lang.instrumentation import Instrumentation
+
+from .generator import Shape, generate_program
+
+FORMAT_VERSION = 1
+
+WORKLOADS = {
+    'default': Shape(),
+    'declarations': Shape(declarations=400),
+    'body-length': Shape(body_length=32),
+    'expression-depth': Shape(expression_depth=6),
+    'generics': Shape(generics=1.0),
+    'struct-width': Shape(struct_width=32),
+}
+
+Results = Dict[str, Any]
+
+
+def lex(source: str):
+    lexer = llvm_lang_parser.lexer
+    lexer.lineno = 1
+    lexer.input(source)
+    for _ in iter(lexer.token, None):
+        pass
+
+
+def timed(fn, *args) -> Tuple[float, Any]:
+    start = time.perf_counter()
+    result = fn(*args)
+    return time.perf_counter() - start, result
+
+
+def time_stages(source: str, after_parse: Compiler) -> Dict[str, float]:
+    """Time lexing, parsing and each pass once
+
+    Like `timeit`, garbage collection is turned off while timing, so
+    collections triggered by earlier allocations don't land in later stages.
+    """
+    gc.collect()
+    gc.disable()
+    try:
+        lex_time, _ = timed(lex, source)
+        parse_time, program = timed(llvm_lang_parser.parse, source)
+        instrumentation = Instrumentation(memory=False, node_counts=False)
+        after_parse.compile(program, instrumentation)
+    finally:
+        gc.enable()
+
+    stages = {'lex': lex_time, 'parse': parse_time}
+    for record in instrumentation.records:
+        stages[record.name] = record.wall_time
+    return stages
+
+
+def run(workloads: List[str], repeat: int) -> Results:
+    """Time every workload `repeat` times after a warm-up run, keeping the
+    fastest time of each stage
+
+    Workloads take turns, one run each per round, so that a stretch of time
+    where the machine runs slowly can't affect every run of one workload.
+    """
+    sources = {name: generate_program(WORKLOADS[name]) for name in workloads}
+    after_parse = Compiler(passes=passes[1:])
+    best: Dict[str, Dict[str, float]] = {name: {} for name in workloads}
+
+    for round_ in range(repeat + 1):
+        for name, source in sources.items():
+            stages = time_stages(source, after_parse)
+            if round_ == 0:
+                continue
+            for stage, seconds in stages.items():
+                best[name][stage] = min(seconds,
+                                        best[name].get(stage, seconds))
+
+    return {
+        'version': FORMAT_VERSION,
+        'python': platform.python_version(),
+        'repeat': repeat,
+        'workloads': {
+            name: {
+                'shape': asdict(WORKLOADS[name]),
+                'source_bytes': len(sources[name]),
+                'stages': best[name],
+            }
+            for name in workloads
+        },
+    }
+
+
+def compare(
+        baseline: Results,
+        results: Results,
+        *,
+        threshold: float = 0.1,
+        min_delta: float = 0.002) -> List[Tuple[str, str, float, float, str]]:
+    """Compare every stage timed in both results
+
+    A stage regressed if it got more than `threshold` (relative)
+    and `min_delta` seconds slower, which keeps fast stages from flagging
+    noise.
+    """
+    rows = []
+    for name, workload in results['workloads'].items():
+        old_workload = baseline['workloads'].get(name)
+        if old_workload is None or old_workload['shape'] != workload['shape']:
+            continue
+        for stage, new in workload['stages'].items():
+            old = old_workload['stages'].get(stage)
+            if old is None:
+                continue
+            if new - old > max(old * threshold, min_delta):
+                status = 'regression'
+            elif old - new > max(old * threshold, min_delta):
+                status = 'improvement'
+            else:
+                status = ''
+            rows.append((name, stage, old, new, status))
+    return rows
+
+
+def print_results(results: Results, file=sys.stdout):
+    for name, workload in results['workloads'].items():
+        print(f'{name} ({workload["source_bytes"]} bytes)', file=file)
+        for stage, seconds in workload['stages'].items():
+            print(f'  {stage:<30} {seconds * 1000:10.2f} ms', file=file)
+
+
+def print_comparison(rows, file=sys.stdout):
+    for name, stage, old, new, status in rows:
+        change = (new - old) / old * 100 if old else 0.0
+        print(
+            f'{name:<18} {stage:<30} {old * 1000:10.2f} ms'
+            f' -> {new * 1000:10.2f} ms {change:+7.1f}%  {status}',
+            file=file)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--workload',
+                        action='append',
+                        choices=sorted(WORKLOADS),
+                        help='workloads to run (default: all)')
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--output', help='file to save the results to')
+    parser.add_argument('--baseline', help='results to compare against')
+    parser.add_argument('--threshold',
+                        type=float,
+                        default=0.1,
+                        help='relative slowdown counted as a regression')
+    args = parser.parse_args()
+
+    results = run(args.workload or list(WORKLOADS), args.repeat)
+    print_results(results)
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=2)
+
+    if not args.baseline:
+        return
+    if not os.path.exists(args.baseline):
+        print(f'\nNo baseline at {args.baseline}, skipping comparison')
+        return
+
+    with open(args.baseline) as f:
+        baseline = json.load(f)
+    rows = compare(baseline, results, threshold=args.threshold)
+    print(f'\nCompared with {args.baseline}:')
+    print_comparison(rows)
+    regressions = [row for row in rows if row[-1] == 'regression']
+    if regressions:
+        print(f'\n{len(regressions)} stages regressed by more than'
+              f' {args.threshold:.0%}')
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,96 @@
+"""Benchmark the integer type table against plain `types.*` objects
+
+Instantiates the struct types of a generated program, then compares the
+memory they take, the time to compare every type with an equal copy of
+itself, and the cost of serializing them.
+
+    python -m benchmarks.type_table
+"""
+import argparse
+import gc
+import pickle
+import timeit
+import tracemalloc
+
+from llvm_lang.parser import parse
+from llvm_lang.passes.resolve_declared_types import resolve_declared_types
+from llvm_lang.scopes import Scopes
+from llvm_lang.types.instantiate import instantiate
+from llvm_lang.types.table import TypeTable
+
+from .verify_types import generate_program
+
+
+def instantiate_all(declared_types):
+    scopes = Scopes(declared_types.items())
+    return {
+        name: instantiate(ty, {}, scopes)
+        for name, ty in declared_types.items()
+    }
+
+
+def best_of(fn, repeat):
+    return min(timeit.repeat(fn, number=1, repeat=repeat))
+
+
+def run(n_structs: int, repeat: int):
+    declared_types = resolve_declared_types(parse(
+        generate_program(n_structs))).declared_types
+
+    gc.collect()
+    tracemalloc.start()
+    objects = instantiate_all(declared_types)
+    object_memory = tracemalloc.get_traced_memory()[0]
+    table = TypeTable()
+    ids = table.intern_all(objects)
+    del objects
+    gc.collect()
+    table_memory = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+
+    objects = instantiate_all(declared_types)
+    copies = instantiate_all(declared_types)
+    copy_ids = table.intern_all(copies)
+    pairs = [(objects[name], copies[name]) for name in objects]
+    id_pairs = [(ids[name], copy_ids[name]) for name in ids]
+
+    def compare_objects():
+        for a, b in pairs:
+            assert a == b
+
+    def compare_ids():
+        for a, b in id_pairs:
+            assert a == b
+
+    print(f'{n_structs} structs, {len(table)} distinct types')
+    print(f'  memory:      objects {object_memory / 1024:10.0f} KiB,'
+          f' table {table_memory / 1024:10.0f} KiB')
+    print(
+        f'  equality:    objects {best_of(compare_objects, repeat) * 1e3:10.2f}'
+        f' ms,  ids  {best_of(compare_ids, repeat) * 1e3:10.2f} ms')
+    print(
+        f'  interning:   {best_of(lambda: TypeTable().intern_all(copies), repeat) * 1e3:.2f} ms'
+    )  # noqa
+
+    pickled = pickle.dumps(objects)
+    serialized = table.to_bytes()
+    print(
+        f'  serialized:  pickle {len(pickled) / 1024:10.0f} KiB'
+        f' {best_of(lambda: pickle.loads(pickled), repeat) * 1e3:8.2f} ms'
+        f' to load, table {len(serialized) / 1024:6.0f} KiB'
+        f' {best_of(lambda: TypeTable.from_bytes(serialized), repeat) * 1e3:8.2f} ms'  # noqa
+        f' to load')
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('sizes', nargs='*', type=int, default=[1000, 2000])
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    for size in args.sizes:
+        run(size, args.repeat)
+
+
+if __name__ == '__main__':
+    main()
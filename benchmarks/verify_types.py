@@ -0,0 +1,96 @@
+"""Benchmark verification of declared types
+
+Compares verifying each declaration on its own with `types.verify.verify`
+against the batched `verify_declared_types` pass, on programs with thousands
+of struct types that share their field types.
+
+    python -m benchmarks.verify_types
+"""
+import argparse
+import random
+import timeit
+
+from llvm_lang.parser import parse
+from llvm_lang.passes.resolve_declared_types import resolve_declared_types
+from llvm_lang.passes.verify_declared_types import verify_declared_types
+from llvm_lang.scopes import Scopes
+from llvm_lang.types.instantiate import instantiate
+from llvm_lang.types.verify import verify, verify_types
+
+PRIMITIVE_FIELD_TYPES = ('int64', 'uint8', 'float64', 'bool', 'symbol',
+                         'uint8[]', '(int32, float32)')
+
+
+def struct(name, field_types):
+    fields = '\n'.join(f'    f{i}: {ty}' for i, ty in enumerate(field_types))
+    return f'struct {name} {{\n{fields}\n}}'
+
+
+def generate_program(n_structs: int,
+                     *,
+                     width: int = 8,
+                     shared_layers: int = 3,
+                     shared_per_layer: int = 10,
+                     seed: int = 0) -> str:
+    """Generate struct declarations whose fields are drawn from a small pool of
+    shared types, themselves layered on top of each other"""
+    rng = random.Random(seed)
+    declarations = []
+    pool = list(PRIMITIVE_FIELD_TYPES)
+
+    for layer in range(shared_layers):
+        names = [f'Shared{layer}_{i}' for i in range(shared_per_layer)]
+        for name in names:
+            declarations.append(
+                struct(name, [rng.choice(pool) for _ in range(width // 2)]))
+        pool = names + [f'{name}[4]' for name in names]
+
+    pool.extend(PRIMITIVE_FIELD_TYPES)
+    for i in range(n_structs):
+        declarations.append(
+            struct(f'Struct{i}', [rng.choice(pool) for _ in range(width)]))
+
+    return '\n\n'.join(declarations)
+
+
+def best_of(fn, repeat):
+    return min(timeit.repeat(fn, number=1, repeat=repeat))
+
+
+def run(n_structs: int, repeat: int):
+    ctx = resolve_declared_types(parse(generate_program(n_structs)))
+    scopes = Scopes(ctx.declared_types.items())
+    instantiated = {
+        name: instantiate(ty, {}, scopes)
+        for name, ty in ctx.declared_types.items()
+    }
+
+    def verify_each():
+        for ty in instantiated.values():
+            verify(ty)
+
+    results = (
+        ('verify each (instantiated)', best_of(verify_each, repeat)),
+        ('verify_types (instantiated)',
+         best_of(lambda: verify_types(instantiated), repeat)),
+        ('verify_declared_types pass',
+         best_of(lambda: verify_declared_types(ctx), repeat)),
+    )
+
+    print(f'{n_structs} structs ({len(ctx.declared_types)} declared types)')
+    for label, seconds in results:
+        print(f'  {label:<30} {seconds * 1000:10.2f} ms')
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('sizes', nargs='*', type=int, default=[1000, 5000])
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    for size in args.sizes:
+        run(size, args.repeat)
+
+
+if __name__ == '__main__':
+    main()
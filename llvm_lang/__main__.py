@@ -0,0 +1,55 @@
+"""Compile a file, reporting the first error, or every type error
+
+    python -m llvm_lang program.ll
+    python -m llvm_lang --server /tmp/llvm-lang.sock program.ll
+"""
+import argparse
+import sys
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('file')
+    parser.add_argument('--server',
+                        help='socket of a compile server to compile with')
+    parser.add_argument('--cache-dir', help='compile incrementally')
+    parser.add_argument('--entry-point',
+                        action='append',
+                        dest='entry_points',
+                        help='only check the declarations this one uses')
+    parser.add_argument('--warn-unreachable',
+                        action='store_true',
+                        help='warn about declarations the entry points don\'t'
+                        ' use')
+    parser.add_argument('--all-errors',
+                        action='store_true',
+                        help='report every type error, not just the first')
+    args = parser.parse_args()
+
+    with open(args.file) as f:
+        source = f.read()
+
+    # the compiler is only imported when it's needed, so compiling with a
+    # server doesn't pay for importing it
+    if args.server is not None:
+        from llvm_lang.client import Client
+        with Client(args.server) as client:
+            response = client.compile(source, args.cache_dir,
+                                      args.entry_points, args.warn_unreachable,
+                                      args.all_errors)
+    else:
+        from llvm_lang.driver import compile_source
+        response = compile_source(source, args.cache_dir, args.entry_points,
+                                  args.warn_unreachable, args.all_errors)
+
+    for warning in response.get('warnings', ()):
+        print(f'{args.file}: warning: {warning}', file=sys.stderr)
+    if not response['ok']:
+        for error in response.get('errors', [response['error']]):
+            print(f'{args.file}: {error["type"]}: {error["message"]}',
+                  file=sys.stderr)
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
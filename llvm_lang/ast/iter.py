@@ -4,7 +4,7 @@ from typing import Union
 from . import node
 from .utils import assert_all_registered
 
-__all__ = ('iter_node', )
+__all__ = ('iter_node', 'walk')
 
 
 def iter_node_not_implemented(node):
@@ -56,6 +56,11 @@ def iter_node_arraytypeexpression(node: Union[node.ArrayTypeExpression,
     yield node.element_type
 
 
+@iter_node.register
+def iter_node_typedexpression(node: node.TypedExpression):
+    yield node.value
+
+
 @iter_node.register
 def iter_node_binaryoperation(node: node.BinaryOperation):
     yield node.lhs
@@ -153,3 +158,12 @@ def iter_node_uniontypedeclaration(node: node.UnionTypeDeclaration):
 
 
 assert_all_registered(iter_node)
+
+
+def walk(root: node.Node):
+    """Iterate over a node and all of its descendants"""
+    stack = [root]
+    while stack:
+        current = stack.pop()
+        yield current
+        stack.extend(iter_node(current))
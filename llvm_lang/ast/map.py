@@ -1,107 +1,112 @@
+import dataclasses
+
 from llvm_lang import ast
 from llvm_lang.ast.utils import expect_all_concrete_nodes
 
 
+def unchanged(new, old) -> bool:
+    if isinstance(new, list) and isinstance(old, list):
+        return len(new) == len(old) and all(a is b for a, b in zip(new, old))
+    return new is old
+
+
 class MapAST(ast.Visitor):
+    """Rebuilds the AST from the results of visiting each node
+
+    Nodes whose children all come back unchanged are reused as is, so
+    untouched subtrees keep their identity (and their entries in side tables
+    keyed by node).
+    """
+    def rebuild(self, node: ast.Node, **fields) -> ast.Node:
+        if all(
+                unchanged(value, getattr(node, name))
+                for name, value in fields.items()):
+            return node
+        return dataclasses.replace(node, **fields)
+
     def visit_Program(self, node: ast.Program):
-        return ast.Program(map(self.visit, node))
+        declarations = [self.visit(n) for n in node]
+        if unchanged(declarations, node):
+            return node
+        return ast.Program(declarations)
 
     def visit_NamedTypeExpression(self, node: ast.NamedTypeExpression):
-        generic_arguments = None
-        if node.generic_arguments is not None:
-            generic_arguments = [
-                self.visit(arg) for arg in node.generic_arguments
-            ]
-        return ast.NamedTypeExpression(name=node.name,
-                                       generic_arguments=generic_arguments)
+        if node.generic_arguments is None:
+            return node
+        return self.rebuild(node,
+                            generic_arguments=[
+                                self.visit(arg)
+                                for arg in node.generic_arguments
+                            ])
 
     def visit_TupleTypeExpression(self, node: ast.TupleTypeExpression):
-        return ast.TupleTypeExpression(
-            elements=[self.visit(n) for n in node.elements])
+        return self.rebuild(node,
+                            elements=[self.visit(n) for n in node.elements])
 
     def visit_ArrayTypeExpression(self, node: ast.ArrayTypeExpression):
-        return ast.ArrayTypeExpression(element_type=self.visit(
-            node.element_type),
-                                       length=node.length)
+        return self.rebuild(node, element_type=self.visit(node.element_type))
 
     def visit_SliceTypeExpression(self, node: ast.SliceTypeExpression):
-        return ast.SliceTypeExpression(
-            element_type=self.visit(node.element_type))
+        return self.rebuild(node, element_type=self.visit(node.element_type))
 
     def visit_TypedExpression(self, node: ast.TypedExpression):
-        return ast.TypedExpression(value=self.visit(node.value),
-                                   type=node.type)
+        return self.rebuild(node, value=self.visit(node.value))
 
     def visit_BinaryOperation(self, node: ast.BinaryOperation):
-        return ast.BinaryOperation(lhs=self.visit(node.lhs),
-                                   op=node.op,
-                                   rhs=self.visit(node.rhs))
+        return self.rebuild(node,
+                            lhs=self.visit(node.lhs),
+                            rhs=self.visit(node.rhs))
 
     def visit_UnaryOperation(self, node: ast.UnaryOperation):
-        return ast.UnaryOperation(op=node.op, rhs=self.visit(node.rhs))
+        return self.rebuild(node, rhs=self.visit(node.rhs))
 
     def visit_CallExpression(self, node: ast.CallExpression):
-        return ast.CallExpression(target=self.visit(node.target),
-                                  args=[self.visit(a) for a in node.args])
+        return self.rebuild(node,
+                            target=self.visit(node.target),
+                            args=[self.visit(a) for a in node.args])
 
     def visit_ReturnStatement(self, node: ast.ReturnStatement):
-        value = None if node.value is None else self.visit(node.value)
-        return ast.ReturnStatement(value=value)
+        if node.value is None:
+            return node
+        return self.rebuild(node, value=self.visit(node.value))
 
     def visit_ExpressionStatement(self, node: ast.ExpressionStatement):
-        return ast.ExpressionStatement(expr=self.visit(node.expr))
+        return self.rebuild(node, expr=self.visit(node.expr))
 
     def visit_VariableDeclaration(self, node: ast.VariableDeclaration):
-        return ast.VariableDeclaration(name=node.name,
-                                       type=self.visit(node.type),
-                                       initializer=self.visit(
-                                           node.initializer))
+        return self.rebuild(node,
+                            type=self.visit(node.type),
+                            initializer=self.visit(node.initializer))
 
     def visit_FunctionParameter(self, node: ast.FunctionParameter):
-        return ast.FunctionParameter(name=node.name,
-                                     type=self.visit(node.type))
-
-    def _visit_generic_parameters(self, node: ast.GenericTypeDeclaration):
-        if node.generic_parameters is None:
-            return None
-        return [self.visit(p) for p in node.generic_parameters]
+        return self.rebuild(node, type=self.visit(node.type))
 
     def visit_FunctionDeclaration(self, node: ast.FunctionDeclaration):
-        return ast.FunctionDeclaration(
-            name=node.name,
+        return self.rebuild(
+            node,
             return_type=self.visit(node.return_type),
-            generic_parameters=self._visit_generic_parameters(node),
             parameters=[self.visit(p) for p in node.parameters],
             body=[self.visit(s) for s in node.body])
 
     def visit_NewTypeDeclaration(self, node: ast.NewTypeDeclaration):
-        return ast.NewTypeDeclaration(
-            name=node.name,
-            generic_parameters=self._visit_generic_parameters(node),
-            inner_type=self.visit(node.inner_type))
+        return self.rebuild(node, inner_type=self.visit(node.inner_type))
 
     def visit_StructTypeField(self, node: ast.StructTypeField):
-        return ast.StructTypeField(name=node.name, type=self.visit(node.type))
+        return self.rebuild(node, type=self.visit(node.type))
 
     def visit_StructTypeDeclaration(self, node: ast.StructTypeDeclaration):
-        return ast.StructTypeDeclaration(
-            name=node.name,
-            generic_parameters=self._visit_generic_parameters(node),
-            fields=[self.visit(f) for f in node.fields])
+        return self.rebuild(node, fields=[self.visit(f) for f in node.fields])
 
     def visit_UnionTypeStructVariant(self, node: ast.UnionTypeStructVariant):
-        return ast.UnionTypeStructVariant(
-            name=node.name, fields=[self.visit(f) for f in node.fields])
+        return self.rebuild(node, fields=[self.visit(f) for f in node.fields])
 
     def visit_UnionTypeTupleVariant(self, node: ast.UnionTypeTupleVariant):
-        return ast.UnionTypeTupleVariant(
-            name=node.name, elements=[self.visit(e) for e in node.elements])
+        return self.rebuild(node,
+                            elements=[self.visit(e) for e in node.elements])
 
     def visit_UnionTypeDeclaration(self, node: ast.UnionTypeDeclaration):
-        return ast.UnionTypeDeclaration(
-            name=node.name,
-            generic_parameters=self._visit_generic_parameters(node),
-            variants=[self.visit(v) for v in node.variants])
+        return self.rebuild(node,
+                            variants=[self.visit(v) for v in node.variants])
 
     def generic_visit(self, node: ast.Node):
         return node
@@ -1,6 +1,6 @@
 from functools import singledispatch
 from operator import itemgetter
-from typing import Optional
+from typing import Dict, Optional
 
 from llvm_lang import ast, types, errors
 from llvm_lang.ast import Op
@@ -38,117 +38,179 @@ def generate_type_slicetypeexpression(node: ast.SliceTypeExpression):
     return types.SliceType(element_type=generate_type(node.element_type))
 
 
+# keyed by the id of each expression
+ExpressionTypes = Dict[int, types.Type]
+
+
+def infer_type(
+        node: ast.Expression,
+        scopes: Scopes,
+        hint: Optional[types.Type] = None,
+        expression_types: Optional[ExpressionTypes] = None) -> types.Type:
+    '''Infer the type of an expression
+
+    The types of the expression and all of its subexpressions are recorded in
+    `expression_types`, and expressions found there aren't inferred again.
+    '''
+    if expression_types is None:
+        expression_types = {}
+    key = id(node)
+    typ = expression_types.get(key)
+    if typ is None:
+        typ = expression_types[key] = infer_node_type(node, scopes, hint,
+                                                      expression_types)
+    return typ
+
+
 @singledispatch
-def infer_type(node: ast.Expression,
-               scopes: Scopes,
-               hint: Optional[types.Type] = None) -> types.Type:
-    '''Infer the type of an expression'''
-    raise NotImplementedError()
+def infer_node_type(node: ast.Expression, scopes: Scopes,
+                    hint: Optional[types.Type],
+                    expression_types: ExpressionTypes) -> types.Type:
+    raise NotImplementedError(type(node).__name__)
 
 
-@infer_type.register
+@infer_node_type.register
 def infer_type_typedexpression(
-        node: ast.TypedExpression,
-        scopes: Scopes,
-        hint: Optional[types.Type] = None) -> types.Type:
+        node: ast.TypedExpression, scopes: Scopes, hint: Optional[types.Type],
+        expression_types: ExpressionTypes) -> types.Type:
     return node.type
 
 
-@infer_type.register
-def infer_type_identifier(node: ast.Identifier,
-                          scopes: Scopes,
-                          hint: Optional[types.Type] = None) -> types.Type:
-    return scopes.resolve_binding(node.name)
+@infer_node_type.register
+def infer_type_identifier(node: ast.Identifier, scopes: Scopes,
+                          hint: Optional[types.Type],
+                          expression_types: ExpressionTypes) -> types.Type:
+    return scopes.resolve_identifier(node)
 
 
-@infer_type.register
-def infer_type_integerliteral(node: ast.IntegerLiteral,
-                              scopes: Scopes,
-                              hint: Optional[types.Type] = None) -> types.Type:
+@infer_node_type.register
+def infer_type_integerliteral(node: ast.IntegerLiteral, scopes: Scopes,
+                              hint: Optional[types.Type],
+                              expression_types: ExpressionTypes) -> types.Type:
     if isinstance(hint, types.IntType):
         return hint
     return p['int64']
 
 
-@infer_type.register
-def infer_type_floatliteral(node: ast.FloatLiteral,
-                            scopes: Scopes,
-                            hint: Optional[types.Type] = None) -> types.Type:
+@infer_node_type.register
+def infer_type_floatliteral(node: ast.FloatLiteral, scopes: Scopes,
+                            hint: Optional[types.Type],
+                            expression_types: ExpressionTypes) -> types.Type:
     if isinstance(hint, types.FloatType):
         return hint
     return p['float64']
 
 
-@infer_type.register
-def infer_type_stringliteral(node: ast.StringLiteral,
-                             scopes: Scopes,
-                             hint: Optional[types.Type] = None) -> types.Type:
+@infer_node_type.register
+def infer_type_stringliteral(node: ast.StringLiteral, scopes: Scopes,
+                             hint: Optional[types.Type],
+                             expression_types: ExpressionTypes) -> types.Type:
     return types.ArrayType(length=len(node.value.encode('utf-8')),
                            element_type=p['uint8'])
 
 
-@infer_type.register
+@infer_node_type.register
 def infer_type_binaryoperation(  # noqa C901
-        node: ast.BinaryOperation,
-        scopes: Scopes,
-        hint: Optional[types.Type] = None) -> types.Type:
-    lhs_type = infer_type(node.lhs, scopes)
-
+        node: ast.BinaryOperation, scopes: Scopes, hint: Optional[types.Type],
+        expression_types: ExpressionTypes) -> types.Type:
     if node.op in (Op.plus, Op.minus, Op.times, Op.divide):
-        if lhs_type != infer_type(node.rhs, scopes):
+        lhs_type = infer_type(node.lhs, scopes, hint, expression_types)
+        rhs_type = infer_type(node.rhs, scopes, lhs_type, expression_types)
+        if lhs_type != rhs_type:
             raise errors.TypeError(
-                f'Both sides of "{node.op}" must have the same type')
+                'Both sides of "{node.op}" must have the same type',
+                node=node,
+                expected=lhs_type,
+                actual=rhs_type)
         if not isinstance(lhs_type, (types.IntType, types.FloatType)):
             raise errors.TypeError(
-                f'Operands of "{node.op}" must be numeric, got "{lhs_type}"')
+                'Operands of "{node.op}" must be numeric, got "{actual}"',
+                node=node,
+                actual=lhs_type)
         return lhs_type
-    elif node.op == Op.field:
+
+    lhs_type = infer_type(node.lhs, scopes, None, expression_types)
+
+    if node.op == Op.field:
         if not isinstance(lhs_type, types.StructType):
             raise errors.TypeError(
-                f'Cannot access field "{node.rhs}" of non-struct type'
-                f' {lhs_type}')
+                'Cannot access field "{node.rhs}" of non-struct type'
+                ' {actual}',
+                node=node,
+                actual=lhs_type)
         for name, typ in lhs_type.fields:
             if name == node.rhs.name:
                 return typ
         raise errors.TypeError(
-            f'Struct type {lhs_type} has no field "{node.rhs}"')
+            'Struct type {actual} has no field "{node.rhs}"',
+            node=node,
+            actual=lhs_type)
     elif node.op == Op.index:
         if not isinstance(lhs_type, (types.ArrayType, types.SliceType)):
-            raise errors.TypeError(f'Type {lhs_type} cannot be indexed')
-        rhs_type = infer_type(node.rhs, scopes)
+            raise errors.TypeError('Type {actual} cannot be indexed',
+                                   node=node,
+                                   actual=lhs_type)
+        rhs_type = infer_type(node.rhs, scopes, None, expression_types)
         if not isinstance(rhs_type, types.IntType):
-            raise errors.TypeError(f'Cannot index {lhs_type} with {rhs_type}')
+            raise errors.TypeError('Cannot index {target} with {actual}',
+                                   node=node,
+                                   actual=rhs_type,
+                                   target=lhs_type)
         return lhs_type.element_type
     elif node.op == Op.assign:
         if (not isinstance(node.lhs, (ast.Identifier, ast.BinaryOperation))
                 or (isinstance(node.lhs, ast.BinaryOperation)
                     and node.op not in (Op.assign, Op.index, Op.field))):
-            raise errors.SyntaxError(f'Invalid assignment target {node.lhs}')
-        return rhs_type
+            raise errors.SyntaxError('Invalid assignment target {node.lhs}',
+                                     node=node)
+        return infer_type(node.rhs, scopes, lhs_type, expression_types)
     else:
         raise NotImplementedError()
 
 
-@infer_type.register
-def infer_type_unaryoperation(node: ast.UnaryOperation,
-                              scopes: Scopes,
-                              hint: Optional[types.Type] = None) -> types.Type:
-    return infer_type(node.rhs, scopes)
+@infer_node_type.register
+def infer_type_unaryoperation(node: ast.UnaryOperation, scopes: Scopes,
+                              hint: Optional[types.Type],
+                              expression_types: ExpressionTypes) -> types.Type:
+    rhs_type = infer_type(node.rhs, scopes, hint, expression_types)
+    # newtypes of numbers can be negated too
+    operand_type = rhs_type
+    while isinstance(operand_type, types.NewType):
+        operand_type = operand_type.inner_type
+    if not isinstance(operand_type, (types.IntType, types.FloatType)):
+        raise errors.TypeError(
+            'Operand of "{node.op}" must be numeric, got "{actual}"',
+            node=node,
+            actual=rhs_type)
+    return rhs_type
 
 
-@infer_type.register
-def infer_type_callexpression(node: ast.CallExpression,
-                              scopes: Scopes,
-                              hint: Optional[types.Type] = None) -> types.Type:
-    fn_type = infer_type(node.target, scopes)
+@infer_node_type.register
+def infer_type_callexpression(node: ast.CallExpression, scopes: Scopes,
+                              hint: Optional[types.Type],
+                              expression_types: ExpressionTypes) -> types.Type:
+    fn_type = infer_type(node.target, scopes, None, expression_types)
 
     if not isinstance(fn_type, types.FunctionType):
-        raise errors.TypeError(f'{node.target} is not a function')
+        raise errors.TypeError('{node.target} is not a function',
+                               node=node,
+                               actual=fn_type)
 
-    arg_types = list(map(lambda arg: infer_type(arg, scopes), node.args))
-
-    for arg, param in zip(arg_types, map(itemgetter(1), fn_type.parameters)):
-        if arg != param:
-            raise TypeError(f'Type {arg} is not assignable to {param}')
+    if len(node.args) != len(fn_type.parameters):
+        raise errors.TypeError(
+            'Expected {expected} arguments to {function.name}, got {actual}',
+            node=node,
+            expected=len(fn_type.parameters),
+            actual=len(node.args),
+            function=fn_type)
+
+    for arg, param in zip(node.args, map(itemgetter(1), fn_type.parameters)):
+        arg_type = infer_type(arg, scopes, param, expression_types)
+        if arg_type != param:
+            raise errors.TypeError(
+                'Type {actual} is not assignable to {expected}',
+                node=arg,
+                expected=param,
+                actual=arg_type)
 
     return fn_type.return_type
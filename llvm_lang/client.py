@@ -0,0 +1,61 @@
+"""A client for `llvm_lang.server`
+
+Only uses the standard library, so using it doesn't import the compiler.
+"""
+import socket
+from typing import List, Optional
+
+from llvm_lang.protocol import (HEADER, Message, decode_length, decode_message,
+                                encode_frame)
+
+
+class Client:
+    """A connection to a compile server, which can be used for any number of
+    requests"""
+    def __init__(self, path: str):
+        self.socket = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        try:
+            self.socket.connect(path)
+        except OSError:
+            self.socket.close()
+            raise
+
+    def __enter__(self) -> 'Client':
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def close(self):
+        self.socket.close()
+
+    def receive_exactly(self, size: int) -> bytes:
+        chunks = []
+        while size:
+            chunk = self.socket.recv(size)
+            if not chunk:
+                raise ConnectionError('Compile server closed the connection')
+            chunks.append(chunk)
+            size -= len(chunk)
+        return b''.join(chunks)
+
+    def request(self, message: Message) -> Message:
+        self.socket.sendall(encode_frame(message))
+        length = decode_length(self.receive_exactly(HEADER.size))
+        return decode_message(self.receive_exactly(length))
+
+    def compile(self,
+                source: str,
+                cache_dir: Optional[str] = None,
+                entry_points: Optional[List[str]] = None,
+                warn_unreachable: bool = False,
+                all_errors: bool = False) -> Message:
+        request: Message = {'source': source}
+        if cache_dir is not None:
+            request['cache_dir'] = cache_dir
+        if entry_points:
+            request['entry_points'] = entry_points
+            request['warn_unreachable'] = warn_unreachable
+        if all_errors:
+            request['all_errors'] = all_errors
+        return self.request(request)
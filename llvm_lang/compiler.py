@@ -1,31 +1,119 @@
 from dataclasses import dataclass
-from functools import reduce
-from typing import List
+from functools import reduce, wraps
+from typing import Iterable, List, Optional
 
+from . import errors
+
+from .instrumentation import Instrumentation
 from .passes import Pass
 from .passes.parse import parse
-from .passes.validate_semantics import validate_semantics
+from .passes.validate_semantics import (validate_declarations,
+                                        validate_semantics)
 from .passes.resolve_declared_types import resolve_declared_types
-from .passes.annotate_expressions import annotate_expressions
+from .passes.verify_declared_types import verify_declared_types
+from .passes.prune_unreachable import prune_unreachable
+from .passes.resolve_names import resolve_names
+from .passes.annotate_expressions import (annotate_expressions,
+                                          annotate_expressions_collecting)
 from .passes.instantiate_type_expressions import instantiate_type_expressions
-from .passes.check_types import check_types
+from .passes.check_types import check_types, check_types_collecting
+from .passes.inline_functions import inline_functions
+from .passes.fold_constants import fold_constants
+from .passes.eliminate_dead_code import (eliminate_dead_code,
+                                         eliminate_dead_functions)
+from .passes.evaluate_globals import evaluate_globals
+from .passes.generate_ir import generate_ir
+from .passes.compile_objects import compile_objects_with
+from .passes.optimize_ir import OptimizationOptions, optimize_ir_with
 
 
 @dataclass
 class Compiler:
+    """Runs `passes` in order, then optimizes the IR they generate with
+    `optimization`, if there is one
+
+    With `workers`, the program is generated as several modules instead,
+    which are optimized and compiled to machine code by that many processes.
+    """
     passes: List[Pass]
+    optimization: Optional[OptimizationOptions] = None
+    workers: Optional[int] = None
 
-    def compile(self, input_: str):
-        return reduce(lambda acc, pass_: pass_(acc), self.passes, input_)
+    def compile(self,
+                input_: str,
+                instrumentation: Optional[Instrumentation] = None):
+        passes = self.passes
+        if self.workers is not None:
+            parallel = compile_objects_with(self.workers, self.optimization)
+            passes = tuple(parallel if pass_ is generate_ir else pass_
+                           for pass_ in passes)
+        elif self.optimization is not None:
+            passes = (*passes, optimize_ir_with(self.optimization))
+        if instrumentation is not None:
+            return reduce(instrumentation.run_pass, passes, input_)
+        return reduce(lambda acc, pass_: pass_(acc), passes, input_)
 
 
 passes = (
     parse,
     validate_semantics,
     resolve_declared_types,
+    verify_declared_types,
+    resolve_names,
     annotate_expressions,
     instantiate_type_expressions,
     check_types,
+    inline_functions,
+    fold_constants,
+    eliminate_dead_code,
+    evaluate_globals,
+    generate_ir,
 )
 
 compiler = Compiler(passes=passes)
+
+
+def lazy_compiler(entry_points: Iterable[str],
+                  warn_unreachable: bool = False) -> Compiler:
+    """A compiler that only validates and checks the declarations
+    `entry_points` use, and drops the functions that are only used from dead
+    code"""
+    index = passes.index(verify_declared_types) + 1
+    front_end = tuple(pass_ for pass_ in passes[:index]
+                      if pass_ is not validate_semantics)
+    return Compiler(passes=front_end + (
+        prune_unreachable(entry_points, warn_unreachable),
+        validate_declarations,
+    ) + passes[index:passes.index(generate_ir)] + (
+        eliminate_dead_functions(entry_points),
+        generate_ir,
+    ))
+
+
+def collecting_compiler(base: Compiler,
+                        diagnostics: List[errors.BaseException]) -> Compiler:
+    """`base`, but adding every type error it finds to `diagnostics` rather
+    than stopping at the first one
+
+    Errors in the passes before annotate_expressions, like syntax errors and
+    unbound names, still stop the compile. No code is generated for programs
+    with errors.
+    """
+    # the replacement stands in for generate_ir, so `Compiler.compile` can't
+    # find it to swap in the parallel pass
+    generate = (generate_ir if base.workers is None else compile_objects_with(
+        base.workers, base.optimization))
+
+    @wraps(generate)
+    def generate_ir_unless_failed(ctx):
+        return ctx if diagnostics else generate(ctx)
+
+    replacements = {
+        annotate_expressions: annotate_expressions_collecting(diagnostics),
+        check_types: check_types_collecting(diagnostics),
+        generate_ir: generate_ir_unless_failed,
+    }
+    return Compiler(passes=tuple(
+        replacements.get(pass_, pass_) for pass_ in base.passes),
+                    optimization=base.optimization,
+                    workers=base.workers)
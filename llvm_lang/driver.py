@@ -0,0 +1,114 @@
+"""Compiling a source file into a response for the command line or the
+compile server"""
+import warnings
+from typing import Dict, List, Optional
+
+from llvm_lang import errors
+from llvm_lang.compiler import collecting_compiler, compiler, lazy_compiler
+from llvm_lang.incremental import IncrementalCompiler
+from llvm_lang.passes.prune_unreachable import UnreachableWarning
+from llvm_lang.protocol import Message, ProtocolError
+
+# kept for the life of the process, so compiling the same program repeatedly
+# reuses the results in memory rather than loading them from disk
+incremental_compilers: Dict[str, IncrementalCompiler] = {}
+
+
+def error_response(error: Exception) -> Message:
+    return {
+        'ok': False,
+        'error': {
+            'type': type(error).__name__,
+            'message': str(error),
+        },
+    }
+
+
+def run_pipeline(source: str, cache_dir: Optional[str],
+                 entry_points: Optional[List[str]], warn_unreachable: bool,
+                 diagnostics: Optional[List[errors.BaseException]]):
+    """Compile `source` with the compiler the options call for, adding every
+    type error to `diagnostics` if there is a list of them"""
+    if cache_dir is not None:
+        if cache_dir not in incremental_compilers:
+            incremental_compilers[cache_dir] = IncrementalCompiler(cache_dir)
+        return incremental_compilers[cache_dir].compile(source)
+    base = (lazy_compiler(entry_points, warn_unreachable)
+            if entry_points else compiler)
+    if diagnostics is not None:
+        base = collecting_compiler(base, diagnostics)
+    return base.compile(source)
+
+
+def compile_source(source: str,
+                   cache_dir: Optional[str] = None,
+                   entry_points: Optional[List[str]] = None,
+                   warn_unreachable: bool = False,
+                   all_errors: bool = False) -> Message:
+    """Compile `source`, incrementally if there's a `cache_dir`, or only what
+    `entry_points` use if there are any
+
+    With `all_errors`, a failed compile reports every type error in "errors",
+    as well as the first one in "error".
+    """
+    if cache_dir is not None and entry_points:
+        return error_response(
+            ProtocolError('Incremental compiles check every declaration, so'
+                          ' they can\'t have entry points'))
+    if cache_dir is not None and all_errors:
+        return error_response(
+            ProtocolError('Incremental compiles stop at the first error'))
+
+    diagnostics: List[errors.BaseException] = []
+    try:
+        with warnings.catch_warnings(record=True) as caught:
+            warnings.simplefilter('always', UnreachableWarning)
+            ctx = run_pipeline(source, cache_dir, entry_points,
+                               warn_unreachable,
+                               diagnostics if all_errors else None)
+    except errors.BaseException as e:
+        diagnostics.append(e)
+    if diagnostics:
+        failed = error_response(diagnostics[0])
+        if all_errors:
+            failed['errors'] = [
+                error_response(error)['error'] for error in diagnostics
+            ]
+        return failed
+
+    response: Message = {
+        'ok': True,
+        'declarations': [node.name for node in ctx.ast_root],
+    }
+    if cache_dir is not None:
+        response['rechecked'] = sorted(ctx.rechecked)
+    if caught:
+        response['warnings'] = [str(warning.message) for warning in caught]
+    return response
+
+
+def compile_request(request: Message) -> Message:
+    source = request.get('source')
+    cache_dir = request.get('cache_dir')
+    entry_points = request.get('entry_points', [])
+    warn_unreachable = request.get('warn_unreachable', False)
+    all_errors = request.get('all_errors', False)
+    if (not isinstance(source, str) or not isinstance(cache_dir,
+                                                      (str, type(None)))
+            or not isinstance(entry_points, list)
+            or not all(isinstance(name, str) for name in entry_points)
+            or not isinstance(warn_unreachable, bool)
+            or not isinstance(all_errors, bool)):
+        return error_response(
+            ProtocolError(
+                'Requests need a "source" string, and optionally a'
+                ' "cache_dir" string, an "entry_points" list of strings,'
+                ' and "warn_unreachable" and "all_errors" booleans'))
+    return compile_source(source, cache_dir, entry_points, warn_unreachable,
+                          all_errors)
+
+
+def warm_up():
+    """Compile a small program, so that the first real compile in this
+    process doesn't pay for anything done lazily"""
+    compile_source('function main(): int64 { return 1 + 2; }')
@@ -1,5 +1,42 @@
+from typing import Any
+
+
 class BaseException(Exception):
-    pass
+    """An error in the program being compiled
+
+    An error can keep what it is about in fields: the node it was found at,
+    the expected and actual types, and any other values its message needs.
+    Then the message is a format string that is only filled in with the
+    fields when it is shown, so creating an error doesn't pay for printing
+    expressions and types that nobody reads. Without fields, the message is
+    used as is.
+    """
+    def __init__(self,
+                 message: str,
+                 *,
+                 node: Any = None,
+                 expected: Any = None,
+                 actual: Any = None,
+                 **fields: Any):
+        super().__init__(message)
+        self.node = node
+        self.expected = expected
+        self.actual = actual
+        self.fields = fields
+
+    @property
+    def message(self) -> str:
+        template = self.args[0]
+        if (self.node is None and self.expected is None and self.actual is None
+                and not self.fields):
+            return template
+        return template.format(node=self.node,
+                               expected=self.expected,
+                               actual=self.actual,
+                               **self.fields)
+
+    def __str__(self) -> str:
+        return self.message
 
 
 class TypeError(BaseException):
@@ -12,3 +49,11 @@ class ReferenceError(BaseException):
 
 class SyntaxError(BaseException):
     pass
+
+
+class ArithmeticError(BaseException):
+    pass
+
+
+class ConstantError(BaseException):
+    pass
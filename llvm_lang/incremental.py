@@ -0,0 +1,274 @@
+"""Incremental compilation
+
+Every build fingerprints each top-level declaration and records which names
+it depends on. The fingerprints and the dependency graph are saved in a cache
+directory along with each type checked function, and the next build only runs
+the type checking passes on functions that changed or whose dependencies did.
+
+A function depends on the interface of what it uses, not on its text: a
+function has to be checked again if the signature of a function it calls
+changes, but not if only that function's body does. The interface of a type
+declaration is the whole declaration, and changes to it propagate through
+every interface that mentions the type.
+"""
+import hashlib
+import os
+import pickle
+from contextlib import suppress
+from dataclasses import dataclass, field, replace
+from typing import Any, Dict, FrozenSet, Iterable, List, Optional, Set, Tuple
+
+from llvm_lang import ast, types
+from llvm_lang.ast.iter import walk
+from llvm_lang.compiler import Compiler, passes
+from llvm_lang.passes.check_types import CheckTypesContext
+from llvm_lang.passes.generate_ir import generate_ir
+from llvm_lang.passes.inline_functions import inline_functions
+from llvm_lang.passes.prune_unreachable import references
+from llvm_lang.passes.resolve_declared_types import ResolveDeclaredTypesContext
+from llvm_lang.passes.validate_semantics import (validate_declarations,
+                                                 validate_semantics)
+from llvm_lang.passes.verify_declared_types import verify_declared_types
+
+FORMAT_VERSION = 1
+
+front_end = Compiler(passes=[
+    pass_ for pass_ in passes[:passes.index(verify_declared_types) + 1]
+    if pass_ is not validate_semantics
+])
+# inlining would copy functions into callers that aren't checked again when
+# only the functions' bodies change, and code is generated for the whole
+# program rather than the functions being checked
+check = Compiler(
+    passes=(validate_declarations, ) +
+    tuple(pass_ for pass_ in passes[passes.index(verify_declared_types) + 1:]
+          if pass_ not in (inline_functions, generate_ir)))
+
+
+@dataclass
+class DeclarationRecord:
+    fingerprint: str
+    # fingerprint of the part of the declaration other declarations rely on
+    interface: str
+    # top-level names referenced anywhere in the declaration
+    dependencies: FrozenSet[str]
+    # top-level names referenced in the interface
+    interface_dependencies: FrozenSet[str]
+
+
+DependencyGraph = Dict[str, DeclarationRecord]
+
+
+@dataclass
+class CheckedFunction:
+    # fingerprint of the declaration this was checked from
+    fingerprint: str
+    node: ast.FunctionDeclaration
+    expression_types: List[Tuple[ast.Node, types.Type]]
+
+
+@dataclass
+class IncrementalContext(CheckTypesContext):
+    # names of the functions that were type checked in this build
+    rechecked: Set[str] = field(default_factory=set)
+
+
+def fingerprint(node: ast.Node) -> str:
+    return hashlib.sha1(str(node).encode()).hexdigest()
+
+
+def interface(node: ast.Declaration) -> ast.Node:
+    if isinstance(node, ast.FunctionDeclaration):
+        return replace(node, body=[])
+    if isinstance(node, ast.VariableDeclaration):
+        return ast.FunctionParameter(name=node.name, type=node.type)
+    return node
+
+
+def record(node: ast.Declaration, names: Set[str],
+           previous: Optional[DeclarationRecord]) -> DeclarationRecord:
+    node_fingerprint = fingerprint(node)
+    # the dependencies of an unchanged declaration are still the same: any
+    # name added since would be shadowed by a local
+    if previous is not None and previous.fingerprint == node_fingerprint:
+        return previous
+    node_interface = interface(node)
+    return DeclarationRecord(
+        fingerprint=node_fingerprint,
+        interface=fingerprint(node_interface),
+        dependencies=references(node, names) - {node.name},
+        interface_dependencies=references(node_interface, names) - {node.name})
+
+
+def changed_interfaces(old: DependencyGraph, new: DependencyGraph) -> Set[str]:
+    """Names whose interface changed, directly or through the interface of
+    something it depends on, including names that were added or removed"""
+    changed = {
+        name
+        for name in old.keys() | new.keys() if name not in old
+        or name not in new or old[name].interface != new[name].interface
+    }
+
+    dependents: Dict[str, List[str]] = {}
+    for name, rec in new.items():
+        for dependency in rec.interface_dependencies:
+            dependents.setdefault(dependency, []).append(name)
+
+    stack = list(changed)
+    while stack:
+        for dependent in dependents.get(stack.pop(), ()):
+            if dependent not in changed:
+                changed.add(dependent)
+                stack.append(dependent)
+    return changed
+
+
+def load(path: str, version: Any = FORMAT_VERSION) -> Any:
+    """Load what `save` saved at `path`, or None if there is nothing there or
+    it can't be read"""
+    try:
+        with open(path, 'rb') as f:
+            saved_version, value = pickle.load(f)
+    except (OSError, EOFError, pickle.UnpicklingError, ValueError):
+        return None
+    return value if saved_version == version else None
+
+
+def save(path: str, value: Any):
+    # written to a temporary file first so an interrupted build doesn't leave
+    # a truncated file behind
+    temporary = f'{path}.{os.getpid()}.tmp'
+    with open(temporary, 'wb') as f:
+        pickle.dump((FORMAT_VERSION, value), f, pickle.HIGHEST_PROTOCOL)
+    os.replace(temporary, path)
+
+
+def collect_expression_types(
+    node: ast.Node, expression_types: Dict[int, types.Type]
+) -> List[Tuple[ast.Node, types.Type]]:
+    return [(child, expression_types[id(child)]) for child in walk(node)
+            if id(child) in expression_types]
+
+
+class IncrementalCompiler:
+    """Compiles a program, reusing the results of earlier compilations for
+    the functions that didn't change
+
+    Results are kept in memory between calls to `compile`, and saved in
+    `cache_dir` for the next process: the dependency graph in one file, and
+    each function in a file of its own, so a build only writes the functions
+    it checked.
+    """
+    def __init__(self, cache_dir: str):
+        self.cache_dir = cache_dir
+        self.graph: Optional[DependencyGraph] = None
+        self.functions: Dict[str, CheckedFunction] = {}
+
+    @property
+    def graph_path(self) -> str:
+        return os.path.join(self.cache_dir, 'graph.pickle')
+
+    def function_path(self, name: str) -> str:
+        return os.path.join(self.cache_dir, 'functions', f'{name}.pickle')
+
+    def load_graph(self) -> DependencyGraph:
+        if self.graph is None:
+            self.graph = load(self.graph_path) or {}
+        return self.graph
+
+    def checked_function(self, name: str,
+                         rec: DeclarationRecord) -> Optional[CheckedFunction]:
+        function = self.functions.get(name)
+        if function is None:
+            function = load(self.function_path(name))
+        if function is None or function.fingerprint != rec.fingerprint:
+            return None
+        return function
+
+    def dirty_functions(self, program: Iterable[ast.Declaration],
+                        old: DependencyGraph,
+                        new: DependencyGraph) -> Set[str]:
+        changed = changed_interfaces(old, new)
+        dirty = set()
+        for node in program:
+            if not isinstance(node, ast.FunctionDeclaration):
+                continue
+            current = new[node.name]
+            if (node.name not in old
+                    or old[node.name].fingerprint != current.fingerprint
+                    or current.dependencies & changed):
+                dirty.add(node.name)
+        return dirty
+
+    def save(self, graph: DependencyGraph, dirty: Set[str]):
+        os.makedirs(os.path.join(self.cache_dir, 'functions'), exist_ok=True)
+        for name in dirty:
+            save(self.function_path(name), self.functions[name])
+        for name in self.load_graph().keys() - graph.keys():
+            with suppress(FileNotFoundError):
+                os.remove(self.function_path(name))
+        save(self.graph_path, graph)
+        self.graph = graph
+
+    def compile(self, source: str) -> IncrementalContext:
+        ctx: ResolveDeclaredTypesContext = front_end.compile(source)
+        program = ctx.ast_root
+        old = self.load_graph()
+        # names from the last build count too, so that uses of a removed
+        # declaration are checked again
+        names = {node.name for node in program} | old.keys()
+        new = {
+            node.name: record(node, names, old.get(node.name))
+            for node in program
+        }
+        if len(new) != len(program):
+            # duplicate names are an error, which checking everything reports
+            old = {}
+
+        dirty = self.dirty_functions(program, old, new)
+        reused = {}
+        for node in program:
+            if (isinstance(node, ast.FunctionDeclaration)
+                    and node.name not in dirty):
+                function = self.checked_function(node.name, new[node.name])
+                if function is None:
+                    dirty.add(node.name)
+                else:
+                    reused[node.name] = function
+
+        # global variables and types are cheap to check, and the functions
+        # being checked may need them, so they are always included
+        checked_ctx = check.compile(
+            ResolveDeclaredTypesContext(ast_root=ast.Program(
+                node for node in program
+                if not isinstance(node, ast.FunctionDeclaration)
+                or node.name in dirty),
+                                        declared_types=ctx.declared_types))
+        checked = {node.name: node for node in checked_ctx.ast_root}
+
+        ast_root = ast.Program()
+        expression_types = dict(checked_ctx.expression_types)
+        functions = {}
+        for node in program:
+            if not isinstance(node, ast.FunctionDeclaration):
+                ast_root.append(checked[node.name])
+                continue
+            if node.name in dirty:
+                function = CheckedFunction(
+                    fingerprint=new[node.name].fingerprint,
+                    node=checked[node.name],
+                    expression_types=collect_expression_types(
+                        checked[node.name], checked_ctx.expression_types))
+            else:
+                function = reused[node.name]
+                expression_types.update(
+                    (id(child), ty) for child, ty in function.expression_types)
+            functions[node.name] = function
+            ast_root.append(function.node)
+
+        self.functions = functions
+        self.save(new, dirty)
+        return IncrementalContext(ast_root=ast_root,
+                                  declared_types=ctx.declared_types,
+                                  expression_types=expression_types,
+                                  rechecked=dirty)
@@ -0,0 +1,155 @@
+import json
+import os
+import time
+import tracemalloc
+from dataclasses import asdict, dataclass, field
+from typing import Any, Dict, List, Optional, TextIO
+
+from llvm_lang import ast
+from llvm_lang.ast.iter import walk
+from llvm_lang.passes import Pass
+
+
+def count_nodes(value: Any) -> Optional[int]:
+    """Count the AST nodes in a pass's input or output, if it has any"""
+    root = getattr(value, 'ast_root', value)
+    if not isinstance(root, ast.Node):
+        return None
+    return sum(1 for _ in walk(root))
+
+
+@dataclass
+class PassRecord:
+    name: str
+    # seconds since the first pass started
+    start: float
+    wall_time: float
+    cpu_time: float
+    # bytes allocated at the peak of the pass, beyond what it started with
+    peak_memory: Optional[int] = None
+    input_nodes: Optional[int] = None
+    output_nodes: Optional[int] = None
+
+
+@dataclass
+class Instrumentation:
+    """Measures each pass a `Compiler` runs
+
+    Tracing allocations slows passes down noticeably, so timings are only
+    comparable between runs with the same settings.
+    """
+    memory: bool = True
+    node_counts: bool = True
+    records: List[PassRecord] = field(default_factory=list)
+    epoch: Optional[float] = None
+
+    def run_pass(self, input_: Any, pass_: Pass) -> Any:
+        input_nodes = count_nodes(input_) if self.node_counts else None
+
+        trace_memory = self.memory and not tracemalloc.is_tracing()
+        if trace_memory:
+            # a new trace's peak starts from nothing
+            tracemalloc.start()
+        elif self.memory and hasattr(tracemalloc, 'reset_peak'):
+            # someone else is tracing; before Python 3.9 their peak can't be
+            # reset, so it may predate the pass
+            tracemalloc.reset_peak()
+        if self.memory:
+            baseline, _ = tracemalloc.get_traced_memory()
+
+        wall_start = time.perf_counter()
+        cpu_start = time.process_time()
+        try:
+            output = pass_(input_)
+        finally:
+            cpu_time = time.process_time() - cpu_start
+            wall_time = time.perf_counter() - wall_start
+            if self.memory:
+                _, peak = tracemalloc.get_traced_memory()
+            if trace_memory:
+                tracemalloc.stop()
+
+        if self.epoch is None:
+            self.epoch = wall_start
+        self.records.append(
+            PassRecord(name=getattr(pass_, '__name__', repr(pass_)),
+                       start=wall_start - self.epoch,
+                       wall_time=wall_time,
+                       cpu_time=cpu_time,
+                       peak_memory=peak - baseline if self.memory else None,
+                       input_nodes=input_nodes,
+                       output_nodes=count_nodes(output)
+                       if self.node_counts else None))
+        return output
+
+    @property
+    def wall_time(self) -> float:
+        return sum(record.wall_time for record in self.records)
+
+    @property
+    def cpu_time(self) -> float:
+        return sum(record.cpu_time for record in self.records)
+
+    def report(self) -> str:
+        """Format the records like LLVM's -time-passes report"""
+        rule = '===' + '-' * 73 + '==='
+        title = '... Pass execution timing report ...'
+        lines = [
+            rule,
+            title.center(len(rule)).rstrip(),
+            rule,
+            f'  Total Execution Time: {self.cpu_time:.4f} seconds'
+            f' ({self.wall_time:.4f} wall clock)',
+            '',
+            '   ---User+System---   ---Wall Time---  ---Peak Memory---'
+            '  ---Nodes In/Out---  --- Name ---',
+        ]
+
+        def percent(part, total):
+            return part / total * 100 if total else 0.0
+
+        def optional(value, fmt):
+            return '-' if value is None else format(value, fmt)
+
+        records = sorted(self.records,
+                         key=lambda record: record.wall_time,
+                         reverse=True)
+        for record in records + [None]:
+            if record is None:
+                name, cpu, wall = 'Total', self.cpu_time, self.wall_time
+                memory = nodes = ''
+            else:
+                name, cpu, wall = record.name, record.cpu_time, \
+                    record.wall_time
+                memory = optional(record.peak_memory, ',d')
+                nodes = (f'{optional(record.input_nodes, "d")}/'
+                         f'{optional(record.output_nodes, "d")}')
+            lines.append(
+                f'   {cpu:.4f} ({percent(cpu, self.cpu_time):5.1f}%)'
+                f'   {wall:.4f} ({percent(wall, self.wall_time):5.1f}%)'
+                f'  {memory:>17}  {nodes:>18}  {name}')
+        return '\n'.join(lines)
+
+    def chrome_trace(self) -> Dict[str, Any]:
+        """The records as Chrome trace events, for chrome://tracing or
+        Perfetto"""
+        pid = os.getpid()
+        events = []
+        for record in self.records:
+            args = asdict(record)
+            for key in ('name', 'start', 'wall_time'):
+                del args[key]
+            events.append({
+                'name': record.name,
+                'cat': 'pass',
+                'ph': 'X',
+                'ts': record.start * 1e6,
+                'dur': record.wall_time * 1e6,
+                'pid': pid,
+                'tid': 0,
+                'args': args,
+            })
+        return {'traceEvents': events, 'displayTimeUnit': 'ms'}
+
+    def write_chrome_trace(self, file: TextIO):
+        json.dump(self.chrome_trace(), file)
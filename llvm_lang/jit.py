@@ -0,0 +1,334 @@
+"""Running compiled programs in this process
+
+A `JIT` compiles the module generate_ir leaves on the context, or the one
+optimize_ir leaves if it ran, with LLVM's MCJIT, and gives back a `Program`
+whose functions can be called from Python. Programs are cached by a hash of
+their IR, so loading the same program again doesn't go through LLVM at all.
+
+Every function is called through a wrapper that takes a pointer to a struct
+of its arguments and a pointer to where its result goes, so values cross
+between Python and LLVM through memory laid out like C structs, and never
+depend on how the platform passes aggregates by value. Integers, floats and
+bools are Python ints, floats and bools. Arrays, slices, tuples and structs
+are tuples of their elements or fields, in order, like the values
+evaluate_globals finds. Enums are the index of their variant.
+"""
+import ctypes
+import hashlib
+from functools import singledispatch
+from operator import itemgetter
+from typing import Any, Callable, Dict, List, Optional, Union
+
+from llvmlite import binding as llvm
+from llvmlite import ir
+
+from llvm_lang import ast, types
+from llvm_lang.object_cache import ObjectCache
+from llvm_lang.passes.compile_objects import CompileObjectsContext
+from llvm_lang.passes.generate_ir import (GenerateIRContext, concrete,
+                                          function_type)
+from llvm_lang.passes.optimize_ir import (OptimizeIRContext, parse,
+                                          target_machine)
+from llvm_lang.types.layout import LayoutEngine
+from llvm_lang.types.lower import TypeLowering
+
+__all__ = ('JIT', 'Program')
+
+# the suffix of the wrappers that are called from Python, which can't clash
+# with a name from source
+WRAPPER = '.python'
+
+layouts = LayoutEngine()
+
+# the contexts a program can be loaded from
+Loadable = Union[GenerateIRContext, OptimizeIRContext, CompileObjectsContext]
+
+# keyed by repr, since arrays compare equal to slices of the same elements
+ctypes_by_repr: Dict[str, Any] = {}
+
+
+def ctype(ty: types.Type) -> Any:
+    """The ctypes type laid out like the LLVM type `ty` lowers to"""
+    key = repr(ty)
+    c = ctypes_by_repr.get(key)
+    if c is None:
+        c = ctypes_by_repr[key] = _ctype(concrete(ty))
+    return c
+
+
+@singledispatch
+def _ctype(ty: types.Type) -> Any:
+    raise TypeError(f'{ty} values cannot be passed to or from Python')
+
+
+@_ctype.register
+def _ctype_int(ty: types.IntType) -> Any:
+    if ty.size > 64:
+        raise TypeError(f'{ty} values cannot be passed to or from Python')
+    return getattr(ctypes, f'c_{"" if ty.signed else "u"}int{ty.size}')
+
+
+@_ctype.register
+def _ctype_float(ty: types.FloatType) -> Any:
+    return ctypes.c_float if ty.size == 32 else ctypes.c_double
+
+
+@_ctype.register
+def _ctype_bool(ty: types.BoolType) -> Any:
+    return ctypes.c_bool
+
+
+@_ctype.register
+def _ctype_symbol(ty: types.SymbolType) -> Any:
+    return ctypes.c_size_t
+
+
+@_ctype.register
+def _ctype_enum(ty: types.EnumType) -> Any:
+    return getattr(ctypes, f'c_uint{8 * layouts.size_of(ty)}')
+
+
+def struct(name: str, fields: List[Any]) -> Any:
+    return type(name, (ctypes.Structure, ),
+                {'_fields_': [(f'_{i}', ty) for i, ty in enumerate(fields)]})
+
+
+@_ctype.register
+def _ctype_struct(ty: types.StructType) -> Any:
+    return struct(str(ty),
+                  [ctype(field) for field in map(itemgetter(1), ty.fields)])
+
+
+@_ctype.register
+def _ctype_tuple(ty: types.TupleType) -> Any:
+    return struct(str(ty), [ctype(element) for element in ty.elements])
+
+
+@_ctype.register
+def _ctype_array(ty: types.ArrayType) -> Any:
+    return ctype(ty.element_type) * ty.length
+
+
+@_ctype.register
+def _ctype_slice(ty: types.SliceType) -> Any:
+    return struct(str(ty),
+                  [ctypes.c_int32,
+                   ctypes.POINTER(ctype(ty.element_type))])
+
+
+def to_c(value: Any, ty: types.Type, keep: List[Any]) -> Any:
+    """Convert `value` to something that can be stored in a `ctype(ty)`
+
+    The elements of slices are put in `keep`, which has to outlive the call
+    that uses the result.
+    """
+    ty = concrete(ty)
+    if isinstance(ty, types.ArrayType):
+        return ctype(ty)(*(to_c(v, ty.element_type, keep) for v in value))
+    if isinstance(ty, types.SliceType):
+        element_type = ctype(ty.element_type)
+        elements = (element_type * len(value))(*(to_c(v, ty.element_type, keep)
+                                                 for v in value))
+        keep.append(elements)
+        return ctype(ty)(len(value),
+                         ctypes.cast(elements, ctypes.POINTER(element_type)))
+    if isinstance(ty, types.StructType):
+        return ctype(ty)(*(to_c(v, field_type, keep)
+                           for v, (_, field_type) in zip(value, ty.fields)))
+    if isinstance(ty, types.TupleType):
+        return ctype(ty)(*(to_c(v, element, keep)
+                           for v, element in zip(value, ty.elements)))
+    return value
+
+
+def from_c(value: Any, ty: types.Type) -> Any:
+    """Convert `value`, read from a `ctype(ty)`, to a Python value"""
+    ty = concrete(ty)
+    if isinstance(ty, types.ArrayType):
+        return tuple(from_c(v, ty.element_type) for v in value)
+    if isinstance(ty, types.SliceType):
+        return tuple(
+            from_c(value._1[i], ty.element_type) for i in range(value._0))
+    if isinstance(ty, types.StructType):
+        return tuple(
+            from_c(getattr(value, f'_{i}'), field_type)
+            for i, (_, field_type) in enumerate(ty.fields))
+    if isinstance(ty, types.TupleType):
+        return tuple(
+            from_c(getattr(value, f'_{i}'), element)
+            for i, element in enumerate(ty.elements))
+    return value
+
+
+def define_wrapper(module: ir.Module, lowering: TypeLowering,
+                   function: ir.Function, ty: types.FunctionType):
+    """Define ``void name.python({params...}* args, ret* result)``"""
+    arguments_type = ir.LiteralStructType(
+        [lowering.lower(param) for param in map(itemgetter(1), ty.parameters)])
+    return_type = lowering.lower(ty.return_type)
+    result_type = ir.IntType(8) if isinstance(concrete(ty.return_type),
+                                              types.VoidType) else return_type
+    wrapper = ir.Function(
+        module,
+        ir.FunctionType(
+            ir.VoidType(),
+            [arguments_type.as_pointer(),
+             result_type.as_pointer()]), function.name + WRAPPER)
+    arguments, result = wrapper.args
+    builder = ir.IRBuilder(wrapper.append_basic_block())
+    zero = ir.Constant(ir.IntType(32), 0)
+    value = builder.call(function, [
+        builder.load(
+            builder.gep(arguments, [zero, ir.Constant(ir.IntType(32), i)]))
+        for i in range(len(ty.parameters))
+    ])
+    if result_type is return_type:
+        builder.store(value, result)
+    builder.ret_void()
+
+
+class Program:
+    """A program compiled into this process
+
+    Its engine owns the machine code, so the functions it gives out refer to
+    it to keep it alive.
+    """
+    def __init__(self, engine: llvm.ExecutionEngine,
+                 signatures: Dict[str, types.FunctionType]):
+        self.engine = engine
+        self.signatures = signatures
+        self.functions: Dict[str, Callable[..., Any]] = {}
+
+    def __getitem__(self, name: str) -> Callable[..., Any]:
+        return self.function(name)
+
+    def function(self, name: str) -> Callable[..., Any]:
+        function = self.functions.get(name)
+        if function is None:
+            function = self.functions[name] = self.wrap(name)
+        return function
+
+    def wrap(self, name: str) -> Callable[..., Any]:
+        ty = self.signatures[name]
+        parameter_types = [param for _, param in ty.parameters]
+        arguments_type = struct(f'{name}.arguments',
+                                [ctype(param) for param in parameter_types])
+        returns = not isinstance(concrete(ty.return_type), types.VoidType)
+        result_type = ctype(ty.return_type) if returns else ctypes.c_uint8
+        address = self.engine.get_function_address(name + WRAPPER)
+        call = ctypes.CFUNCTYPE(None, ctypes.POINTER(arguments_type),
+                                ctypes.POINTER(result_type))(address)
+
+        def function(*args):
+            if len(args) != len(parameter_types):
+                raise TypeError(f'{name}() takes {len(parameter_types)}'
+                                f' arguments but {len(args)} were given')
+            keep: List[Any] = []
+            arguments = arguments_type(
+                *(to_c(arg, param, keep)
+                  for arg, param in zip(args, parameter_types)))
+            result = result_type()
+            call(ctypes.byref(arguments), ctypes.byref(result))
+            if not returns:
+                return None
+            if not isinstance(result, (ctypes.Structure, ctypes.Array)):
+                result = result.value
+            return from_c(result, ty.return_type)
+
+        function.__name__ = function.__qualname__ = name
+        setattr(function, 'program', self)
+        return function
+
+
+class JIT:
+    """Compiles programs with MCJIT, and keeps every program it compiled, by
+    the hash of its IR
+
+    With an `object_cache`, machine code is also kept on disk, and reused by
+    any JIT using the same cache directory.
+    """
+    def __init__(self, object_cache: Optional[ObjectCache] = None):
+        self.object_cache = object_cache
+        self.programs: Dict[str, Program] = {}
+
+    def load(self, ctx: Loadable) -> Program:
+        """The program for the module `ctx` holds, optimized if optimize_ir
+        ran, or the object files compile_objects made, and the prelude's
+        module if it was compiled with one
+
+        Machine code is generated at the speed level the module was optimized
+        at, or -O2 if it wasn't.
+        """
+        objects: List[bytes] = []
+        if isinstance(ctx, CompileObjectsContext) and ctx.objects:
+            objects = ctx.objects
+            texts = [ctx.globals_module]
+            level = ctx.speed_level
+        elif isinstance(ctx, OptimizeIRContext) and ctx.optimized is not None:
+            texts = [str(ctx.optimized)]
+            level = ctx.optimization.speed_level
+        else:
+            texts = [str(ctx.module)]
+            level = 2
+        prelude = ctx.prelude
+        if prelude is not None:
+            texts.insert(0, str(prelude.ctx.module))
+
+        digest = hashlib.sha256('\0'.join([str(level)] + texts).encode())
+        for data in objects:
+            digest.update(data)
+        key = digest.hexdigest()
+        program = self.programs.get(key)
+        if program is None:
+            program = self.programs[key] = self.compile(
+                ctx, texts, objects, level)
+        return program
+
+    def compile(self, ctx: Loadable, texts: List[str], objects: List[bytes],
+                level: int) -> Program:
+        signatures = {}
+        wrappers = ir.Module(name='python', context=ir.Context())
+        lowering = TypeLowering(wrappers.context)
+        nodes = list(ctx.ast_root)
+        if ctx.prelude is not None:
+            nodes.extend(ctx.prelude.ctx.ast_root)
+        for node in nodes:
+            if isinstance(node, ast.FunctionDeclaration):
+                ty = signatures[node.name] = function_type(node)
+                declaration = ir.Function(wrappers, lowering.function_type(ty),
+                                          node.name)
+                define_wrapper(wrappers, lowering, declaration, ty)
+
+        texts = texts + [str(wrappers)]
+        machine = target_machine(level)
+        modules = [parse(text, machine) for text in texts]
+        # static constructors run in the order the modules were added, so the
+        # prelude's globals are initialized first
+        engine = llvm.create_mcjit_compiler(modules[0], machine)
+        for module in modules[1:]:
+            engine.add_module(module)
+        for data in objects:
+            engine.add_object_file(llvm.ObjectFileRef.from_data(data))
+        if self.object_cache is not None:
+            self.object_cache.attach(
+                engine, {
+                    id(module): self.object_cache.key(text, machine, level)
+                    for module, text in zip(modules, texts)
+                })
+        engine.finalize_object()
+        engine.run_static_constructors()
+        return Program(engine, signatures)
+
+
+def load(ctx: GenerateIRContext, jit: Optional[JIT] = None) -> Program:
+    """Load the program `ctx` holds into `jit`, or a JIT shared by every
+    caller"""
+    global default_jit
+    if jit is None:
+        if default_jit is None:
+            default_jit = JIT()
+        jit = default_jit
+    return jit.load(ctx)
+
+
+default_jit: Optional[JIT] = None
@@ -0,0 +1,95 @@
+"""Caching machine code on disk
+
+An `ObjectCache` keeps the object files MCJIT generates in a directory, by a
+hash of the IR they were generated from, the target triple, the host CPU and
+its features, the speed level of the code generator and the version of LLVM.
+When the JIT compiles a module with the same key again, LLVM loads the object
+file instead of generating code.
+
+The directory is kept under a size limit by removing the least recently used
+object files after each one is added.
+"""
+import hashlib
+import os
+from contextlib import suppress
+from typing import Dict, Optional
+
+from llvmlite import binding as llvm
+
+# object files are a few hundred bytes per function at most
+DEFAULT_MAX_SIZE = 256 * 1024 * 1024
+SUFFIX = '.o'
+
+
+class ObjectCache:
+    def __init__(self, cache_dir: str, max_size: int = DEFAULT_MAX_SIZE):
+        self.cache_dir = cache_dir
+        self.max_size = max_size
+        self.hits = 0
+        self.misses = 0
+        os.makedirs(cache_dir, exist_ok=True)
+
+    def key(self, text: str, machine: llvm.TargetMachine,
+            speed_level: int) -> str:
+        target = '\0'.join([
+            machine.triple,
+            llvm.get_host_cpu_name(),
+            llvm.get_host_cpu_features().flatten(),
+            str(speed_level),
+            '.'.join(map(str, llvm.llvm_version_info)),
+        ])
+        return hashlib.sha256(f'{target}\0{text}'.encode()).hexdigest()
+
+    def path(self, key: str) -> str:
+        return os.path.join(self.cache_dir, key + SUFFIX)
+
+    def load(self, key: str) -> Optional[bytes]:
+        path = self.path(key)
+        try:
+            with open(path, 'rb') as f:
+                data = f.read()
+            # the modification time records when it was last used
+            os.utime(path)
+        except OSError:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return data
+
+    def store(self, key: str, data: bytes):
+        path = self.path(key)
+        # written to a temporary file first so an interrupted build doesn't
+        # leave a truncated object file behind
+        temporary = f'{path}.{os.getpid()}.tmp'
+        with open(temporary, 'wb') as f:
+            f.write(data)
+        os.replace(temporary, path)
+        self.evict()
+
+    def evict(self):
+        """Remove the least recently used object files until the rest fit in
+        `max_size` bytes"""
+        entries = []
+        for entry in os.scandir(self.cache_dir):
+            if entry.name.endswith(SUFFIX):
+                with suppress(FileNotFoundError):
+                    stat = entry.stat()
+                    entries.append((stat.st_mtime, stat.st_size, entry.path))
+        size = sum(entry[1] for entry in entries)
+        for _, entry_size, path in sorted(entries):
+            if size <= self.max_size:
+                break
+            with suppress(FileNotFoundError):
+                os.remove(path)
+            size -= entry_size
+
+    def attach(self, engine: llvm.ExecutionEngine, keys: Dict[int, str]):
+        """Have `engine` use the cache for the modules it was given, which
+        are cached under ``keys[id(module)]``"""
+        def notify(module: llvm.ModuleRef, data: bytes):
+            self.store(keys[id(module)], data)
+
+        def get_buffer(module: llvm.ModuleRef) -> Optional[bytes]:
+            return self.load(keys[id(module)])
+
+        engine.set_object_cache(notify, get_buffer)
@@ -102,6 +102,7 @@ precedence = (
     ("left", "INDEX"),
     ("left", "DOT"),
     ("right", "UMINUS"),
+    ("left", "LEFT_PAREN", "LEFT_BRACKET"),
 )
 
 start = 'program'
@@ -153,7 +154,7 @@ def p_declaration_struct(t):
 def p_declaration_union(t):
     """declaration : UNION IDENTIFIER generic_params_opt LEFT_BRACE union_declaration_fields RIGHT_BRACE"""  # noqa
     t[0] = ast.UnionTypeDeclaration(name=t[2],
-                                    generic_parameters=t[3],
+                                    generic_parameters=t[3] or [],
                                     variants=t[5])
 
 
@@ -164,7 +165,7 @@ def p_declaration_enum(t):
 
 def p_parameter_list_list(t):
     """parameter_list : IDENTIFIER COLON type COMMA parameter_list"""
-    t[0] = [ast.FunctionParameter(name=t[1], type=t[3])] + t[4]
+    t[0] = [ast.FunctionParameter(name=t[1], type=t[3])] + t[5]
 
 
 def p_parameter_list_item(t):
@@ -213,7 +214,7 @@ def p_type_tuple(t):
 def p_type_array(t):
     # FIXME: support variable length
     """type : type LEFT_BRACKET INTEGER RIGHT_BRACKET"""
-    t[0] = ast.ArrayTypeExpression(element_type=t[1], length=t[3])
+    t[0] = ast.ArrayTypeExpression(element_type=t[1], length=int(t[3]))
 
 
 def p_type_slice(t):
@@ -300,7 +301,7 @@ def p_struct_declaration_fields(t):
 
 def p_struct_declaration_fields_repeat(t):
     """struct_declaration_fields : IDENTIFIER COLON type struct_declaration_fields"""  # noqa
-    t[0] = [ast.StructTypeField(name=t[1], type=t[3])] + t[3]
+    t[0] = [ast.StructTypeField(name=t[1], type=t[3])] + t[4]
 
 
 def p_union_declaration_field_symbol(t):
@@ -395,7 +396,7 @@ def p_expression_binop(t):
 
 def p_expression_group(t):
     "expression : LEFT_PAREN expression RIGHT_PAREN"
-    t[0] = t[1]
+    t[0] = t[2]
 
 
 def p_expression_uminus(t):
@@ -410,7 +411,7 @@ def p_expression_integer(t):
 
 def p_expression_real(t):
     "expression : REAL"
-    t[0] = ast.RealLiteral(float(t[1]))
+    t[0] = ast.FloatLiteral(float(t[1]))
 
 
 def p_expression_string(t):
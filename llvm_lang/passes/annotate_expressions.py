@@ -1,41 +1,125 @@
+from contextlib import contextmanager
 from dataclasses import dataclass
-from typing import Dict
+from functools import wraps
+from typing import TYPE_CHECKING, Dict, List, Optional, Union
 
-from llvm_lang import ast, types
-from llvm_lang.ast.map import MapAST
-from llvm_lang.ast.types import generate_type, infer_type
-from llvm_lang.scopes import Scopes
+from llvm_lang import ast, errors, types
+from llvm_lang.ast.types import ExpressionTypes, generate_type, infer_type
+from llvm_lang.scopes import Frames, Scopes
+from llvm_lang.types.instantiate import instantiate as instantiate_type
 
-from .resolve_declared_types import ResolveDeclaredTypesContext
+from . import Pass
+from .resolve_declared_types import ResolveDeclaredTypesContext, program_types
+from .resolve_names import ResolvedNames, ResolveNamesContext
+
+if TYPE_CHECKING:
+    from llvm_lang.session import Prelude
 
 
 @dataclass
 class AnnotateExpressionsContext:
     ast_root: ast.Program
     declared_types: Dict[str, types.Type]
+    expression_types: ExpressionTypes
+    names: Optional[ResolvedNames] = None
+    prelude: Optional['Prelude'] = None
+
 
+class AnnotateExpressionsVisitor(ast.Visitor):
+    """Infers the type of every expression, bottom up, into a side table
 
-class AnnotateExpressionsVisitor(MapAST):
-    def __init__(self, ctx: ResolveDeclaredTypesContext):
+    With a list of `diagnostics`, an error in an expression is added to it,
+    rather than raised, and the expression and the ones containing it are left
+    out of the side table. Inference carries on with the next statement.
+    """
+    def __init__(self,
+                 ctx: Union[ResolveDeclaredTypesContext, ResolveNamesContext],
+                 diagnostics: Optional[List[errors.BaseException]] = None):
+        super().__init__()
         self.ctx = ctx
-        self.scopes = Scopes[types.Type]()
+        self.diagnostics = diagnostics
+        prelude = ctx.prelude
+        self.type_scopes = Scopes(
+            program_types(ctx).items(),
+            parent=None if prelude is None else prelude.type_scopes)
+        self.expression_types: ExpressionTypes = {}
+        self.return_types: List[types.Type] = []
+        if isinstance(ctx, ResolveNamesContext):
+            # the prelude's functions and globals are typed already
+            self.scopes = Frames[types.Type](
+                ctx.resolutions, ctx.globals_size,
+                () if prelude is None else prelude.globals)
+        else:
+            self.scopes = Scopes[types.Type]()
+
+    def infer_type(self,
+                   node: ast.Expression,
+                   hint: Optional[types.Type] = None) -> Optional[types.Type]:
+        try:
+            return infer_type(node, self.scopes, hint, self.expression_types)
+        except errors.BaseException as e:
+            if self.diagnostics is None:
+                raise
+            self.diagnostics.append(e)
+            return None
+
+    def resolve_type(self, node: ast.TypeExpression) -> types.Type:
+        return instantiate_type(generate_type(node), {}, self.type_scopes)
+
+    def function_type(self, name: str) -> types.FunctionType:
+        fn_type = self.ctx.declared_types[name]
+        if not fn_type.type_parameters:
+            fn_type = instantiate_type(fn_type, {}, self.type_scopes)
+        return fn_type
+
+    @contextmanager
+    def function_scope(self, node: ast.FunctionDeclaration):
+        if isinstance(self.scopes, Frames):
+            with self.scopes.new_frame(self.ctx.frame_sizes[id(node)]):
+                yield
+        else:
+            with self.scopes.new_scope():
+                yield
+
+    def visit_Program(self, node: ast.Program):
+        # functions can be called before they are declared, or from other
+        # files. With frames, only the functions this program refers to are
+        # bound, so a file in a large project doesn't pay for instantiating
+        # the signature of every function in it
+        if isinstance(self.scopes, Frames):
+            used = {
+                binding.slot
+                for binding in self.ctx.resolutions.values()
+                if binding.depth == 0
+            }
+            for name, binding in self.ctx.functions.items():
+                if binding.slot in used:
+                    self.scopes.bind(binding, self.function_type(name))
+        else:
+            for name, fn_type in self.ctx.declared_types.items():
+                if isinstance(fn_type, types.FunctionType):
+                    self.scopes.add_binding(name, self.function_type(name))
+        self.generic_visit(node)
 
     def visit_FunctionDeclaration(self, node: ast.FunctionDeclaration):
-        self.scopes.add_binding(node.name, self.ctx.declared_types[node.name])
-        with self.scopes.new_scope():
-            result = super().visit_FunctionDeclaration(node)
-        return result
+        resolve_type = (generate_type
+                        if node.generic_parameters else self.resolve_type)
+        with self.function_scope(node):
+            for param in node.parameters:
+                self.scopes.declare(param, resolve_type(param.type))
+            self.return_types.append(resolve_type(node.return_type))
+            for statement in node.body:
+                self.visit(statement)
+            self.return_types.pop()
 
     def visit_VariableDeclaration(self, node: ast.VariableDeclaration):
-        variable_type = generate_type(node.type)
-        initializer = ast.TypedExpression(value=node.initializer,
-                                          type=infer_type(node.initializer,
-                                                          self.scopes,
-                                                          hint=variable_type))
-        self.scopes.add_binding(node.name, variable_type)
-        return ast.VariableDeclaration(name=node.name,
-                                       type=node.type,
-                                       initializer=initializer)
+        variable_type = self.resolve_type(node.type)
+        self.infer_type(node.initializer, hint=variable_type)
+        self.scopes.declare(node, variable_type)
+
+    def visit_ReturnStatement(self, node: ast.ReturnStatement):
+        if node.value is not None:
+            self.infer_type(node.value, hint=self.return_types[-1])
 
     # FIXME: add other statements
     # def visit_IfStatement(self, node: ast.IfStatement):
@@ -43,12 +127,39 @@ class AnnotateExpressionsVisitor(MapAST):
     #         super().visit_IfStatement(node)
 
     def visit_Expression(self, node: ast.Expression):
-        return ast.TypedExpression(value=node,
-                                   type=infer_type(node, self.scopes))
+        self.infer_type(node)
+
+    def visit_TypeExpression(self, node: ast.TypeExpression):
+        pass
+
+    def visit_TypeDeclaration(self, node: ast.TypeDeclaration):
+        pass
 
 
 def annotate_expressions(
-        ctx: ResolveDeclaredTypesContext) -> AnnotateExpressionsContext:
+    ctx: Union[ResolveDeclaredTypesContext, ResolveNamesContext],
+    diagnostics: Optional[List[errors.BaseException]] = None
+) -> AnnotateExpressionsContext:
+    visitor = AnnotateExpressionsVisitor(ctx, diagnostics)
+    visitor.visit(ctx.ast_root)
     return AnnotateExpressionsContext(
-        ast_root=AnnotateExpressionsVisitor(ctx).visit(ctx.ast_root),
-        declared_types=ctx.declared_types)
+        ast_root=ctx.ast_root,
+        declared_types=ctx.declared_types,
+        expression_types=visitor.expression_types,
+        names=ctx.names if isinstance(ctx, ResolveNamesContext) else None,
+        prelude=ctx.prelude)
+
+
+def annotate_expressions_collecting(
+    diagnostics: List[errors.BaseException]
+) -> Pass[Union[ResolveDeclaredTypesContext, ResolveNamesContext],
+          AnnotateExpressionsContext]:
+    """Make an annotate_expressions pass that adds every error to
+    `diagnostics`"""
+    @wraps(annotate_expressions)
+    def annotate_expressions_collecting(
+        ctx: Union[ResolveDeclaredTypesContext, ResolveNamesContext]
+    ) -> AnnotateExpressionsContext:
+        return annotate_expressions(ctx, diagnostics)
+
+    return annotate_expressions_collecting
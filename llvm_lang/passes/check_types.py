@@ -1,23 +1,48 @@
 from dataclasses import dataclass
-from typing import Dict, List
+from functools import wraps
+from typing import TYPE_CHECKING, Dict, List, Optional
 
 from llvm_lang import ast, types, errors
 from llvm_lang.ast import Visitor
+from llvm_lang.ast.types import ExpressionTypes
+from llvm_lang.passes import Pass
 from llvm_lang.passes.instantiate_type_expressions import \
     InstantiateTypeExpressionsContext
+from llvm_lang.passes.resolve_names import ResolvedNames
+
+if TYPE_CHECKING:
+    from llvm_lang.session import Prelude
 
 
 @dataclass
 class CheckTypesContext:
     ast_root: ast.Program
     declared_types: Dict[str, types.Type]
+    expression_types: ExpressionTypes
+    names: Optional[ResolvedNames] = None
+    prelude: Optional['Prelude'] = None
 
 
 class CheckTypesVisitor(Visitor):
-    def __init__(self, ctx: InstantiateTypeExpressionsContext):
+    """Checks that values have the types of what they are used as
+
+    With a list of `diagnostics`, every error is added to it, rather than
+    raised. Expressions that annotate_expressions couldn't type have had their
+    error reported already, so they aren't checked.
+    """
+    def __init__(self,
+                 ctx: InstantiateTypeExpressionsContext,
+                 diagnostics: Optional[List[errors.BaseException]] = None):
         super().__init__()
         self.ctx = ctx
+        self.expression_types = ctx.expression_types
         self.function_stack: List[ast.FunctionDeclaration] = []
+        self.diagnostics = diagnostics
+
+    def report(self, error: errors.BaseException):
+        if self.diagnostics is None:
+            raise error
+        self.diagnostics.append(error)
 
     @property
     def current_function(self):
@@ -29,45 +54,91 @@ class CheckTypesVisitor(Visitor):
         self.function_stack.pop()
 
     def visit_ReturnStatement(self, node: ast.ReturnStatement):
+        return_type = self.current_function.return_type
+        assert isinstance(return_type, ast.InstantiatedTypeExpression)
         if node.value is not None:
-            assert isinstance(node.value, ast.TypedExpression)
-            if node.value.type != self.current_function.return_type.type:
-                raise errors.TypeError(
-                    f'Returned value {node.value} is not '
-                    f'assignable to type {self.current_function.return_type}')
-        elif self.current_function.return_type is not None:
-            raise errors.TypeError(
-                'Cannot return void from function that '
-                f'returns {self.current_function.return_type}')
+            value_type = self.expression_types.get(id(node.value))
+            if value_type is not None and value_type != return_type.type:
+                self.report(
+                    errors.TypeError(
+                        'Returned value ({node})::{actual} is not assignable'
+                        ' to type {expected}',
+                        node=node.value,
+                        expected=return_type,
+                        actual=value_type))
+        elif not isinstance(return_type.type, types.VoidType):
+            self.report(
+                errors.TypeError(
+                    'Cannot return void from function that returns'
+                    ' {expected}',
+                    node=node,
+                    expected=return_type))
 
     def visit_VariableDeclaration(self, node: ast.VariableDeclaration):
-        assert isinstance(node.initializer, ast.TypedExpression)
         assert isinstance(node.type, ast.InstantiatedTypeExpression)
-        if node.initializer.type != node.type.type:
-            raise errors.TypeError(f'Cannot assign {node.initializer} to '
-                                   f'variable of type {node.type.type}')
+        initializer_type = self.expression_types.get(id(node.initializer))
+        if initializer_type is not None and initializer_type != node.type.type:
+            self.report(
+                errors.TypeError(
+                    'Cannot assign ({node})::{actual} to variable of type'
+                    ' {expected}',
+                    node=node.initializer,
+                    expected=node.type.type,
+                    actual=initializer_type))
 
     def visit_CallExpression(self, node: ast.CallExpression):
-        assert isinstance(node.target, ast.TypedExpression)
-        fn_type = node.target.type
+        if id(node) not in self.expression_types:
+            return
+        fn_type = self.expression_types[id(node.target)]
 
         args_len = len(node.args)
         params_len = len(fn_type.parameters)
         if args_len != params_len:
-            raise errors.TypeError(f'Expected {params_len} arguments to '
-                                   f'{fn_type.name}, got {args_len}')
+            self.report(
+                errors.TypeError(
+                    'Expected {expected} arguments to {function.name}, got'
+                    ' {actual}',
+                    node=node,
+                    expected=params_len,
+                    actual=args_len,
+                    function=fn_type))
+            return
 
         for i, argument in enumerate(node.args):
-            assert isinstance(argument, ast.TypedExpression)
+            argument_type = self.expression_types[id(argument)]
             param_type = fn_type.parameters[i][1]
-            if argument.type != param_type:
-                raise errors.TypeError('Cannot pass expression of type '
-                                       f'{argument.type} as argument {i + 1} '
-                                       f'of {fn_type.name}, expected '
-                                       f'expression of type {param_type}')
+            if argument_type != param_type:
+                self.report(
+                    errors.TypeError(
+                        'Cannot pass expression of type {actual} as argument'
+                        ' {position} of {function.name}, expected expression'
+                        ' of type {expected}',
+                        node=argument,
+                        expected=param_type,
+                        actual=argument_type,
+                        position=i + 1,
+                        function=fn_type))
 
 
-def check_types(ctx: InstantiateTypeExpressionsContext) -> CheckTypesContext:
-    CheckTypesVisitor(ctx).visit(ctx.ast_root)
+def check_types(
+    ctx: InstantiateTypeExpressionsContext,
+    diagnostics: Optional[List[errors.BaseException]] = None
+) -> CheckTypesContext:
+    CheckTypesVisitor(ctx, diagnostics).visit(ctx.ast_root)
     return CheckTypesContext(ast_root=ctx.ast_root,
-                             declared_types=ctx.declared_types)
+                             declared_types=ctx.declared_types,
+                             expression_types=ctx.expression_types,
+                             names=ctx.names,
+                             prelude=ctx.prelude)
+
+
+def check_types_collecting(
+    diagnostics: List[errors.BaseException]
+) -> Pass[InstantiateTypeExpressionsContext, CheckTypesContext]:
+    """Make a check_types pass that adds every error to `diagnostics`"""
+    @wraps(check_types)
+    def check_types_collecting(
+            ctx: InstantiateTypeExpressionsContext) -> CheckTypesContext:
+        return check_types(ctx, diagnostics)
+
+    return check_types_collecting
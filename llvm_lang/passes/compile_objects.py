@@ -0,0 +1,95 @@
+"""Generating machine code in worker processes
+
+Instead of one module, the program is generated as a module for its globals
+and a module for each of several groups of its functions (see `split_ir`).
+The function modules are optimized and compiled to object files in a
+process pool, one group per worker, and the JIT links the object files back
+together. Calls between groups go through external declarations, so
+functions are only inlined within their group.
+
+The globals' module is small, and kept as IR so the JIT runs its static
+constructors.
+"""
+import time
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field
+from functools import wraps
+from itertools import repeat
+from typing import List, Optional
+
+from llvm_lang.passes import Pass
+
+from .evaluate_globals import EvaluateGlobalsContext
+from .generate_ir import GenerateIRContext, split_ir
+from .optimize_ir import (OptimizationOptions, optimize_module, parse,
+                          target_machine)
+
+
+@dataclass
+class CompileObjectsContext(GenerateIRContext):
+    optimization: Optional[OptimizationOptions] = None
+    globals_module: str = ''
+    objects: List[bytes] = field(default_factory=list)
+    # seconds spent generating IR, and optimizing and compiling it
+    generate_time: float = 0.0
+    compile_time: float = 0.0
+
+    @property
+    def speed_level(self) -> int:
+        """The speed level machine code was generated at"""
+        if self.optimization is None:
+            return 2
+        return self.optimization.speed_level
+
+
+def compile_object(text: str, options: Optional[OptimizationOptions]) -> bytes:
+    """Optimize a module of IR with `options`, if there are any, and compile
+    it to an object file"""
+    machine = target_machine(2 if options is None else options.speed_level)
+    module = parse(text, machine)
+    if options is not None:
+        optimize_module(module, options, machine)
+    return machine.emit_object(module)
+
+
+def compile_objects(
+    ctx: EvaluateGlobalsContext,
+    workers: int,
+    options: Optional[OptimizationOptions] = None
+) -> CompileObjectsContext:
+    start = time.perf_counter()
+    globals_module, *modules = split_ir(ctx, workers)
+    texts = [str(module) for module in modules]
+    generated = time.perf_counter()
+
+    if workers == 1:
+        objects = [compile_object(texts[0], options)]
+    else:
+        with ProcessPoolExecutor(workers) as pool:
+            objects = list(pool.map(compile_object, texts, repeat(options)))
+
+    return CompileObjectsContext(ast_root=ctx.ast_root,
+                                 declared_types=ctx.declared_types,
+                                 expression_types=ctx.expression_types,
+                                 names=ctx.names,
+                                 prelude=ctx.prelude,
+                                 initial_values=ctx.initial_values,
+                                 runtime_initialized=ctx.runtime_initialized,
+                                 optimization=options,
+                                 globals_module=str(globals_module),
+                                 objects=objects,
+                                 generate_time=generated - start,
+                                 compile_time=time.perf_counter() - generated)
+
+
+def compile_objects_with(
+    workers: int,
+    options: Optional[OptimizationOptions] = None
+) -> Pass[EvaluateGlobalsContext, CompileObjectsContext]:
+    """Make a pass that compiles the program in `workers` processes, with
+    `options`"""
+    @wraps(compile_objects)
+    def pass_(ctx: EvaluateGlobalsContext) -> CompileObjectsContext:
+        return compile_objects(ctx, workers, options)
+
+    return pass_
@@ -0,0 +1,117 @@
+"""Removing code that can't affect what a program does
+
+Function bodies lose the statements after a `return`, `break` or `continue`,
+and the `let` bindings and expression statements whose values are never used
+and that can't have side effects. With entry points, functions they can't
+reach are removed too.
+"""
+import dataclasses
+from typing import Iterable, List, Optional
+
+from llvm_lang import ast
+from llvm_lang.ast import Op
+from llvm_lang.ast.iter import walk
+from llvm_lang.ast.map import MapAST
+from llvm_lang.ast.types import ExpressionTypes
+
+from . import Pass
+from .check_types import CheckTypesContext
+from .prune_unreachable import reachable
+from .resolve_names import ResolvedNames, rebind
+
+TERMINATORS = (ast.ReturnStatement, ast.BreakStatement, ast.ContinueStatement)
+
+
+def pure(node: ast.Expression) -> bool:
+    """Whether evaluating `node` only computes a value, without calling or
+    assigning anything"""
+    return not any(
+        isinstance(child, ast.CallExpression) or
+        (isinstance(child, ast.BinaryOperation) and child.op == Op.assign)
+        for child in walk(node))
+
+
+def forget(node: ast.Node,
+           expression_types: ExpressionTypes,
+           names: Optional[ResolvedNames] = None):
+    for child in walk(node):
+        expression_types.pop(id(child), None)
+        if names is not None:
+            names.resolutions.pop(id(child), None)
+            names.type_resolutions.pop(id(child), None)
+
+
+class EliminateDeadCodeVisitor(MapAST):
+    def __init__(self, ctx: CheckTypesContext):
+        super().__init__()
+        self.expression_types = ctx.expression_types
+        self.names = ctx.names
+
+    def rebuild(self, node: ast.Node, **fields) -> ast.Node:
+        new = super().rebuild(node, **fields)
+        rebind(self.names, node, new)
+        return new
+
+    def live_statements(self,
+                        body: List[ast.Statement]) -> List[ast.Statement]:
+        for i, statement in enumerate(body):
+            if isinstance(statement, TERMINATORS):
+                for dead in body[i + 1:]:
+                    forget(dead, self.expression_types, self.names)
+                body = body[:i + 1]
+                break
+
+        # a name is declared at most once in a body, so going backwards, a
+        # binding is used if any statement after it names it
+        used = set()
+        live = []
+        for statement in reversed(body):
+            if ((isinstance(statement, ast.VariableDeclaration)
+                 and statement.name not in used
+                 and pure(statement.initializer))
+                    or (isinstance(statement, ast.ExpressionStatement)
+                        and pure(statement.expr))):
+                forget(statement, self.expression_types, self.names)
+                continue
+            used.update(child.name for child in walk(statement)
+                        if isinstance(child, ast.Identifier))
+            live.append(statement)
+        live.reverse()
+        return live
+
+    def visit_FunctionDeclaration(self, node: ast.FunctionDeclaration):
+        return self.rebuild(node, body=self.live_statements(node.body))
+
+
+def eliminate_dead_code(ctx: CheckTypesContext) -> CheckTypesContext:
+    return CheckTypesContext(ast_root=EliminateDeadCodeVisitor(ctx).visit(
+        ctx.ast_root),
+                             declared_types=ctx.declared_types,
+                             expression_types=ctx.expression_types,
+                             names=ctx.names,
+                             prelude=ctx.prelude)
+
+
+def eliminate_dead_functions(
+    entry_points: Iterable[str]
+) -> Pass[CheckTypesContext, CheckTypesContext]:
+    """Make a pass that removes the functions `entry_points` can't reach
+
+    It runs after eliminate_dead_code, so functions only called from dead
+    code are removed too.
+    """
+    roots = frozenset(entry_points)
+
+    def eliminate_dead_functions(ctx: CheckTypesContext) -> CheckTypesContext:
+        names = reachable(ctx.ast_root, roots)
+        live = ast.Program()
+        for node in ctx.ast_root:
+            if (isinstance(node, ast.FunctionDeclaration)
+                    and node.name not in names):
+                forget(node, ctx.expression_types, ctx.names)
+            else:
+                live.append(node)
+        # it runs last, so keep whatever the passes before it added
+        return dataclasses.replace(ctx, ast_root=live)
+
+    return eliminate_dead_functions
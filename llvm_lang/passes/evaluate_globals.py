@@ -0,0 +1,281 @@
+"""Evaluating the initializers of global variables at compile time
+
+A global whose initializer only uses literals, arithmetic, other constant
+globals and calls to functions that can be evaluated with constant arguments
+gets a static initial value, so no code needs to run at startup to initialize
+it. A function call is evaluated by interpreting the function's body, which
+can only read its arguments and constant globals, and only assign its own
+locals.
+
+Integers and floats are Python ints and floats, computed the way
+fold_constants computes them. Arrays, tuples and structs are tuples of their
+elements or fields, in order.
+
+Any other global is left to be initialized at startup, with the reason why in
+`runtime_initialized`.
+"""
+from collections import ChainMap
+from dataclasses import dataclass, field
+from functools import singledispatch
+from typing import Dict, List, Mapping, Optional, Tuple, Union
+
+from llvm_lang import ast, errors, types
+from llvm_lang.ast import Op
+
+from .check_types import CheckTypesContext
+from .fold_constants import ARITHMETIC, fold_float, fold_int, round_float, wrap
+
+Value = Union[int, float, Tuple['Value', ...]]
+
+# bounds on how much work evaluating one global can take, the second well
+# within Python's recursion limit
+MAX_STEPS = 100_000
+MAX_CALL_DEPTH = 64
+
+
+@dataclass
+class EvaluateGlobalsContext(CheckTypesContext):
+    initial_values: Dict[str, Value] = field(default_factory=dict)
+    runtime_initialized: Dict[str, errors.ConstantError] = field(
+        default_factory=dict)
+
+
+class Return(Exception):
+    def __init__(self, value: Optional[Value]):
+        self.value = value
+
+
+class Evaluator:
+    def __init__(self, ctx: CheckTypesContext):
+        self.globals: Dict[str, ast.VariableDeclaration] = {}
+        self.functions: Dict[str, ast.FunctionDeclaration] = {}
+        for node in ctx.ast_root:
+            if isinstance(node, ast.VariableDeclaration):
+                self.globals[node.name] = node
+            elif isinstance(node, ast.FunctionDeclaration):
+                self.functions[node.name] = node
+
+        self.expression_types: Mapping[int, types.Type] = ctx.expression_types
+        self.values: Mapping[str, Value] = {}
+        prelude = ctx.prelude
+        if prelude is not None:
+            # the prelude's globals were evaluated with it
+            prelude_ctx = prelude.ctx
+            self.functions = ChainMap(
+                self.functions, {
+                    node.name: node
+                    for node in prelude_ctx.ast_root
+                    if isinstance(node, ast.FunctionDeclaration)
+                })
+            self.expression_types = ChainMap(ctx.expression_types,
+                                             prelude_ctx.expression_types)
+            self.values = getattr(prelude_ctx, 'initial_values', {})
+
+        self.initial_values: Dict[str, Value] = {}
+        self.runtime_initialized: Dict[str, errors.ConstantError] = {}
+        self.in_progress: List[str] = []
+        self.steps = 0
+
+    def global_value(self, name: str, node: ast.Node) -> Value:
+        if name in self.initial_values:
+            return self.initial_values[name]
+        if name in self.runtime_initialized or name in self.in_progress:
+            raise errors.ConstantError('{name} is not a constant',
+                                       node=node,
+                                       name=name)
+        if name not in self.globals:
+            if name in self.values:
+                return self.values[name]
+            raise errors.ConstantError('{name} is not a constant',
+                                       node=node,
+                                       name=name)
+        self.evaluate_global(self.globals[name])
+        return self.global_value(name, node)
+
+    def evaluate_global(self, node: ast.VariableDeclaration):
+        """Evaluate `node`'s initializer, or record why it can't be"""
+        self.in_progress.append(node.name)
+        try:
+            self.initial_values[node.name] = evaluate(node.initializer,
+                                                      Frame(self, {}))
+        except errors.ConstantError as e:
+            self.runtime_initialized[node.name] = e
+        finally:
+            self.in_progress.pop()
+
+    def call(self, node: ast.CallExpression, function: ast.FunctionDeclaration,
+             args: List[Value], depth: int) -> Optional[Value]:
+        if depth >= MAX_CALL_DEPTH:
+            raise errors.ConstantError(
+                'Calls nest too deeply to evaluate {node}', node=node)
+        frame = Frame(
+            self,
+            {param.name: arg
+             for param, arg in zip(function.parameters, args)}, depth + 1)
+        try:
+            for statement in function.body:
+                self.steps += 1
+                if self.steps > MAX_STEPS:
+                    raise errors.ConstantError(
+                        '{node} takes too long to evaluate', node=node)
+                execute(statement, frame)
+        except Return as r:
+            return r.value
+        return None
+
+
+@dataclass
+class Frame:
+    evaluator: Evaluator
+    locals: Dict[str, Value]
+    depth: int = 0
+
+    def type_of(self, node: ast.Expression) -> types.Type:
+        return self.evaluator.expression_types[id(node)]
+
+
+def not_constant(node: ast.Node) -> errors.ConstantError:
+    return errors.ConstantError('{node} can\'t be evaluated at compile time',
+                                node=node)
+
+
+@singledispatch
+def execute(node: ast.Statement, frame: Frame):
+    raise not_constant(node)
+
+
+@execute.register
+def execute_variabledeclaration(node: ast.VariableDeclaration, frame: Frame):
+    frame.locals[node.name] = evaluate(node.initializer, frame)
+
+
+@execute.register
+def execute_expressionstatement(node: ast.ExpressionStatement, frame: Frame):
+    evaluate(node.expr, frame)
+
+
+@execute.register
+def execute_returnstatement(node: ast.ReturnStatement, frame: Frame):
+    raise Return(None if node.value is None else evaluate(node.value, frame))
+
+
+@singledispatch
+def evaluate(node: ast.Expression, frame: Frame) -> Value:
+    raise not_constant(node)
+
+
+@evaluate.register
+def evaluate_integerliteral(node: ast.IntegerLiteral, frame: Frame) -> Value:
+    return wrap(node.value, frame.type_of(node))
+
+
+@evaluate.register
+def evaluate_floatliteral(node: ast.FloatLiteral, frame: Frame) -> Value:
+    return round_float(node.value, frame.type_of(node))
+
+
+@evaluate.register
+def evaluate_stringliteral(node: ast.StringLiteral, frame: Frame) -> Value:
+    return tuple(node.value.encode('utf-8'))
+
+
+@evaluate.register
+def evaluate_identifier(node: ast.Identifier, frame: Frame) -> Value:
+    if node.name in frame.locals:
+        return frame.locals[node.name]
+    return frame.evaluator.global_value(node.name, node)
+
+
+@evaluate.register
+def evaluate_unaryoperation(node: ast.UnaryOperation, frame: Frame) -> Value:
+    value = evaluate(node.rhs, frame)
+    typ = frame.type_of(node)
+    if isinstance(typ, types.IntType):
+        return wrap(-value, typ)
+    if isinstance(typ, types.FloatType):
+        return round_float(-value, typ)
+    raise not_constant(node)
+
+
+def evaluate_assignment(node: ast.BinaryOperation, frame: Frame) -> Value:
+    if (not isinstance(node.lhs, ast.Identifier)
+            or node.lhs.name not in frame.locals):
+        # only a function's own locals can change
+        raise not_constant(node)
+    value = frame.locals[node.lhs.name] = evaluate(node.rhs, frame)
+    return value
+
+
+def evaluate_field(node: ast.BinaryOperation, frame: Frame) -> Value:
+    lhs = evaluate(node.lhs, frame)
+    struct_type = frame.type_of(node.lhs)
+    for i, (name, _) in enumerate(struct_type.fields):
+        if name == node.rhs.name:
+            return lhs[i]
+    raise not_constant(node)
+
+
+def evaluate_index(node: ast.BinaryOperation, frame: Frame) -> Value:
+    lhs = evaluate(node.lhs, frame)
+    rhs = evaluate(node.rhs, frame)
+    if not 0 <= rhs < len(lhs):
+        raise errors.ConstantError('Index {index} is out of bounds in {node}',
+                                   node=node,
+                                   index=rhs)
+    return lhs[rhs]
+
+
+def evaluate_arithmetic(node: ast.BinaryOperation, frame: Frame) -> Value:
+    lhs = evaluate(node.lhs, frame)
+    rhs = evaluate(node.rhs, frame)
+    typ = frame.type_of(node)
+    if isinstance(typ, types.IntType):
+        return fold_int(node, node.op, lhs, rhs, typ)
+    if isinstance(typ, types.FloatType):
+        return fold_float(node.op, lhs, rhs, typ)
+    raise not_constant(node)
+
+
+BINARY_OPERATIONS = {
+    Op.assign: evaluate_assignment,
+    Op.field: evaluate_field,
+    Op.index: evaluate_index,
+    **dict.fromkeys(ARITHMETIC, evaluate_arithmetic),
+}
+
+
+@evaluate.register
+def evaluate_binaryoperation(node: ast.BinaryOperation, frame: Frame) -> Value:
+    operation = BINARY_OPERATIONS.get(node.op)
+    if operation is None:
+        raise not_constant(node)
+    return operation(node, frame)
+
+
+@evaluate.register
+def evaluate_callexpression(node: ast.CallExpression, frame: Frame) -> Value:
+    if not isinstance(node.target, ast.Identifier):
+        raise not_constant(node)
+    function = frame.evaluator.functions.get(node.target.name)
+    if function is None or node.target.name in frame.locals:
+        raise not_constant(node)
+    args = [evaluate(arg, frame) for arg in node.args]
+    return frame.evaluator.call(node, function, args, frame.depth)
+
+
+def evaluate_globals(ctx: CheckTypesContext) -> EvaluateGlobalsContext:
+    evaluator = Evaluator(ctx)
+    for node in evaluator.globals.values():
+        # globals can be evaluated early, when another one uses them
+        if (node.name not in evaluator.initial_values
+                and node.name not in evaluator.runtime_initialized):
+            evaluator.steps = 0
+            evaluator.evaluate_global(node)
+    return EvaluateGlobalsContext(
+        ast_root=ctx.ast_root,
+        declared_types=ctx.declared_types,
+        expression_types=ctx.expression_types,
+        names=ctx.names,
+        prelude=ctx.prelude,
+        initial_values=evaluator.initial_values,
+        runtime_initialized=evaluator.runtime_initialized)
@@ -0,0 +1,158 @@
+"""Evaluating arithmetic on literals at compile time
+
+Every expression has the type check_types settled on, so literals are folded
+the way LLVM would compute them in that type: integers wrap around at their
+width and truncate when divided, and float32 operands and results are
+rounded to single precision.
+"""
+import math
+import struct
+from typing import Optional
+
+from llvm_lang import ast, errors, types
+from llvm_lang.ast import Op
+from llvm_lang.ast.map import MapAST
+
+from .check_types import CheckTypesContext
+from .resolve_names import rebind
+
+ARITHMETIC = (Op.plus, Op.minus, Op.times, Op.divide)
+
+
+def wrap(value: int, typ: types.IntType) -> int:
+    """`value` truncated to the width of `typ`, as two's complement"""
+    value &= (1 << typ.size) - 1
+    if typ.signed and value >> (typ.size - 1):
+        value -= 1 << typ.size
+    return value
+
+
+def round_float(value: float, typ: types.FloatType) -> float:
+    if typ.size == 64:
+        return value
+    try:
+        return struct.unpack('f', struct.pack('f', value))[0]
+    except OverflowError:
+        return math.copysign(math.inf, value)
+
+
+def fold_int(node: ast.Expression, op: Op, lhs: int, rhs: int,
+             typ: types.IntType) -> int:
+    lhs, rhs = wrap(lhs, typ), wrap(rhs, typ)
+    if op == Op.plus:
+        return wrap(lhs + rhs, typ)
+    if op == Op.minus:
+        return wrap(lhs - rhs, typ)
+    if op == Op.times:
+        return wrap(lhs * rhs, typ)
+    if rhs == 0:
+        raise errors.ArithmeticError('Division by zero in {node}', node=node)
+    quotient = abs(lhs) // abs(rhs)
+    if (lhs < 0) != (rhs < 0):
+        quotient = -quotient
+    if wrap(quotient, typ) != quotient:
+        # the smallest signed value divided by -1
+        raise errors.ArithmeticError('{node} overflows {actual}',
+                                     node=node,
+                                     actual=typ)
+    return quotient
+
+
+def fold_float(op: Op, lhs: float, rhs: float, typ: types.FloatType) -> float:
+    lhs, rhs = round_float(lhs, typ), round_float(rhs, typ)
+    if op == Op.plus:
+        value = lhs + rhs
+    elif op == Op.minus:
+        value = lhs - rhs
+    elif op == Op.times:
+        value = lhs * rhs
+    elif rhs == 0:
+        # Python raises where IEEE 754 gives an infinity or NaN
+        if lhs == 0 or math.isnan(lhs):
+            value = math.nan
+        else:
+            value = math.copysign(math.inf, lhs) * math.copysign(1, rhs)
+    else:
+        value = lhs / rhs
+    return round_float(value, typ)
+
+
+class FoldConstantsVisitor(MapAST):
+    """Replaces arithmetic on literals with its result
+
+    Operations are folded bottom up, so whole trees of them become one
+    literal. New and rebuilt expressions take over the type of the expression
+    they replace in `expression_types`.
+    """
+    def __init__(self, ctx: CheckTypesContext):
+        super().__init__()
+        self.expression_types = ctx.expression_types
+        self.names = ctx.names
+
+    def rebuild(self, node: ast.Node, **fields) -> ast.Node:
+        new = super().rebuild(node, **fields)
+        rebind(self.names, node, new)
+        return new
+
+    def replace(self, old: ast.Expression,
+                new: ast.Expression) -> ast.Expression:
+        if new is not old:
+            typ = self.expression_types.pop(id(old), None)
+            if typ is not None:
+                self.expression_types[id(new)] = typ
+        return new
+
+    def literal(self, node: ast.Expression, value) -> Optional[ast.Expression]:
+        typ = self.expression_types.get(id(node))
+        if isinstance(typ, types.IntType):
+            return ast.IntegerLiteral(wrap(value, typ))
+        if isinstance(typ, types.FloatType):
+            return ast.FloatLiteral(round_float(value, typ))
+        return None
+
+    def fold(self, node: ast.BinaryOperation, lhs: ast.Expression,
+             rhs: ast.Expression) -> Optional[ast.Expression]:
+        typ = self.expression_types.get(id(node))
+        if (isinstance(typ, types.IntType)
+                and isinstance(lhs, ast.IntegerLiteral)
+                and isinstance(rhs, ast.IntegerLiteral)):
+            return ast.IntegerLiteral(
+                fold_int(node, node.op, lhs.value, rhs.value, typ))
+        if (isinstance(typ, types.FloatType)
+                and isinstance(lhs, ast.FloatLiteral)
+                and isinstance(rhs, ast.FloatLiteral)):
+            return ast.FloatLiteral(
+                fold_float(node.op, lhs.value, rhs.value, typ))
+        return None
+
+    def visit_BinaryOperation(self, node: ast.BinaryOperation):
+        new = super().visit_BinaryOperation(node)
+        if node.op in ARITHMETIC:
+            folded = self.fold(node, new.lhs, new.rhs)
+            if folded is not None:
+                self.expression_types.pop(id(new.lhs), None)
+                self.expression_types.pop(id(new.rhs), None)
+                new = folded
+        return self.replace(node, new)
+
+    def visit_UnaryOperation(self, node: ast.UnaryOperation):
+        new = super().visit_UnaryOperation(node)
+        if node.op == Op.negate and isinstance(
+                new.rhs, (ast.IntegerLiteral, ast.FloatLiteral)):
+            folded = self.literal(node, -new.rhs.value)
+            if folded is not None:
+                self.expression_types.pop(id(new.rhs), None)
+                new = folded
+        return self.replace(node, new)
+
+    def visit_CallExpression(self, node: ast.CallExpression):
+        return self.replace(node, super().visit_CallExpression(node))
+
+
+def fold_constants(ctx: CheckTypesContext) -> CheckTypesContext:
+    return CheckTypesContext(ast_root=FoldConstantsVisitor(ctx).visit(
+        ctx.ast_root),
+                             declared_types=ctx.declared_types,
+                             expression_types=ctx.expression_types,
+                             names=ctx.names,
+                             prelude=ctx.prelude)
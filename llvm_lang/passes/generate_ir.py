@@ -0,0 +1,543 @@
+"""Generating LLVM IR
+
+Every function becomes an LLVM function, and every global a global variable.
+Globals evaluate_globals found a value for are initialized with it, and the
+others are initialized at startup by a function in `llvm.global_ctors`. The
+prelude's functions and globals are declared, to be linked with the
+prelude's own module.
+
+Locals and parameters live in stack slots allocated in the entry block, and
+aggregates are passed around as values. Identifiers are looked up in the
+frame slots resolve_names gave them, or by name when it didn't run. Arrays
+convert to slices (and back) wherever the types allow it, with the slice
+pointing at a copy of the array in the current function's frame.
+
+`split_ir` generates the same program as several modules, which can be
+compiled separately and linked together.
+"""
+import heapq
+from collections import ChainMap
+from dataclasses import dataclass
+from functools import singledispatch
+from operator import itemgetter
+from typing import Dict, List, Mapping, Optional, Set, Tuple, Union
+
+from llvmlite import ir
+
+from llvm_lang import ast, types
+from llvm_lang.ast import Op
+from llvm_lang.ast.iter import walk
+from llvm_lang.types.lower import TypeLowering
+
+from .evaluate_globals import EvaluateGlobalsContext, Value
+from .fold_constants import round_float, wrap
+
+# the function that initializes the globals that aren't constants, named so
+# it can't clash with anything declared in source
+INIT_GLOBALS = 'globals.init'
+
+I32 = ir.IntType(32)
+I64 = ir.IntType(64)
+
+
+@dataclass
+class GenerateIRContext(EvaluateGlobalsContext):
+    module: Optional[ir.Module] = None
+
+
+def concrete(ty: types.Type) -> types.Type:
+    while isinstance(ty, types.NewType):
+        ty = ty.inner_type
+    return ty
+
+
+def function_type(node: ast.FunctionDeclaration) -> types.FunctionType:
+    return types.FunctionType(name=node.name,
+                              return_type=node.return_type.type,
+                              parameters=tuple((param.name, param.type.type)
+                                               for param in node.parameters))
+
+
+class Generator:
+    """Generates a module
+
+    Functions and globals are only declared in the module once they are
+    used, so a module that only defines some of the program's functions
+    doesn't declare all the others.
+    """
+    def __init__(self,
+                 ctx: EvaluateGlobalsContext,
+                 lowering: Optional[TypeLowering] = None):
+        if lowering is None:
+            lowering = TypeLowering(ir.Context())
+        self.module = ir.Module(name='program', context=lowering.context)
+        self.lowering = lowering
+        self.expression_types: Mapping[int, types.Type] = ctx.expression_types
+        self.names = ctx.names
+        self.globals: Dict[str, ir.GlobalVariable] = {}
+        self.functions: Dict[str, ir.Function] = {}
+        # the functions and globals identifiers have used, by slot
+        self.global_slots: List[Optional[ir.Value]] = [None] * (
+            0 if ctx.names is None else ctx.names.globals_size)
+
+        nodes = list(ctx.ast_root)
+        prelude = ctx.prelude
+        if prelude is not None:
+            self.expression_types = ChainMap(ctx.expression_types,
+                                             prelude.ctx.expression_types)
+            nodes.extend(prelude.ctx.ast_root)
+        self.global_nodes: Dict[str, ast.VariableDeclaration] = {}
+        self.function_nodes: Dict[str, ast.FunctionDeclaration] = {}
+        for node in nodes:
+            if isinstance(node, ast.VariableDeclaration):
+                self.global_nodes.setdefault(node.name, node)
+            elif isinstance(node, ast.FunctionDeclaration):
+                self.function_nodes.setdefault(node.name, node)
+
+    def variable(self, name: str) -> ir.GlobalVariable:
+        variable = self.globals.get(name)
+        if variable is None:
+            variable = self.declare_global(self.global_nodes[name])
+        return variable
+
+    def function(self, name: str) -> ir.Function:
+        function = self.functions.get(name)
+        if function is None:
+            function = self.declare_function(self.function_nodes[name])
+        return function
+
+    def global_value(self, node: ast.Identifier) -> ir.Value:
+        """The function or global variable `node` names"""
+        slot = None
+        if self.names is not None:
+            slot = self.names.resolutions[id(node)].slot
+            value = self.global_slots[slot]
+            if value is not None:
+                return value
+        if node.name in self.function_nodes:
+            value = self.function(node.name)
+        else:
+            value = self.variable(node.name)
+        if slot is not None:
+            self.global_slots[slot] = value
+        return value
+
+    def lower(self, ty: types.Type) -> ir.Type:
+        return self.lowering.lower(ty)
+
+    def type_of(self, node: ast.Expression) -> types.Type:
+        return self.expression_types[id(node)]
+
+    def declare_global(self,
+                       node: ast.VariableDeclaration) -> ir.GlobalVariable:
+        variable = ir.GlobalVariable(self.module, self.lower(node.type.type),
+                                     node.name)
+        self.globals[node.name] = variable
+        return variable
+
+    def declare_function(self, node: ast.FunctionDeclaration) -> ir.Function:
+        function = ir.Function(
+            self.module, self.lowering.function_type(function_type(node)),
+            node.name)
+        for arg, param in zip(function.args, node.parameters):
+            arg.name = param.name
+        self.functions[node.name] = function
+        return function
+
+    def constant(self, value: Value, ty: types.Type) -> ir.Constant:
+        ty = concrete(ty)
+        lowered = self.lower(ty)
+        if isinstance(ty, types.IntType):
+            # LLVM spells every integer constant as signed
+            return ir.Constant(lowered, wrap(value, types.IntType(ty.size)))
+        if isinstance(ty, types.FloatType):
+            return ir.Constant(lowered, round_float(value, ty))
+        if isinstance(ty, types.ArrayType):
+            return ir.Constant(
+                lowered, [self.constant(v, ty.element_type) for v in value])
+        if isinstance(ty, types.SliceType):
+            array_type = types.ArrayType(length=len(value),
+                                         element_type=ty.element_type)
+            array = ir.GlobalVariable(self.module, self.lower(array_type),
+                                      self.module.get_unique_name('slice'))
+            array.global_constant = True
+            array.linkage = 'private'
+            array.initializer = self.constant(value, array_type)
+            zero = ir.Constant(I32, 0)
+            return ir.Constant(
+                lowered,
+                [ir.Constant(I32, len(value)),
+                 array.gep([zero, zero])])
+        if isinstance(ty, types.StructType):
+            return ir.Constant(lowered, [
+                self.constant(v, field_type)
+                for v, (_, field_type) in zip(value, ty.fields)
+            ])
+        if isinstance(ty, types.TupleType):
+            return ir.Constant(lowered, [
+                self.constant(v, element)
+                for v, element in zip(value, ty.elements)
+            ])
+        raise NotImplementedError(f'Constant of type {ty}')
+
+    def define_function(self, node: ast.FunctionDeclaration):
+        function = self.function(node.name)
+        size = 0 if self.names is None else self.names.frame_sizes[id(node)]
+        frame = Frame(self, function, node.return_type.type, size)
+        for arg, param in zip(function.args, node.parameters):
+            frame.builder.store(arg, frame.declare(param, param.type.type))
+        for statement in node.body:
+            if frame.builder.block.is_terminated:
+                # dead code
+                break
+            emit(statement, frame)
+        frame.finish()
+
+    def define_init_globals(self, nodes):
+        function = ir.Function(self.module, ir.FunctionType(ir.VoidType(), []),
+                               INIT_GLOBALS)
+        function.linkage = 'internal'
+        frame = Frame(self, function, types.VoidType())
+        for node in nodes:
+            value = frame.coerce(expression(node.initializer, frame),
+                                 self.type_of(node.initializer),
+                                 node.type.type)
+            frame.builder.store(value, self.variable(node.name))
+        frame.finish()
+
+        # run before anything else, like main
+        entry = ir.LiteralStructType(
+            [I32, function.type,
+             ir.IntType(8).as_pointer()])
+        ctors = ir.GlobalVariable(self.module, ir.ArrayType(entry, 1),
+                                  'llvm.global_ctors')
+        ctors.linkage = 'appending'
+        ctors.initializer = ir.Constant(ir.ArrayType(entry, 1), [
+            ir.Constant(entry, [
+                ir.Constant(I32, 65535), function,
+                ir.Constant(ir.IntType(8).as_pointer(), None)
+            ])
+        ])
+
+
+class Frame:
+    """The state of the function whose body is being generated"""
+    def __init__(self,
+                 generator: Generator,
+                 function: ir.Function,
+                 return_type: types.Type,
+                 size: int = 0):
+        self.generator = generator
+        self.function = function
+        self.return_type = return_type
+        self.resolutions = (None if generator.names is None else
+                            generator.names.resolutions)
+        # stack slots by the frame slot of their binding, or by name without
+        # resolve_names
+        self.slots: List[Optional[ir.AllocaInstr]] = [None] * size
+        self.locals: Dict[str, ir.AllocaInstr] = {}
+        # stack slots all go in the entry block, which jumps to the body once
+        # it's done
+        self.entry = ir.IRBuilder(function.append_basic_block('entry'))
+        self.body = function.append_basic_block('body')
+        self.builder = ir.IRBuilder(self.body)
+
+    def type_of(self, node: ast.Expression) -> types.Type:
+        return self.generator.type_of(node)
+
+    def alloca(self, ty: types.Type, name: str = '') -> ir.AllocaInstr:
+        return self.entry.alloca(self.generator.lower(ty), name=name)
+
+    def declare(self, node: Union[ast.FunctionParameter,
+                                  ast.VariableDeclaration],
+                ty: types.Type) -> ir.AllocaInstr:
+        slot = self.alloca(ty, node.name)
+        if self.resolutions is None:
+            self.locals[node.name] = slot
+        else:
+            self.slots[self.resolutions[id(node)].slot] = slot
+        return slot
+
+    def local(self, node: ast.Identifier) -> Optional[ir.AllocaInstr]:
+        """The stack slot of the parameter or local `node` names, if it names
+        one"""
+        if self.resolutions is None:
+            return self.locals.get(node.name)
+        binding = self.resolutions[id(node)]
+        if binding.depth == 0:
+            return None
+        return self.slots[binding.slot]
+
+    def spill(self, value: ir.Value, ty: types.Type) -> ir.Value:
+        slot = self.alloca(ty)
+        self.builder.store(value, slot)
+        return slot
+
+    def coerce(self, value: ir.Value, actual: types.Type,
+               expected: types.Type) -> ir.Value:
+        """Convert `value` between types that are equal but lowered
+        differently, which are arrays and slices"""
+        actual, expected = concrete(actual), concrete(expected)
+        builder = self.builder
+        if (isinstance(actual, types.ArrayType)
+                and isinstance(expected, types.SliceType)):
+            zero = ir.Constant(I32, 0)
+            elements = builder.gep(self.spill(value, actual), [zero, zero])
+            slice_ = ir.Constant(self.generator.lower(expected), ir.Undefined)
+            slice_ = builder.insert_value(slice_,
+                                          ir.Constant(I32, actual.length), 0)
+            return builder.insert_value(slice_, elements, 1)
+        if (isinstance(actual, types.SliceType)
+                and isinstance(expected, types.ArrayType)):
+            elements = builder.extract_value(value, 1)
+            array_type = self.generator.lower(expected)
+            return builder.load(
+                builder.bitcast(elements, array_type.as_pointer()))
+        return value
+
+    def finish(self):
+        if not self.builder.block.is_terminated:
+            if isinstance(concrete(self.return_type), types.VoidType):
+                self.builder.ret_void()
+            else:
+                # type checking made sure this can't be reached
+                self.builder.unreachable()
+        self.entry.branch(self.body)
+
+
+@singledispatch
+def emit(node: ast.Statement, frame: Frame):
+    raise NotImplementedError(type(node).__name__)
+
+
+@emit.register
+def emit_variabledeclaration(node: ast.VariableDeclaration, frame: Frame):
+    value = frame.coerce(expression(node.initializer, frame),
+                         frame.type_of(node.initializer), node.type.type)
+    frame.builder.store(value, frame.declare(node, node.type.type))
+
+
+@emit.register
+def emit_expressionstatement(node: ast.ExpressionStatement, frame: Frame):
+    expression(node.expr, frame)
+
+
+@emit.register
+def emit_returnstatement(node: ast.ReturnStatement, frame: Frame):
+    if node.value is None:
+        frame.builder.ret_void()
+        return
+    value = expression(node.value, frame)
+    if value is None:
+        # returning the result of a void call
+        frame.builder.ret_void()
+        return
+    frame.builder.ret(
+        frame.coerce(value, frame.type_of(node.value), frame.return_type))
+
+
+def index(value: ir.Value, ty: types.IntType, frame: Frame) -> ir.Value:
+    """`value` as an i64, for getelementptr"""
+    if ty.size > 64:
+        return frame.builder.trunc(value, I64)
+    if ty.size < 64:
+        if ty.signed:
+            return frame.builder.sext(value, I64)
+        return frame.builder.zext(value, I64)
+    return value
+
+
+def field_index(ty: types.StructType, name: str) -> int:
+    for i, (field_name, _) in enumerate(ty.fields):
+        if field_name == name:
+            return i
+    raise KeyError(name)
+
+
+def address(node: ast.Expression, frame: Frame) -> ir.Value:
+    """A pointer to where the value of `node` is stored"""
+    builder = frame.builder
+    if isinstance(node, ast.Identifier):
+        local = frame.local(node)
+        if local is not None:
+            return local
+        return frame.generator.global_value(node)
+    elif isinstance(node, ast.BinaryOperation) and node.op == Op.field:
+        i = field_index(frame.type_of(node.lhs), node.rhs.name)
+        return builder.gep(
+            address(node.lhs, frame),
+            [ir.Constant(I32, 0), ir.Constant(I32, i)])
+    elif isinstance(node, ast.BinaryOperation) and node.op == Op.index:
+        i = index(expression(node.rhs, frame), frame.type_of(node.rhs), frame)
+        if isinstance(frame.type_of(node.lhs), types.SliceType):
+            elements = builder.extract_value(expression(node.lhs, frame), 1)
+            return builder.gep(elements, [i])
+        return builder.gep(address(node.lhs, frame), [ir.Constant(I64, 0), i])
+    # a temporary, which only lives as long as the function
+    return frame.spill(expression(node, frame), frame.type_of(node))
+
+
+@singledispatch
+def expression(node: ast.Expression, frame: Frame) -> Optional[ir.Value]:
+    raise NotImplementedError(type(node).__name__)
+
+
+@expression.register
+def expression_integerliteral(node: ast.IntegerLiteral,
+                              frame: Frame) -> ir.Value:
+    return frame.generator.constant(node.value, frame.type_of(node))
+
+
+@expression.register
+def expression_floatliteral(node: ast.FloatLiteral, frame: Frame) -> ir.Value:
+    return frame.generator.constant(node.value, frame.type_of(node))
+
+
+@expression.register
+def expression_stringliteral(node: ast.StringLiteral,
+                             frame: Frame) -> ir.Value:
+    return frame.generator.constant(tuple(node.value.encode('utf-8')),
+                                    frame.type_of(node))
+
+
+@expression.register
+def expression_identifier(node: ast.Identifier, frame: Frame) -> ir.Value:
+    local = frame.local(node)
+    if local is not None:
+        return frame.builder.load(local)
+    value = frame.generator.global_value(node)
+    if isinstance(value, ir.Function):
+        return value
+    return frame.builder.load(value)
+
+
+@expression.register
+def expression_unaryoperation(node: ast.UnaryOperation,
+                              frame: Frame) -> ir.Value:
+    value = expression(node.rhs, frame)
+    if isinstance(concrete(frame.type_of(node)), types.FloatType):
+        return frame.builder.fneg(value)
+    return frame.builder.neg(value)
+
+
+INT_OPERATIONS = {
+    Op.plus: ir.IRBuilder.add,
+    Op.minus: ir.IRBuilder.sub,
+    Op.times: ir.IRBuilder.mul,
+}
+
+FLOAT_OPERATIONS = {
+    Op.plus: ir.IRBuilder.fadd,
+    Op.minus: ir.IRBuilder.fsub,
+    Op.times: ir.IRBuilder.fmul,
+    Op.divide: ir.IRBuilder.fdiv,
+}
+
+
+@expression.register
+def expression_binaryoperation(node: ast.BinaryOperation,
+                               frame: Frame) -> ir.Value:
+    builder = frame.builder
+    if node.op == Op.assign:
+        target = address(node.lhs, frame)
+        value = frame.coerce(expression(node.rhs, frame),
+                             frame.type_of(node.rhs), frame.type_of(node.lhs))
+        builder.store(value, target)
+        return value
+    if node.op == Op.field:
+        i = field_index(frame.type_of(node.lhs), node.rhs.name)
+        return builder.extract_value(expression(node.lhs, frame), i)
+    if node.op == Op.index:
+        return builder.load(address(node, frame))
+
+    lhs = expression(node.lhs, frame)
+    rhs = expression(node.rhs, frame)
+    ty = frame.type_of(node)
+    if isinstance(ty, types.FloatType):
+        return FLOAT_OPERATIONS[node.op](builder, lhs, rhs)
+    if node.op == Op.divide:
+        if ty.signed:
+            return builder.sdiv(lhs, rhs)
+        return builder.udiv(lhs, rhs)
+    return INT_OPERATIONS[node.op](builder, lhs, rhs)
+
+
+@expression.register
+def expression_callexpression(node: ast.CallExpression,
+                              frame: Frame) -> Optional[ir.Value]:
+    function_type = frame.type_of(node.target)
+    target = expression(node.target, frame)
+    args = [
+        frame.coerce(expression(arg, frame), frame.type_of(arg), param)
+        for arg, (_, param) in zip(node.args, function_type.parameters)
+    ]
+    result = frame.builder.call(target, args)
+    if isinstance(concrete(function_type.return_type), types.VoidType):
+        return None
+    return result
+
+
+def generate_module(ctx: EvaluateGlobalsContext,
+                    functions: Optional[Set[str]] = None,
+                    define_globals: bool = True,
+                    lowering: Optional[TypeLowering] = None) -> ir.Module:
+    """Generate a module that defines the functions named in `functions`, or
+    every function, and the globals if `define_globals`, declaring the rest
+    of the program"""
+    generator = Generator(ctx, lowering)
+    runtime_initialized = []
+    for node in ctx.ast_root:
+        if define_globals and isinstance(node, ast.VariableDeclaration):
+            variable = generator.variable(node.name)
+            if node.name in ctx.initial_values:
+                variable.initializer = generator.constant(
+                    ctx.initial_values[node.name], node.type.type)
+            else:
+                variable.initializer = ir.Constant(variable.value_type, None)
+                runtime_initialized.append(node)
+
+    for node in ctx.ast_root:
+        if isinstance(node,
+                      ast.FunctionDeclaration) and (functions is None
+                                                    or node.name in functions):
+            generator.define_function(node)
+    if runtime_initialized:
+        generator.define_init_globals(runtime_initialized)
+    return generator.module
+
+
+def split_ir(ctx: EvaluateGlobalsContext, count: int) -> List[ir.Module]:
+    """Generate the program as a module that defines its globals, followed by
+    `count` modules that each define a group of its functions
+
+    The groups are about the same size, counted in AST nodes, so compiling
+    them takes about as long.
+    """
+    groups: List[Tuple[int, int,
+                       Set[str]]] = [(0, i, set()) for i in range(count)]
+    functions = [(sum(1 for _ in walk(node)), node.name)
+                 for node in ctx.ast_root
+                 if isinstance(node, ast.FunctionDeclaration)]
+    # each function goes in the smallest group so far, biggest first
+    for size, name in sorted(functions, reverse=True):
+        total, i, names = heapq.heappop(groups)
+        names.add(name)
+        heapq.heappush(groups, (total + size, i, names))
+
+    # the modules share their types, which are only lowered once
+    lowering = TypeLowering(ir.Context())
+    return [generate_module(ctx, set(), lowering=lowering)] + [
+        generate_module(ctx, names, define_globals=False, lowering=lowering)
+        for _, _, names in sorted(groups, key=itemgetter(1))
+    ]
+
+
+def generate_ir(ctx: EvaluateGlobalsContext) -> GenerateIRContext:
+    return GenerateIRContext(ast_root=ctx.ast_root,
+                             declared_types=ctx.declared_types,
+                             expression_types=ctx.expression_types,
+                             names=ctx.names,
+                             prelude=ctx.prelude,
+                             initial_values=ctx.initial_values,
+                             runtime_initialized=ctx.runtime_initialized,
+                             module=generate_module(ctx))
@@ -0,0 +1,493 @@
+"""Inlining calls to small functions
+
+A call is replaced by `let` bindings hoisted in front of the statement it is
+in: one for each argument, the callee's own bindings, and one for the value it
+returns, which takes the place of the call. Arguments that are literals or the
+caller's variables are substituted for parameters the callee never assigns
+instead. The callee's bindings are renamed to names that can't be written in
+source, so they can't capture or shadow the caller's, and given slots at the
+end of the caller's frame.
+
+Hoisting runs the callee before the part of the statement evaluated ahead of
+the call, so a call is only inlined if that part can't have side effects and
+can't be changed by the callee: literals, the caller's variables that the
+statement doesn't assign, and arithmetic on them that can't trap.
+
+Callees are inlined into their callers bottom up, so the size budget applies
+to bodies that already had their own calls inlined, and functions that can
+call themselves are never inlined.
+"""
+import dataclasses
+from collections import ChainMap
+from functools import wraps
+from itertools import count
+from typing import Dict, Iterable, List, Mapping, Optional, Set, Union
+
+from llvm_lang import ast
+from llvm_lang.ast import Op
+from llvm_lang.ast.iter import walk
+from llvm_lang.ast.map import MapAST, unchanged
+from llvm_lang.ast.types import ExpressionTypes
+
+from . import Pass
+from .check_types import CheckTypesContext
+from .eliminate_dead_code import TERMINATORS
+from .resolve_names import Binding, ResolvedNames, rebind
+
+# the number of AST nodes in the largest body that is inlined
+INLINE_SIZE = 40
+
+LITERALS = (ast.IntegerLiteral, ast.FloatLiteral, ast.StringLiteral)
+# the statements a function that is inlined has before its return
+STRAIGHT_LINE = (ast.VariableDeclaration, ast.ExpressionStatement)
+
+
+def calls(node: ast.Node, functions: Iterable[str]) -> Set[str]:
+    """The names in `functions` that `node` calls"""
+    return {
+        child.target.name
+        for child in walk(node)
+        if isinstance(child, ast.CallExpression) and isinstance(
+            child.target, ast.Identifier) and child.target.name in functions
+    }
+
+
+def assigned(node: ast.Node) -> Set[str]:
+    """The variables `node` assigns to, or to a field or element of"""
+    names = set()
+    for child in walk(node):
+        if isinstance(child, ast.BinaryOperation) and child.op == Op.assign:
+            target = child.lhs
+            while isinstance(target, ast.BinaryOperation):
+                target = target.lhs
+            if isinstance(target, ast.Identifier):
+                names.add(target.name)
+    return names
+
+
+def names(node: ast.Node) -> Set[str]:
+    """The names `node` uses, leaving out field names"""
+    names = set()
+    fields = set()
+    # walk yields each operation before its operands
+    for child in walk(node):
+        if isinstance(child, ast.BinaryOperation) and child.op == Op.field:
+            fields.add(id(child.rhs))
+        elif isinstance(child, ast.Identifier) and id(child) not in fields:
+            names.add(child.name)
+    return names
+
+
+def bottom_up(graph: Dict[str, Set[str]]) -> List[Set[str]]:  # noqa C901
+    """The strongly connected components of `graph`, each one after the
+    components it has edges to
+
+    This is Tarjan's algorithm, with an explicit stack so long call chains
+    can't reach Python's recursion limit.
+    """
+    index: Dict[str, int] = {}
+    lowlink: Dict[str, int] = {}
+    stack: List[str] = []
+    on_stack: Set[str] = set()
+    components = []
+
+    def push(name: str):
+        index[name] = lowlink[name] = len(index)
+        stack.append(name)
+        on_stack.add(name)
+        work.append((name, iter(graph[name])))
+
+    for root in graph:
+        if root in index:
+            continue
+        work = []
+        push(root)
+        while work:
+            name, edges = work[-1]
+            for callee in edges:
+                if callee not in index:
+                    push(callee)
+                    break
+                if callee in on_stack:
+                    lowlink[name] = min(lowlink[name], index[callee])
+            else:
+                work.pop()
+                if work:
+                    caller = work[-1][0]
+                    lowlink[caller] = min(lowlink[caller], lowlink[name])
+                if lowlink[name] == index[name]:
+                    component = set()
+                    member = None
+                    while member != name:
+                        member = stack.pop()
+                        on_stack.discard(member)
+                        component.add(member)
+                    components.append(component)
+    return components
+
+
+def bindings(node: ast.FunctionDeclaration,
+             statements: List[ast.Statement]) -> Set[str]:
+    """The names of `node`'s parameters and of the variables `statements`
+    declare"""
+    names = {param.name for param in node.parameters}
+    names.update(statement.name for statement in statements
+                 if isinstance(statement, ast.VariableDeclaration))
+    return names
+
+
+def size(node: ast.FunctionDeclaration) -> int:
+    return sum(1 for statement in node.body for _ in walk(statement))
+
+
+class Copy(MapAST):
+    """Copies a callee's statements, renaming its bindings
+
+    Every expression is copied, with the type of the one it copies, so each
+    inlined copy can be changed by later passes on its own.
+    """
+    def __init__(self, inliner: 'Inliner',
+                 names: Dict[str, Union[str, ast.Expression]]):
+        super().__init__()
+        self.inliner = inliner
+        self.expression_types = inliner.expression_types
+        self.names = names
+
+    def rebuild(self, node: ast.Node, **fields) -> ast.Node:
+        return dataclasses.replace(node, **fields)
+
+    def visit(self, node: ast.Node):
+        new = super().visit(node)
+        typ = self.expression_types.get(id(node))
+        if typ is not None:
+            self.expression_types[id(new)] = typ
+        return new
+
+    def visit_Identifier(self, node: ast.Identifier):
+        name = self.names.get(node.name, node.name)
+        if isinstance(name, ast.Expression):
+            # an argument, which is a literal or the caller's variable
+            copy = dataclasses.replace(name)
+            if isinstance(copy, ast.Identifier):
+                self.inliner.refer(copy, name)
+            return copy
+        copy = ast.Identifier(name)
+        self.inliner.refer(copy, node)
+        return copy
+
+    def visit_BinaryOperation(self, node: ast.BinaryOperation):
+        if node.op == Op.field:
+            # the field name isn't a binding
+            return self.rebuild(node, lhs=self.visit(node.lhs))
+        return super().visit_BinaryOperation(node)
+
+    def visit_VariableDeclaration(self, node: ast.VariableDeclaration):
+        return self.inliner.declare(
+            self.rebuild(node,
+                         name=self.names[node.name],
+                         initializer=self.visit(node.initializer)))
+
+    def generic_visit(self, node: ast.Node):
+        if isinstance(node, ast.Expression):
+            return dataclasses.replace(node)
+        return node
+
+
+class Callee:
+    """A function that can be inlined"""
+    def __init__(self, node: ast.FunctionDeclaration):
+        self.node = node
+        self.statements = node.body
+        self.result: Optional[ast.Expression] = None
+        for i, statement in enumerate(node.body):
+            if isinstance(statement, TERMINATORS):
+                self.statements = node.body[:i]
+                self.result = statement.value
+                break
+
+        self.bindings = bindings(node, self.statements)
+        parameters = {param.name for param in node.parameters}
+        self.constant_parameters = parameters - assigned(node)
+        # the names the callee uses that aren't its own, which mustn't be
+        # shadowed where it's inlined
+        self.free_names = names(node) - self.bindings
+
+    @staticmethod
+    def inlinable(node: ast.FunctionDeclaration, max_size: int) -> bool:
+        if node.generic_parameters or size(node) > max_size:
+            return False
+        for statement in node.body:
+            if isinstance(statement, TERMINATORS):
+                return isinstance(statement, ast.ReturnStatement)
+            if not isinstance(statement, STRAIGHT_LINE):
+                return False
+        return True
+
+
+class Inliner:
+    """Inlines the calls in one function's body, for as long as that keeps
+    each statement's side effects in order"""
+    def __init__(self, node: ast.FunctionDeclaration,
+                 callees: Dict[str, Callee], expression_types: ExpressionTypes,
+                 names: Optional[ResolvedNames],
+                 resolutions: Optional[Mapping[int, Binding]]):
+        self.node = node
+        self.callees = callees
+        self.expression_types = expression_types
+        self.names = names
+        self.resolutions = resolutions
+        self.locals = bindings(node, node.body)
+        self.counter = count()
+        # the bindings of the callees' renamed bindings, by their new names
+        self.fresh: Dict[str, Binding] = {}
+
+        # the state of the statement being inlined into
+        self.hoisted: List[ast.Statement] = []
+        self.assigned: Set[str] = set()
+        self.stable = True
+
+    def fresh_name(self, callee: Callee, name: str) -> str:
+        fresh = f'{callee.node.name}.{name}.{next(self.counter)}'
+        self.locals.add(fresh)
+        return fresh
+
+    def declare(self,
+                node: ast.VariableDeclaration) -> ast.VariableDeclaration:
+        """Give `node`, which declares a fresh name, the next slot in the
+        caller's frame"""
+        if self.names is not None:
+            frame_sizes = self.names.frame_sizes
+            binding = Binding(depth=1,
+                              slot=frame_sizes[id(self.node)],
+                              declaration=node)
+            frame_sizes[id(self.node)] += 1
+            self.names.resolutions[id(node)] = self.fresh[node.name] = binding
+        return node
+
+    def refer(self, node: ast.Identifier, old: ast.Identifier):
+        """Bind `node`, which is a copy of `old` that may have been renamed"""
+        if self.names is not None:
+            binding = self.fresh.get(node.name)
+            if binding is None:
+                binding = self.resolutions[id(old)]
+            self.names.resolutions[id(node)] = binding
+
+    def callee(self, node: ast.CallExpression) -> Optional[Callee]:
+        if (not isinstance(node.target, ast.Identifier)
+                or node.target.name in self.locals):
+            return None
+        callee = self.callees.get(node.target.name)
+        if callee is None or callee.free_names & self.locals:
+            return None
+        return callee
+
+    def rebuild(self, node: ast.Node, **fields) -> ast.Node:
+        if all(
+                unchanged(value, getattr(node, name))
+                for name, value in fields.items()):
+            return node
+        new = dataclasses.replace(node, **fields)
+        typ = self.expression_types.pop(id(node), None)
+        if typ is not None:
+            self.expression_types[id(new)] = typ
+        rebind(self.names, node, new)
+        return new
+
+    def substitutable(self, arg: ast.Expression) -> bool:
+        """Whether `arg` has the same value wherever it's copied to"""
+        return isinstance(arg, LITERALS) or (isinstance(arg, ast.Identifier)
+                                             and arg.name in self.locals
+                                             and arg.name not in self.assigned)
+
+    def expression(self,
+                   node: ast.Expression,
+                   statement: bool = False) -> Optional[ast.Expression]:
+        """Inline the calls in `node` and return what replaces it, or None if
+        it was a whole expression statement that was inlined"""
+        if isinstance(node, LITERALS):
+            return node
+        if isinstance(node, ast.Identifier):
+            if not self.substitutable(node):
+                self.stable = False
+            return node
+        if isinstance(node, ast.UnaryOperation):
+            return self.rebuild(node, rhs=self.expression(node.rhs))
+        if isinstance(node, ast.BinaryOperation):
+            return self.binary_operation(node)
+        if isinstance(node, ast.CallExpression):
+            return self.call(node, statement)
+        self.stable = False
+        return node
+
+    def binary_operation(self, node: ast.BinaryOperation) -> ast.Expression:
+        if node.op == Op.field:
+            return self.rebuild(node, lhs=self.expression(node.lhs))
+        if node.op == Op.assign:
+            # the target is evaluated for its address, not its value
+            lhs = node.lhs
+            if isinstance(lhs, ast.BinaryOperation):
+                lhs = self.expression(lhs)
+            rhs = self.expression(node.rhs)
+            self.stable = False
+            return self.rebuild(node, lhs=lhs, rhs=rhs)
+        lhs = self.expression(node.lhs)
+        rhs = self.expression(node.rhs)
+        if node.op in (Op.divide, Op.index):
+            # these can trap
+            self.stable = False
+        return self.rebuild(node, lhs=lhs, rhs=rhs)
+
+    def call(self, node: ast.CallExpression,
+             statement: bool) -> Optional[ast.Expression]:
+        stable = self.stable
+        target = node.target
+        if not isinstance(target, ast.Identifier):
+            target = self.expression(target)
+        args = [self.expression(arg) for arg in node.args]
+        callee = self.callee(node)
+        if (callee is not None and stable
+                and (statement or callee.result is not None)):
+            # everything before the call is still evaluated in order
+            self.stable = True
+            return self.inline(node, callee, args)
+        self.stable = False
+        return self.rebuild(node, target=target, args=args)
+
+    def inline(self, node: ast.CallExpression, callee: Callee,
+               args: List[ast.Expression]) -> Optional[ast.Expression]:
+        names: Dict[str, Union[str, ast.Expression]] = {}
+        substituted = []
+        for param, arg in zip(callee.node.parameters, args):
+            # types compare equal when they are compatible, but an array
+            # passed as a slice is only converted where it's bound
+            if (param.name in callee.constant_parameters
+                    and self.substitutable(arg)
+                    and type(self.expression_types.get(id(arg))) is type(
+                        param.type.type)):
+                names[param.name] = arg
+                substituted.append(arg)
+                continue
+            names[param.name] = self.fresh_name(callee, param.name)
+            self.hoisted.append(
+                self.declare(
+                    ast.VariableDeclaration(name=names[param.name],
+                                            type=param.type,
+                                            initializer=arg)))
+        for name in callee.bindings - names.keys():
+            names[name] = self.fresh_name(callee, name)
+
+        copy = Copy(self, names)
+        self.hoisted.extend(copy.visit(s) for s in callee.statements)
+        result = None
+        if callee.result is not None:
+            result = copy.visit(callee.result)
+            if not self.substitutable(result):
+                name = self.fresh_name(callee, 'result')
+                declaration = self.declare(
+                    ast.VariableDeclaration(name=name,
+                                            type=callee.node.return_type,
+                                            initializer=result))
+                self.hoisted.append(declaration)
+                result = ast.Identifier(name)
+                self.expression_types[id(result)] = self.expression_types.get(
+                    id(node))
+                self.refer(result, declaration)
+
+        # the substituted arguments were copied wherever they're used
+        for old in [node, node.target] + substituted:
+            self.expression_types.pop(id(old), None)
+            if self.names is not None:
+                self.names.resolutions.pop(id(old), None)
+        return result
+
+    def statement(self, node: ast.Statement) -> List[ast.Statement]:
+        self.hoisted = []
+        self.assigned = assigned(node)
+        self.stable = True
+        if isinstance(node, ast.VariableDeclaration):
+            node = self.rebuild(node,
+                                initializer=self.expression(node.initializer))
+        elif isinstance(node, ast.ExpressionStatement):
+            expr = self.expression(node.expr, statement=True)
+            if expr is None:
+                return self.hoisted
+            node = self.rebuild(node, expr=expr)
+        elif isinstance(node, ast.ReturnStatement) and node.value is not None:
+            node = self.rebuild(node, value=self.expression(node.value))
+        return self.hoisted + [node]
+
+    def function(self) -> ast.FunctionDeclaration:
+        body = []
+        for statement in self.node.body:
+            body.extend(self.statement(statement))
+        if unchanged(body, self.node.body):
+            return self.node
+        new = dataclasses.replace(self.node, body=body)
+        rebind(self.names, self.node, new)
+        return new
+
+
+def functions_in(program: ast.Program) -> Dict[str, ast.FunctionDeclaration]:
+    return {
+        node.name: node
+        for node in program if isinstance(node, ast.FunctionDeclaration)
+    }
+
+
+def inline_functions(ctx: CheckTypesContext,
+                     max_size: int = INLINE_SIZE) -> CheckTypesContext:
+    """Inline calls to functions whose bodies have at most `max_size` nodes"""
+    callees: Dict[str, Callee] = {}
+    expression_types = ctx.expression_types
+    names = ctx.names
+    resolutions = None if names is None else names.resolutions
+    prelude = ctx.prelude
+    if prelude is not None:
+        # the prelude's functions had their calls inlined when it was
+        # compiled, and the copies' types are added to the program's
+        prelude_functions = functions_in(prelude.ctx.ast_root)
+        graph = {
+            name: calls(node, prelude_functions)
+            for name, node in prelude_functions.items()
+        }
+        for component in bottom_up(graph):
+            name = next(iter(component))
+            if (len(component) == 1 and name not in graph[name]
+                    and Callee.inlinable(prelude_functions[name], max_size)):
+                callees[name] = Callee(prelude_functions[name])
+        expression_types = ChainMap(expression_types,
+                                    prelude.ctx.expression_types)
+        if resolutions is not None and prelude.ctx.names is not None:
+            resolutions = ChainMap(resolutions, prelude.ctx.names.resolutions)
+
+    functions = functions_in(ctx.ast_root)
+    graph = {name: calls(node, functions) for name, node in functions.items()}
+    for component in bottom_up(graph):
+        for name in component:
+            functions[name] = Inliner(functions[name], callees,
+                                      expression_types, names,
+                                      resolutions).function()
+        if (len(component) == 1 and name not in graph[name]
+                and Callee.inlinable(functions[name], max_size)):
+            callees[name] = Callee(functions[name])
+
+    ast_root = ast.Program(ctx.ast_root)
+    for i, node in enumerate(ast_root):
+        if isinstance(node, ast.FunctionDeclaration):
+            ast_root[i] = functions[node.name]
+    return CheckTypesContext(ast_root=ast_root,
+                             declared_types=ctx.declared_types,
+                             expression_types=ctx.expression_types,
+                             names=ctx.names,
+                             prelude=ctx.prelude)
+
+
+def inline_functions_up_to(
+        max_size: int) -> Pass[CheckTypesContext, CheckTypesContext]:
+    """Make a pass that inlines calls to functions whose bodies have at most
+    `max_size` nodes"""
+    @wraps(inline_functions)
+    def pass_(ctx: CheckTypesContext) -> CheckTypesContext:
+        return inline_functions(ctx, max_size)
+
+    return pass_
@@ -1,32 +1,65 @@
 from dataclasses import dataclass
-from typing import Dict
+from typing import TYPE_CHECKING, Dict, Optional
 
 from llvm_lang import ast, types
 from llvm_lang.ast.map import MapAST
+from llvm_lang.ast.types import ExpressionTypes
 from llvm_lang.types.instantiate import instantiate as instantiate_type
 from llvm_lang.scopes import Scopes
 
 from .annotate_expressions import AnnotateExpressionsContext
+from .resolve_declared_types import program_types
+from .resolve_names import ResolvedNames, rebind
+
+if TYPE_CHECKING:
+    from llvm_lang.session import Prelude
 
 
 @dataclass
 class InstantiateTypeExpressionsContext:
     ast_root: ast.Program
     declared_types: Dict[str, types.Type]
+    expression_types: ExpressionTypes
+    names: Optional[ResolvedNames] = None
+    prelude: Optional['Prelude'] = None
 
 
 class InstantiateTypeExpressionsVisitor(MapAST):
     def __init__(self, ctx: AnnotateExpressionsContext):
         super().__init__()
         self.ctx = ctx
-        self.scopes = Scopes(ctx.declared_types.items())
+        prelude = ctx.prelude
+        self.scopes = Scopes(
+            program_types(ctx).items(),
+            parent=None if prelude is None else prelude.type_scopes)
+        self.names = ctx.names
+        self.resolutions = (None if ctx.names is None else
+                            ctx.names.type_resolutions)
+        # the prelude's types take the first slots
+        self.prelude_type_slots = () if prelude is None else prelude.type_slots
+        self.type_slots = list(program_types(ctx).values())
+
+    def rebuild(self, node: ast.Node, **fields) -> ast.Node:
+        new = super().rebuild(node, **fields)
+        rebind(self.names, node, new)
+        return new
+
+    def resolve_type(self, node: ast.NamedTypeExpression) -> types.Type:
+        if self.resolutions is None:
+            return self.scopes.resolve_binding(node.name)
+        binding = self.resolutions[id(node)]
+        if binding.depth == 0:
+            if binding.slot < len(self.prelude_type_slots):
+                return self.prelude_type_slots[binding.slot]
+            return self.type_slots[binding.slot - len(self.prelude_type_slots)]
+        return types.TypeVariable(node.name)
 
     def visit_NamedTypeExpression(self, node: ast.NamedTypeExpression):
-        typ = self.scopes.resolve_binding(node.name)
+        typ = self.resolve_type(node)
 
         if isinstance(typ, types.ScopedType):
             generic_arguments = {
-                name: self.visit(arg)
+                name: self.visit(arg).type
                 for name, arg in zip(typ.type_parameters,
                                      node.generic_arguments or [])
             }
@@ -35,16 +68,44 @@ class InstantiateTypeExpressionsVisitor(MapAST):
         return ast.InstantiatedTypeExpression(
             type=instantiate_type(typ, generic_arguments, self.scopes))
 
-    def visit_TypedExpression(self, node: ast.TypedExpression):
-        return ast.TypedExpression(value=self.visit(node.value),
-                                   type=instantiate_type(
-                                       node.type, {}, self.scopes))
+    def visit_TupleTypeExpression(self, node: ast.TupleTypeExpression):
+        return ast.InstantiatedTypeExpression(type=types.TupleType(
+            elements=tuple(self.visit(e).type for e in node.elements)))
+
+    def visit_ArrayTypeExpression(self, node: ast.ArrayTypeExpression):
+        return ast.InstantiatedTypeExpression(type=types.ArrayType(
+            element_type=self.visit(node.element_type).type,
+            length=node.length))
+
+    def visit_SliceTypeExpression(self, node: ast.SliceTypeExpression):
+        return ast.InstantiatedTypeExpression(type=types.SliceType(
+            element_type=self.visit(node.element_type).type))
+
+    # expressions were typed by annotate_expressions, and are kept as is so
+    # their types can still be found by id
+    def visit_VariableDeclaration(self, node: ast.VariableDeclaration):
+        return self.rebuild(node, type=self.visit(node.type))
+
+    def visit_ReturnStatement(self, node: ast.ReturnStatement):
+        return node
+
+    def visit_ExpressionStatement(self, node: ast.ExpressionStatement):
+        return node
 
     def visit_FunctionDeclaration(self, node: ast.FunctionDeclaration):
         if node.generic_parameters:
             raise NotImplementedError()
         return super().visit_FunctionDeclaration(node)
 
+    def visit_GenericTypeDeclaration(self, node: ast.GenericTypeDeclaration):
+        # declarations will be instantiated when they're used
+        return node
+
+    # MapAST's visitors for these would be found before the one above
+    visit_NewTypeDeclaration = visit_GenericTypeDeclaration
+    visit_StructTypeDeclaration = visit_GenericTypeDeclaration
+    visit_UnionTypeDeclaration = visit_GenericTypeDeclaration
+
     def generic_visit(self, node: ast.Node):
         if isinstance(node, ast.TypeExpression):
             raise NotImplementedError(
@@ -60,6 +121,9 @@ class InstantiateTypeExpressionsVisitor(MapAST):
 def instantiate_type_expressions(
         ctx: AnnotateExpressionsContext) -> InstantiateTypeExpressionsContext:
     visitor = InstantiateTypeExpressionsVisitor(ctx)
-    return InstantiateTypeExpressionsContext(ast_root=visitor.visit(
-        ctx.ast_root),
-                                             declared_types=ctx.declared_types)
+    return InstantiateTypeExpressionsContext(
+        ast_root=visitor.visit(ctx.ast_root),
+        declared_types=ctx.declared_types,
+        expression_types=ctx.expression_types,
+        names=ctx.names,
+        prelude=ctx.prelude)
@@ -0,0 +1,192 @@
+"""Optimizing the generated IR with LLVM
+
+The module generate_ir leaves on the context is parsed into LLVM and run
+through the standard pipeline for an optimization level, like clang's -O0 to
+-O3 and -Os. The result is kept as `optimized`, along with how long
+optimizing took, so it can be told apart from the rest of the compile.
+
+llvmlite's legacy PassManagerBuilder is used where it exists. Newer versions
+of llvmlite only have the new pass manager, which has no size level, so -Os
+is approximated there by -O2 with loop unrolling and vectorization off and
+the inliner's -Os threshold.
+"""
+import time
+from dataclasses import dataclass
+from functools import lru_cache, wraps
+from typing import Optional
+
+from llvmlite import binding as llvm
+
+from llvm_lang.passes import Pass
+
+from .generate_ir import GenerateIRContext
+
+LEVELS = ('O0', 'O1', 'O2', 'O3', 'Os')
+
+
+@dataclass(frozen=True)
+class OptimizationOptions:
+    """What to optimize for, and how hard
+
+    The inlining threshold and vectorizers default to what the level turns on
+    in clang.
+    """
+    level: str = 'O2'
+    inlining_threshold: Optional[int] = None
+    loop_vectorize: Optional[bool] = None
+    slp_vectorize: Optional[bool] = None
+
+    def __post_init__(self):
+        if self.level not in LEVELS:
+            raise ValueError(
+                f'Unknown optimization level {self.level}, expected'
+                f' one of {", ".join(LEVELS)}')
+
+    @property
+    def speed_level(self) -> int:
+        return 2 if self.level == 'Os' else int(self.level[1])
+
+    @property
+    def size_level(self) -> int:
+        return 1 if self.level == 'Os' else 0
+
+    @property
+    def inlining(self) -> int:
+        if self.inlining_threshold is not None:
+            return self.inlining_threshold
+        # llvm::computeThresholdFromOptLevels
+        if self.size_level:
+            return 75
+        return 250 if self.speed_level > 2 else 225
+
+    @property
+    def loop_vectorization(self) -> bool:
+        if self.loop_vectorize is not None:
+            return self.loop_vectorize
+        return self.level in ('O2', 'O3')
+
+    @property
+    def slp_vectorization(self) -> bool:
+        if self.slp_vectorize is not None:
+            return self.slp_vectorize
+        return self.level in ('O2', 'O3')
+
+
+@dataclass
+class OptimizeIRContext(GenerateIRContext):
+    optimization: OptimizationOptions = OptimizationOptions()
+    optimized: Optional[llvm.ModuleRef] = None
+    # seconds
+    optimization_time: float = 0.0
+
+
+@lru_cache(maxsize=None)
+def initialize():
+    llvm.initialize_native_target()
+    llvm.initialize_native_asmprinter()
+
+
+def target_machine(speed_level: int = 2) -> llvm.TargetMachine:
+    """A new machine for the host, which generates code at `speed_level`
+
+    Execution engines own the machine they are created with, so each one
+    needs its own.
+    """
+    initialize()
+    target = llvm.Target.from_default_triple()
+    return target.create_target_machine(opt=speed_level)
+
+
+def parse(text: str, machine: llvm.TargetMachine) -> llvm.ModuleRef:
+    """Parse and verify a module of IR for `machine`"""
+    module = llvm.parse_assembly(text)
+    module.triple = machine.triple
+    module.data_layout = str(machine.target_data)
+    module.verify()
+    return module
+
+
+def run_legacy_pipeline(module: llvm.ModuleRef, options: OptimizationOptions,
+                        machine: llvm.TargetMachine):
+    builder = llvm.create_pass_manager_builder()
+    builder.opt_level = options.speed_level
+    builder.size_level = options.size_level
+    builder.inlining_threshold = options.inlining
+    builder.loop_vectorize = options.loop_vectorization
+    builder.slp_vectorize = options.slp_vectorization
+
+    function_passes = llvm.create_function_pass_manager(module)
+    module_passes = llvm.create_module_pass_manager()
+    machine.add_analysis_passes(function_passes)
+    machine.add_analysis_passes(module_passes)
+    builder.populate(function_passes)
+    builder.populate(module_passes)
+
+    function_passes.initialize()
+    for function in module.functions:
+        function_passes.run(function)
+    function_passes.finalize()
+    module_passes.run(module)
+
+
+def run_pipeline(module: llvm.ModuleRef, options: OptimizationOptions,
+                 machine: llvm.TargetMachine):
+    tuning = llvm.create_pipeline_tuning_options(
+        speed_level=options.speed_level)
+    tuning.inlining_threshold = options.inlining
+    tuning.loop_vectorization = options.loop_vectorization
+    tuning.slp_vectorization = options.slp_vectorization
+    if options.size_level:
+        tuning.loop_unrolling = False
+    builder = llvm.create_pass_builder(machine, tuning)
+    builder.getModulePassManager().run(module, builder)
+
+
+def optimize_module(module: llvm.ModuleRef, options: OptimizationOptions,
+                    machine: llvm.TargetMachine):
+    if not options.speed_level:
+        return
+    if hasattr(llvm, 'create_pass_manager_builder'):
+        run_legacy_pipeline(module, options, machine)
+    else:
+        run_pipeline(module, options, machine)
+
+
+def optimize_ir(
+    ctx: GenerateIRContext,
+    options: OptimizationOptions = OptimizationOptions()
+) -> OptimizeIRContext:
+    # no code was generated for a program with errors, so there's nothing to
+    # optimize
+    module = getattr(ctx, 'module', None)
+    optimized = None
+    elapsed = 0.0
+    if module is not None:
+        start = time.perf_counter()
+        machine = target_machine(options.speed_level)
+        optimized = parse(str(module), machine)
+        optimize_module(optimized, options, machine)
+        elapsed = time.perf_counter() - start
+
+    return OptimizeIRContext(ast_root=ctx.ast_root,
+                             declared_types=ctx.declared_types,
+                             expression_types=ctx.expression_types,
+                             names=ctx.names,
+                             prelude=ctx.prelude,
+                             initial_values=ctx.initial_values,
+                             runtime_initialized=ctx.runtime_initialized,
+                             module=module,
+                             optimization=options,
+                             optimized=optimized,
+                             optimization_time=elapsed)
+
+
+def optimize_ir_with(
+    options: OptimizationOptions
+) -> Pass[GenerateIRContext, OptimizeIRContext]:
+    """Make a pass that optimizes with `options`"""
+    @wraps(optimize_ir)
+    def pass_(ctx: GenerateIRContext) -> OptimizeIRContext:
+        return optimize_ir(ctx, options)
+
+    return pass_
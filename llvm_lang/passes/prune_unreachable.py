@@ -0,0 +1,71 @@
+import dataclasses
+import warnings
+from typing import Container, FrozenSet, Iterable, Set
+
+from llvm_lang import ast, errors
+from llvm_lang.ast.iter import walk
+
+from . import Pass
+from .resolve_declared_types import ResolveDeclaredTypesContext
+
+
+class UnreachableWarning(UserWarning):
+    pass
+
+
+def references(node: ast.Node, names: Container[str]) -> FrozenSet[str]:
+    """The top-level names in `names` that `node` refers to, by calling or
+    naming a function or global, or by using a type
+
+    Locals that shadow a top-level name count as references to it, which can
+    only make a declaration look like it uses more than it does.
+    """
+    return frozenset(
+        child.name for child in walk(node)
+        if isinstance(child, (
+            ast.Identifier, ast.NamedTypeExpression)) and child.name in names)
+
+
+def reachable(program: ast.Program, entry_points: Iterable[str]) -> Set[str]:
+    declarations = {node.name: node for node in program}
+    seen = set()
+    stack = []
+    for name in entry_points:
+        if name not in declarations:
+            raise errors.ReferenceError(f'Unknown entry point {name}')
+        seen.add(name)
+        stack.append(name)
+
+    while stack:
+        for name in references(declarations[stack.pop()], declarations):
+            if name not in seen:
+                seen.add(name)
+                stack.append(name)
+    return seen
+
+
+def prune_unreachable(
+    entry_points: Iterable[str],
+    warn_unreachable: bool = False
+) -> Pass[ResolveDeclaredTypesContext, ResolveDeclaredTypesContext]:
+    """Make a pass that drops the declarations the entry points can't reach,
+    so the passes after it only check what the entry points use
+
+    Every type stays in `declared_types`, only the declarations are dropped.
+    """
+    roots = frozenset(entry_points)
+
+    def prune_unreachable(
+            ctx: ResolveDeclaredTypesContext) -> ResolveDeclaredTypesContext:
+        names = reachable(ctx.ast_root, roots)
+        if warn_unreachable:
+            for node in ctx.ast_root:
+                if node.name not in names:
+                    warnings.warn(f'{node.name} is never used',
+                                  UnreachableWarning)
+        return dataclasses.replace(ctx,
+                                   ast_root=ast.Program(
+                                       node for node in ctx.ast_root
+                                       if node.name in names))
+
+    return prune_unreachable
@@ -1,20 +1,40 @@
+from collections import ChainMap
 from dataclasses import dataclass
-from typing import Dict
+from typing import TYPE_CHECKING, Dict, Mapping, Optional
 
 from llvm_lang import ast, types, errors
 from llvm_lang.ast.types import generate_type
 
+from . import Pass
+
+if TYPE_CHECKING:
+    from llvm_lang.session import Prelude
+
 
 @dataclass
 class ResolveDeclaredTypesContext:
     ast_root: ast.Program
+    # with a prelude, a ChainMap of the types declared in the program in front
+    # of the prelude's
     declared_types: Dict[str, types.Type]
+    prelude: Optional['Prelude'] = None
+
+
+def program_types(ctx) -> Mapping[str, types.Type]:
+    """The types declared by the program itself, leaving out its prelude's,
+    given any context with `declared_types` and `prelude`"""
+    if ctx.prelude is None:
+        return ctx.declared_types
+    return ctx.declared_types.maps[0]
 
 
 class ResolveDeclaredTypesVisitor(ast.Visitor):
-    def __init__(self):
+    def __init__(self, prelude: Optional['Prelude'] = None):
         super().__init__()
-        self.declared_types = types.primitive_types.copy()
+        if prelude is None:
+            self.declared_types = types.primitive_types.copy()
+        else:
+            self.declared_types = ChainMap({}, prelude.declared_types)
 
     def add_type(self, name: str, ty: types.Type):
         if name in self.declared_types:
@@ -44,15 +64,25 @@ class ResolveDeclaredTypesVisitor(ast.Visitor):
                              type_parameters=type_parameters,
                              fields=tuple(fields)))
 
+    def variant_type(self, node: ast.UnionTypeVariant) -> types.Type:
+        if isinstance(node, ast.UnionTypeStructVariant):
+            return types.StructType(name=node.name,
+                                    fields=tuple(
+                                        (field.name, generate_type(field.type))
+                                        for field in node.fields))
+        elif isinstance(node, ast.UnionTypeTupleVariant):
+            return types.TupleType(
+                elements=tuple(map(generate_type, node.elements)))
+        # symbol variants carry no data
+        return types.TupleType()
+
     def visit_UnionTypeDeclaration(self, node: ast.UnionTypeDeclaration):
         type_parameters = tuple(
             map(types.TypeVariable, node.generic_parameters))
         variants = []
 
         for variant in node.variants:
-            # FIXME: Need to fix type of UnionType.variants
-            variants.append((variant.name, types.TypeRef("T",
-                                                         type_arguments=())))
+            variants.append((variant.name, self.variant_type(variant)))
 
         self.add_type(
             node.name,
@@ -92,3 +122,20 @@ def resolve_declared_types(ctx: ast.Program) -> ResolveDeclaredTypesContext:
 
     return ResolveDeclaredTypesContext(ast_root=ctx,
                                        declared_types=visitor.declared_types)
+
+
+def resolve_declared_types_after(
+        prelude: 'Prelude') -> Pass[ast.Program, ResolveDeclaredTypesContext]:
+    """Make a pass like `resolve_declared_types` for programs compiled after
+    `prelude`, whose types they can use but not redeclare"""
+    def resolve_declared_types(
+            ctx: ast.Program) -> ResolveDeclaredTypesContext:
+        visitor = ResolveDeclaredTypesVisitor(prelude)
+        visitor.visit(ctx)
+
+        return ResolveDeclaredTypesContext(
+            ast_root=ctx,
+            declared_types=visitor.declared_types,
+            prelude=prelude)
+
+    return resolve_declared_types
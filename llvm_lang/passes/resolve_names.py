@@ -0,0 +1,192 @@
+from dataclasses import dataclass
+from typing import TYPE_CHECKING, Dict, List, Optional
+
+from llvm_lang import ast, types
+from llvm_lang.scopes import Scopes
+
+from .resolve_declared_types import ResolveDeclaredTypesContext, program_types
+
+if TYPE_CHECKING:
+    from llvm_lang.session import Prelude
+
+
+@dataclass(frozen=True)
+class Binding:
+    """Where a name lives: slot `slot` of the frame at `depth`
+
+    Values at depth 0 are the globals (functions and global variables), and
+    each function gets a frame of its own for its parameters and locals. Types
+    at depth 0 are the declared types in declaration order, and at depth 1 the
+    generic parameters of the enclosing declaration.
+    """
+    depth: int
+    slot: int
+    declaration: Optional[ast.Node] = None
+
+
+# keyed by the id of each declaration and each reference to it
+Resolutions = Dict[int, Binding]
+
+
+@dataclass
+class ResolvedNames:
+    """The bindings resolve_names found, as the passes after it keep them
+
+    Passes that replace a declaration, identifier or function move its
+    entries to the replacement with `rebind`, like its type in
+    expression_types, so code generation can still find everything's slot.
+    """
+    resolutions: Resolutions
+    # the bindings of type expressions, whose slots are separate from values'
+    type_resolutions: Resolutions
+    globals_size: int
+    frame_sizes: Dict[int, int]
+
+
+def rebind(names: Optional[ResolvedNames], old: ast.Node, new: ast.Node):
+    """Move `old`'s binding and frame size, if it has them, to `new`"""
+    if names is None or new is old:
+        return
+    for resolutions in (names.resolutions, names.type_resolutions):
+        binding = resolutions.pop(id(old), None)
+        if binding is not None:
+            resolutions[id(new)] = binding
+    size = names.frame_sizes.pop(id(old), None)
+    if size is not None:
+        names.frame_sizes[id(new)] = size
+
+
+@dataclass
+class ResolveNamesContext:
+    ast_root: ast.Program
+    declared_types: Dict[str, types.Type]
+    resolutions: Resolutions
+    # the bindings of type expressions, whose slots are separate from values'
+    type_resolutions: Resolutions
+    # global bindings of every function in declared_types, leaving out the
+    # prelude's, which are in the prelude
+    functions: Dict[str, Binding]
+    # number of slots in the global frame, including the prelude's
+    globals_size: int
+    # number of slots in each function's frame, keyed by id of the function
+    frame_sizes: Dict[int, int]
+    prelude: Optional['Prelude'] = None
+
+    @property
+    def names(self) -> ResolvedNames:
+        return ResolvedNames(resolutions=self.resolutions,
+                             type_resolutions=self.type_resolutions,
+                             globals_size=self.globals_size,
+                             frame_sizes=self.frame_sizes)
+
+
+class ResolveNamesVisitor(ast.Visitor):
+    def __init__(self, ctx: ResolveDeclaredTypesContext):
+        super().__init__()
+        # the prelude's names are already bound, in scopes shared by every
+        # program compiled after it
+        prelude = ctx.prelude
+        self.declared_types = program_types(ctx)
+        self.resolutions: Resolutions = {}
+        self.type_resolutions: Resolutions = {}
+        self.functions: Dict[str, Binding] = {}
+        self.frame_sizes: Dict[int, int] = {}
+        self.frames: List[int] = [
+            0 if prelude is None else prelude.globals_size
+        ]
+        self.values = Scopes[Binding](
+            parent=None if prelude is None else prelude.value_bindings)
+
+        declarations = {
+            node.name: node
+            for node in ctx.ast_root if isinstance(node, ast.Declaration)
+        }
+        first_slot = 0 if prelude is None else len(prelude.declared_types)
+        self.types = Scopes[Binding](
+            ((name,
+              Binding(depth=0,
+                      slot=first_slot + slot,
+                      declaration=declarations.get(name)))
+             for slot, name in enumerate(self.declared_types)),
+            parent=None if prelude is None else prelude.type_bindings)
+
+    def declare(self, name: str, node: Optional[ast.Node]) -> Binding:
+        depth = len(self.frames) - 1
+        binding = Binding(depth=depth,
+                          slot=self.frames[depth],
+                          declaration=node)
+        self.frames[depth] += 1
+        self.values.add_binding(name, binding)
+        if node is not None:
+            self.resolutions[id(node)] = binding
+        return binding
+
+    def bind_generic_parameters(self, node: ast.Node,
+                                generic_parameters: Optional[List[str]]):
+        for slot, name in enumerate(generic_parameters or ()):
+            self.types.add_binding(
+                name,
+                Binding(depth=self.types.depth, slot=slot, declaration=node))
+
+    def visit_Program(self, node: ast.Program):
+        # functions can be called before they are declared, or from other
+        # files, which have no declaration in this program
+        declarations = {
+            declaration.name: declaration
+            for declaration in node
+            if isinstance(declaration, ast.FunctionDeclaration)
+        }
+        for name, ty in self.declared_types.items():
+            if isinstance(ty, types.FunctionType):
+                self.functions[name] = self.declare(name,
+                                                    declarations.get(name))
+        self.generic_visit(node)
+
+    def visit_FunctionDeclaration(self, node: ast.FunctionDeclaration):
+        with self.types.new_scope(), self.values.new_scope():
+            self.bind_generic_parameters(node, node.generic_parameters)
+            self.visit(node.return_type)
+            self.frames.append(0)
+            for param in node.parameters:
+                self.visit(param.type)
+                self.declare(param.name, param)
+            for statement in node.body:
+                self.visit(statement)
+            self.frame_sizes[id(node)] = self.frames.pop()
+
+    def visit_VariableDeclaration(self, node: ast.VariableDeclaration):
+        self.visit(node.type)
+        self.visit(node.initializer)
+        self.declare(node.name, node)
+
+    def visit_GenericTypeDeclaration(self, node: ast.GenericTypeDeclaration):
+        with self.types.new_scope():
+            self.bind_generic_parameters(node, node.generic_parameters)
+            self.generic_visit(node)
+
+    def visit_BinaryOperation(self, node: ast.BinaryOperation):
+        self.visit(node.lhs)
+        # field names are resolved against the type of the struct
+        if node.op != ast.Op.field:
+            self.visit(node.rhs)
+
+    def visit_Identifier(self, node: ast.Identifier):
+        self.resolutions[id(node)] = self.values.resolve_binding(node.name)
+
+    def visit_NamedTypeExpression(self, node: ast.NamedTypeExpression):
+        self.type_resolutions[id(node)] = self.types.resolve_binding(node.name)
+        self.generic_visit(node)
+
+
+def resolve_names(ctx: ResolveDeclaredTypesContext) -> ResolveNamesContext:
+    visitor = ResolveNamesVisitor(ctx)
+    visitor.visit(ctx.ast_root)
+
+    return ResolveNamesContext(ast_root=ctx.ast_root,
+                               declared_types=ctx.declared_types,
+                               resolutions=visitor.resolutions,
+                               type_resolutions=visitor.type_resolutions,
+                               functions=visitor.functions,
+                               globals_size=visitor.frames[0],
+                               frame_sizes=visitor.frame_sizes,
+                               prelude=ctx.prelude)
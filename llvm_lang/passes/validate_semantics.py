@@ -1,5 +1,6 @@
 from ..ast import node, Visitor
 from .. import ast, errors
+from .resolve_declared_types import ResolveDeclaredTypesContext
 
 
 class SemanticValidationVisitor(Visitor):
@@ -39,3 +40,11 @@ class SemanticValidationVisitor(Visitor):
 def validate_semantics(ctx: ast.Program) -> ast.Program:
     SemanticValidationVisitor().visit(ctx)
     return ctx
+
+
+def validate_declarations(
+        ctx: ResolveDeclaredTypesContext) -> ResolveDeclaredTypesContext:
+    """validate_semantics, for pipelines that drop declarations after
+    resolving declared types, so only the remaining ones are validated"""
+    validate_semantics(ctx.ast_root)
+    return ctx
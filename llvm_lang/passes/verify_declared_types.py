@@ -0,0 +1,10 @@
+from llvm_lang.types.verify import verify_types
+
+from .resolve_declared_types import ResolveDeclaredTypesContext, program_types
+
+
+def verify_declared_types(
+        ctx: ResolveDeclaredTypesContext) -> ResolveDeclaredTypesContext:
+    # a prelude's types were verified when it was compiled
+    verify_types(ctx.declared_types, program_types(ctx))
+    return ctx
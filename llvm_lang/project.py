@@ -0,0 +1,148 @@
+"""Compiling many source files as one program
+
+Each file is parsed and has its declared types resolved on its own, in a pool
+of worker processes. The declarations of all files are then merged into one
+`declared_types` table and verified once, after which each file is type
+checked against the merged table, again in parallel.
+"""
+import os
+from concurrent.futures import Executor, ProcessPoolExecutor
+from contextlib import contextmanager
+from dataclasses import dataclass
+from typing import Dict, Iterator, List, Mapping, Optional, Tuple
+
+from llvm_lang import ast, errors, types
+from llvm_lang.ast.iter import walk
+from llvm_lang.compiler import Compiler, passes
+from llvm_lang.passes.check_types import CheckTypesContext
+from llvm_lang.passes.generate_ir import generate_ir
+from llvm_lang.passes.resolve_declared_types import (
+    ResolveDeclaredTypesContext, resolve_declared_types)
+from llvm_lang.passes.verify_declared_types import verify_declared_types
+
+declare = Compiler(passes=passes[:passes.index(resolve_declared_types) + 1])
+# files call functions from other files, so code is only generated for the
+# whole program
+check = Compiler(passes=passes[passes.index(verify_declared_types) +
+                               1:passes.index(generate_ir)])
+
+
+@dataclass
+class ProjectContext:
+    files: Dict[str, CheckTypesContext]
+    declared_types: Dict[str, types.Type]
+    # the file each name in declared_types was declared in
+    declared_in: Dict[str, str]
+
+
+def declare_file(
+        path: str,
+        source: str) -> Tuple[str, ast.Program, Dict[str, types.Type]]:
+    ctx = declare.compile(source)
+    declared_types = {
+        name: ty
+        for name, ty in ctx.declared_types.items()
+        if name not in types.primitive_types
+    }
+    return path, ctx.ast_root, declared_types
+
+
+# set in each worker process, so the merged table is only sent once per worker
+_declared_types: Optional[Dict[str, types.Type]] = None
+
+
+def _set_declared_types(declared_types: Dict[str, types.Type]):
+    global _declared_types
+    _declared_types = declared_types
+
+
+def check_file(path: str, program: ast.Program):
+    ctx = check.compile(
+        ResolveDeclaredTypesContext(ast_root=program,
+                                    declared_types=_declared_types))
+    # expression types are keyed by id, which doesn't survive being sent
+    # between processes, so they are sent along with their nodes instead
+    expression_types = [(node, ctx.expression_types[id(node)])
+                        for node in walk(ctx.ast_root)
+                        if id(node) in ctx.expression_types]
+    return path, ctx.ast_root, expression_types
+
+
+def merge_declared_types(
+    files: List[Tuple[str, ast.Program, Dict[str, types.Type]]]
+) -> Tuple[Dict[str, types.Type], Dict[str, str]]:
+    declared_types = types.primitive_types.copy()
+    declared_in: Dict[str, str] = {}
+
+    for path, _, file_types in files:
+        for name, ty in file_types.items():
+            if name in declared_types:
+                raise errors.TypeError(
+                    f'Redeclaration of type {name} in {path}, first declared'
+                    f' in {declared_in[name]}')
+            declared_types[name] = ty
+            declared_in[name] = path
+
+    return declared_types, declared_in
+
+
+@contextmanager
+def executor(
+        workers: int,
+        declared_types: Dict[str, types.Type]) -> Iterator[Optional[Executor]]:
+    if workers == 1:
+        yield None
+        return
+    with ProcessPoolExecutor(max_workers=workers,
+                             initializer=_set_declared_types,
+                             initargs=(declared_types, )) as pool:
+        yield pool
+
+
+def starmap(pool: Optional[Executor], fn, items: List[Tuple], workers: int):
+    if pool is None:
+        return [fn(*item) for item in items]
+    chunksize = max(1, len(items) // (workers * 4))
+    return list(pool.map(fn, *zip(*items), chunksize=chunksize))
+
+
+def compile_project(sources: Mapping[str, str],
+                    *,
+                    workers: Optional[int] = None) -> ProjectContext:
+    """Compile the files in `sources`, a mapping of paths to source code,
+    using up to `workers` processes (one per CPU by default)"""
+    workers = workers or os.cpu_count() or 1
+    items = list(sources.items())
+    if not items:
+        return ProjectContext(files={},
+                              declared_types=types.primitive_types.copy(),
+                              declared_in={})
+
+    with executor(workers, {}) as pool:
+        declared = starmap(pool, declare_file, items, workers)
+
+    declared_types, declared_in = merge_declared_types(declared)
+    verify_declared_types(
+        ResolveDeclaredTypesContext(ast_root=ast.Program(),
+                                    declared_types=declared_types))
+
+    _set_declared_types(declared_types)
+    try:
+        with executor(workers, declared_types) as pool:
+            checked = starmap(pool, check_file,
+                              [(path, program)
+                               for path, program, _ in declared], workers)
+    finally:
+        _set_declared_types(None)
+
+    files = {
+        path: CheckTypesContext(
+            ast_root=program,
+            declared_types=declared_types,
+            expression_types={id(node): ty
+                              for node, ty in expression_types})
+        for path, program, expression_types in checked
+    }
+    return ProjectContext(files=files,
+                          declared_types=declared_types,
+                          declared_in=declared_in)
@@ -0,0 +1,42 @@
+"""Framing for messages between the compile server and its clients
+
+A frame is a 4-byte big-endian length followed by that many bytes of UTF-8
+encoded JSON. This module only uses the standard library, so clients can
+import it without importing the compiler.
+"""
+import json
+import struct
+from typing import Any, Dict
+
+HEADER = struct.Struct('>I')
+MAX_FRAME_SIZE = 64 * 1024 * 1024
+
+Message = Dict[str, Any]
+
+
+class ProtocolError(Exception):
+    pass
+
+
+def encode_frame(message: Message) -> bytes:
+    payload = json.dumps(message).encode()
+    if len(payload) > MAX_FRAME_SIZE:
+        raise ProtocolError(f'Frame of {len(payload)} bytes is too large')
+    return HEADER.pack(len(payload)) + payload
+
+
+def decode_length(header: bytes) -> int:
+    length, = HEADER.unpack(header)
+    if length > MAX_FRAME_SIZE:
+        raise ProtocolError(f'Frame of {length} bytes is too large')
+    return length
+
+
+def decode_message(payload: bytes) -> Message:
+    try:
+        message = json.loads(payload)
+    except ValueError as e:
+        raise ProtocolError(f'Invalid frame: {e}') from e
+    if not isinstance(message, dict):
+        raise ProtocolError('Messages must be JSON objects')
+    return message
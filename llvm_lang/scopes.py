@@ -1,57 +1,136 @@
 from contextlib import contextmanager
-from typing import Generic, Iterable, Optional, Tuple, TypeVar
+from typing import (Any, Dict, Generic, Iterable, List, Mapping, Optional,
+                    Sequence, Tuple, TypeVar)
 
 from llvm_lang import errors
 
-T_Scope = TypeVar('T_Scope')
-
-
-class Scope(Generic[T_Scope]):
-    def __init__(self, it: Optional[Iterable[Tuple[str, T_Scope]]] = None):
-        self.bindings = dict(it or ())
-
-    def has_binding(self, name: str) -> bool:
-        return name in self.bindings
-
-    def add_binding(self, name: str, typ: T_Scope):
-        if self.has_binding(name):
-            raise errors.SyntaxError(f'Redeclaring binding {name}')
-        self.bindings[name] = typ
-
-    def get_binding(self, name: str) -> T_Scope:
-        return self.bindings[name]
-
-
 T_Scopes = TypeVar('T_Scopes')
 
 
 class Scopes(Generic[T_Scopes]):
-    def __init__(self, it: Optional[Iterable[Tuple[str, T_Scopes]]] = None):
-        self.scopes = [Scope[T_Scopes](it)]
+    """Nested scopes of bindings
+
+    Every name maps to the stack of its bindings, innermost last, so resolving
+    a name doesn't depend on how deeply scopes are nested. Names bound since
+    the start of each scope are kept in an undo log, so popping a scope only
+    touches the bindings it added.
+
+    Names that aren't bound are looked up in `parent`, if there is one, which
+    acts as a read-only outermost scope: it is never modified, so one set of
+    bindings can be shared by many scopes without copying it.
+    """
+    def __init__(self,
+                 it: Optional[Iterable[Tuple[str, T_Scopes]]] = None,
+                 parent: Optional['Scopes[T_Scopes]'] = None):
+        # the initial bindings are all in the outermost scope, where nothing
+        # can shadow them, so they are set up in bulk
+        initial = dict(it or ())
+        if parent is not None:
+            for name in initial:
+                if parent.has_binding(name):
+                    raise errors.SyntaxError('Redeclaring binding {name}',
+                                             name=name)
+        self.bindings: Dict[str, List[Tuple[int, T_Scopes]]] = {
+            name: [(0, typ)]
+            for name, typ in initial.items()
+        }
+        self.undo_log: List[str] = list(initial)
+        self.scope_starts: List[int] = []
+        self.parent = parent
+
+    @property
+    def depth(self) -> int:
+        return len(self.scope_starts)
 
     def push_scope(self):
-        self.scopes.append(Scope[T_Scopes]())
+        self.scope_starts.append(len(self.undo_log))
 
     def pop_scope(self):
-        self.scopes.pop()
+        start = self.scope_starts.pop()
+        bindings = self.bindings
+        undo_log = self.undo_log
+        while len(undo_log) > start:
+            bindings[undo_log.pop()].pop()
 
     @contextmanager
     def new_scope(self):
         self.push_scope()
-        yield
-        self.pop_scope()
+        try:
+            yield
+        finally:
+            self.pop_scope()
 
     def add_binding(self, name: str, typ: T_Scopes):
-        self.scopes[-1].add_binding(name, typ)
+        depth = len(self.scope_starts)
+        stack = self.bindings.get(name)
+        if stack is None:
+            if (depth == 0 and self.parent is not None
+                    and self.parent.has_binding(name)):
+                raise errors.SyntaxError('Redeclaring binding {name}',
+                                         name=name)
+            stack = self.bindings[name] = []
+        elif stack and stack[-1][0] == depth:
+            raise errors.SyntaxError('Redeclaring binding {name}', name=name)
+        stack.append((depth, typ))
+        self.undo_log.append(name)
 
-    def has_binding(self, name: str):
-        for scope in reversed(self.scopes):
-            if scope.has_binding(name):
-                return True
-        return False
+    def has_binding(self, name: str) -> bool:
+        if self.bindings.get(name):
+            return True
+        return self.parent is not None and self.parent.has_binding(name)
 
     def resolve_binding(self, name: str) -> T_Scopes:
-        for scope in reversed(self.scopes):
-            if scope.has_binding(name):
-                return scope.get_binding(name)
-        raise errors.ReferenceError(f'Unbound identifier {name}')
+        stack = self.bindings.get(name)
+        if not stack:
+            if self.parent is not None:
+                return self.parent.resolve_binding(name)
+            raise errors.ReferenceError('Unbound identifier {name}', name=name)
+        return stack[-1][1]
+
+    def declare(self, node: Any, typ: T_Scopes):
+        self.add_binding(node.name, typ)
+
+    def resolve_identifier(self, node: Any) -> T_Scopes:
+        return self.resolve_binding(node.name)
+
+
+class Frames(Generic[T_Scopes]):
+    """Bindings stored in the slots given to them by name resolution
+
+    `resolutions` maps the id of every declaration and identifier to its
+    binding's depth and slot (see `llvm_lang.passes.resolve_names`), so
+    resolving an identifier is a couple of list indexing operations.
+    """
+    def __init__(self,
+                 resolutions: Mapping[int, Any],
+                 globals_size: int,
+                 initial_globals: Sequence[Optional[T_Scopes]] = ()):
+        self.resolutions = resolutions
+        self.frames: List[List[Optional[T_Scopes]]] = [
+            list(initial_globals) + [None] *
+            (globals_size - len(initial_globals))
+        ]
+
+    def push_frame(self, size: int):
+        self.frames.append([None] * size)
+
+    def pop_frame(self):
+        self.frames.pop()
+
+    @contextmanager
+    def new_frame(self, size: int):
+        self.push_frame(size)
+        try:
+            yield
+        finally:
+            self.pop_frame()
+
+    def bind(self, binding: Any, typ: T_Scopes):
+        self.frames[binding.depth][binding.slot] = typ
+
+    def declare(self, node: Any, typ: T_Scopes):
+        self.bind(self.resolutions[id(node)], typ)
+
+    def resolve_identifier(self, node: Any) -> T_Scopes:
+        binding = self.resolutions[id(node)]
+        return self.frames[binding.depth][binding.slot]
@@ -0,0 +1,123 @@
+"""A compile server that stays warm between compiles
+
+Starting Python, importing the compiler and building the parser tables takes
+longer than compiling most programs. The server pays for that once, then
+accepts compile requests over a Unix socket (see `llvm_lang.protocol`) and
+runs them in a pool of warmed-up worker processes, so a long compile doesn't
+hold up the others.
+
+A request is `{"source": ..., "cache_dir": ..., "entry_points": [...],
+"warn_unreachable": ..., "all_errors": ...}`, where everything but the source
+is optional. `cache_dir` compiles the source incrementally (see
+`llvm_lang.incremental`), `entry_points` only checks what they use (see
+`llvm_lang.passes.prune_unreachable`), and `all_errors` reports every type
+error rather than the first.
+The response is `{"ok": true, "declarations": [...]}` or
+`{"ok": false, "error": {"type": ..., "message": ...}}`, with `"errors": [...]`
+as well when every error was asked for.
+
+    python -m llvm_lang.server --socket /tmp/llvm-lang.sock
+"""
+import argparse
+import asyncio
+import logging
+import os
+import signal
+from contextlib import suppress
+from concurrent.futures import Executor, ProcessPoolExecutor
+from typing import Optional, Set
+
+from llvm_lang.driver import compile_request, error_response, warm_up
+from llvm_lang.protocol import (HEADER, Message, ProtocolError, decode_length,
+                                decode_message, encode_frame)
+
+logger = logging.getLogger(__name__)
+
+
+async def read_frame(reader: asyncio.StreamReader) -> Message:
+    length = decode_length(await reader.readexactly(HEADER.size))
+    return decode_message(await reader.readexactly(length))
+
+
+class CompileServer:
+    def __init__(self, path: str, workers: Optional[int] = None):
+        self.path = path
+        self.workers = workers
+        self.pool: Optional[Executor] = None
+        self.connections: Set[asyncio.Task] = set()
+
+    async def compile(self, request: Message) -> Message:
+        loop = asyncio.get_running_loop()
+        try:
+            return await loop.run_in_executor(self.pool, compile_request,
+                                              request)
+        except Exception as e:
+            logger.exception('Compile request failed')
+            return error_response(e)
+
+    async def handle(self, reader: asyncio.StreamReader,
+                     writer: asyncio.StreamWriter):
+        """Answer requests from one client, in order, until it disconnects"""
+        task = asyncio.current_task()
+        self.connections.add(task)
+        try:
+            while True:
+                try:
+                    request = await read_frame(reader)
+                except asyncio.IncompleteReadError:
+                    break
+                writer.write(encode_frame(await self.compile(request)))
+                await writer.drain()
+        except ProtocolError as e:
+            # the stream can't be trusted after a bad frame
+            writer.write(encode_frame(error_response(e)))
+        except ConnectionError:
+            pass
+        finally:
+            self.connections.discard(task)
+            writer.close()
+            with suppress(ConnectionError):
+                await writer.wait_closed()
+
+    async def serve(self, stop: asyncio.Event):
+        """Serve until `stop` is set"""
+        if os.path.exists(self.path):
+            os.unlink(self.path)
+        with ProcessPoolExecutor(max_workers=self.workers,
+                                 initializer=warm_up) as pool:
+            self.pool = pool
+            server = await asyncio.start_unix_server(self.handle,
+                                                     path=self.path)
+            try:
+                await stop.wait()
+            finally:
+                server.close()
+                for task in self.connections:
+                    task.cancel()
+                await asyncio.gather(*self.connections, return_exceptions=True)
+                await server.wait_closed()
+                os.unlink(self.path)
+                self.pool = None
+
+
+async def main_async(path: str, workers: Optional[int]):
+    stop = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for signum in (signal.SIGINT, signal.SIGTERM):
+        loop.add_signal_handler(signum, stop.set)
+    await CompileServer(path, workers).serve(stop)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--socket', required=True, help='path to listen on')
+    parser.add_argument('--workers',
+                        type=int,
+                        help='compile processes (default: one per CPU)')
+    args = parser.parse_args()
+    logging.basicConfig()
+    asyncio.run(main_async(args.socket, args.workers))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,110 @@
+"""Compiling many programs against the same prelude
+
+A `CompilerSession` compiles its prelude once and keeps what later programs
+need from it in a `Prelude`: its declared types, the bindings name resolution
+gave its declarations, and the types of its functions and globals. Each
+program starts from views of these that only hold what the program adds, so
+the time it takes to compile a program doesn't grow with the prelude.
+"""
+from dataclasses import dataclass
+from types import MappingProxyType
+from typing import Mapping, Optional, Tuple
+
+from llvm_lang import types
+from llvm_lang.compiler import Compiler, passes
+from llvm_lang.instrumentation import Instrumentation
+from llvm_lang.passes.annotate_expressions import (AnnotateExpressionsContext,
+                                                   AnnotateExpressionsVisitor)
+from llvm_lang.passes.check_types import CheckTypesContext
+from llvm_lang.passes.generate_ir import GenerateIRContext
+from llvm_lang.passes.instantiate_type_expressions import \
+    instantiate_type_expressions
+from llvm_lang.passes.resolve_declared_types import (
+    resolve_declared_types, resolve_declared_types_after)
+from llvm_lang.passes.resolve_names import (Binding, ResolveNamesContext,
+                                            ResolveNamesVisitor)
+from llvm_lang.passes.verify_declared_types import verify_declared_types
+from llvm_lang.scopes import Scopes
+
+front_end = Compiler(passes=passes[:passes.index(verify_declared_types) + 1])
+back_end = Compiler(passes=passes[passes.index(instantiate_type_expressions):])
+
+
+@dataclass(frozen=True)
+class Prelude:
+    """A compiled prelude
+
+    Every program compiled after the prelude shares it, so nothing in it may
+    be modified.
+    """
+    ctx: GenerateIRContext
+    declared_types: Mapping[str, types.Type]
+    # the declared types in the slots name resolution gives them
+    type_slots: Tuple[types.Type, ...]
+    # name resolution's bindings of the prelude's types, and of its functions
+    # and globals
+    type_bindings: Scopes[Binding]
+    value_bindings: Scopes[Binding]
+    globals_size: int
+    # the declared types by name, for instantiating types
+    type_scopes: Scopes[types.Type]
+    # the types of the prelude's functions and globals, by slot
+    globals: Tuple[Optional[types.Type], ...]
+
+
+def compile_prelude(source: str) -> Prelude:
+    ctx = front_end.compile(source)
+
+    names_visitor = ResolveNamesVisitor(ctx)
+    names_visitor.visit(ctx.ast_root)
+    names = ResolveNamesContext(
+        ast_root=ctx.ast_root,
+        declared_types=ctx.declared_types,
+        resolutions=names_visitor.resolutions,
+        type_resolutions=names_visitor.type_resolutions,
+        functions=names_visitor.functions,
+        globals_size=names_visitor.frames[0],
+        frame_sizes=names_visitor.frame_sizes)
+
+    annotate_visitor = AnnotateExpressionsVisitor(names)
+    annotate_visitor.visit(ctx.ast_root)
+    # programs can call any function in the prelude, not just the ones the
+    # prelude calls itself
+    for name, binding in names.functions.items():
+        annotate_visitor.scopes.bind(binding,
+                                     annotate_visitor.function_type(name))
+
+    checked = back_end.compile(
+        AnnotateExpressionsContext(
+            ast_root=ctx.ast_root,
+            declared_types=ctx.declared_types,
+            expression_types=annotate_visitor.expression_types,
+            names=names.names))
+
+    return Prelude(ctx=checked,
+                   declared_types=MappingProxyType(ctx.declared_types),
+                   type_slots=tuple(ctx.declared_types.values()),
+                   type_bindings=names_visitor.types,
+                   value_bindings=names_visitor.values,
+                   globals_size=names.globals_size,
+                   type_scopes=Scopes(ctx.declared_types.items()),
+                   globals=tuple(annotate_visitor.scopes.frames[0]))
+
+
+class CompilerSession:
+    """Compiles programs that can use the declarations in `prelude`, which is
+    only compiled once"""
+    def __init__(self, prelude: str):
+        self.prelude = compile_prelude(prelude)
+        index = passes.index(resolve_declared_types)
+        self.compiler = Compiler(
+            passes=passes[:index] +
+            (resolve_declared_types_after(self.prelude), ) +
+            passes[index + 1:])
+
+    def compile(
+        self,
+        source: str,
+        instrumentation: Optional[Instrumentation] = None
+    ) -> CheckTypesContext:
+        return self.compiler.compile(source, instrumentation)
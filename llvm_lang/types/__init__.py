@@ -29,6 +29,10 @@ __all__ = (
 
 def type_(cls=None, **kwargs):
     if cls is not None:
+        # types are immutable and often nested deeply, so only hash them once
+        kwargs.setdefault(
+            'cache_hash',
+            kwargs.get('eq', True) and kwargs.get('hash', None) is not False)
         return attr.s(auto_attribs=True, frozen=True, **kwargs)(cls)
     return functools.partial(type_, **kwargs)
 
@@ -167,6 +171,9 @@ class NewType(ScopedType):
     def __eq__(self, other):
         return self.inner_type == other
 
+    def __hash__(self):
+        return hash(self.inner_type)
+
 
 @type_
 class UnionType(ScopedType):
@@ -280,8 +287,12 @@ class ArrayType(Type):
                 and self.length == other.length
         return NotImplemented
 
+    def __hash__(self):
+        # arrays compare equal to slices of the same element type
+        return hash(self.element_type)
 
-@type_
+
+@type_(hash=False)
 class SliceType(Type):
     """
     // is basically length + pointer to elems: type { i32 len, T* elems }
@@ -295,6 +306,9 @@ class SliceType(Type):
     def __str__(self):
         return f"{self.element_type}[]"
 
+    def __hash__(self):
+        return hash(self.element_type)
+
 
 @type_
 class FunctionType(ScopedType):
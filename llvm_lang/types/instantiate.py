@@ -42,10 +42,16 @@ def instantiate_unscoped_primitive(ty: types.Type, arguments,
 @instantiate_unscoped.register
 def instantiate_unscoped_typeref(self: types.TypeRef, arguments: TypeMap,
                                  scopes: Scopes) -> types.Type:
-    # if not scopes.has_binding(self.name):
-    #     raise errors.TypeError(f'Use of unresolved type {self.name}')
-    # return self
-    return instantiate(scopes.resolve_binding(self.name), arguments, scopes)
+    # type parameters are referred to by name in type expressions
+    variable = types.TypeVariable(self.name)
+    if variable in arguments:
+        return arguments[variable]
+
+    ty = scopes.resolve_binding(self.name)
+    if self.type_arguments:
+        return instantiate_scoped(ty, (instantiate(t, arguments, scopes)
+                                       for t in self.type_arguments), scopes)
+    return instantiate(ty, arguments, scopes)
 
 
 @instantiate_unscoped.register
@@ -0,0 +1,403 @@
+import attr
+import builtins
+
+from functools import singledispatchmethod
+from operator import itemgetter
+from typing import Dict, Hashable, Iterable, Mapping, Optional, Tuple
+
+from .. import types
+from ..errors import TypeError
+
+__all__ = (
+    'DataLayout',
+    'Niche',
+    'Layout',
+    'UnionLayout',
+    'LayoutEngine',
+)
+
+
+def align_to(offset: int, align: int) -> int:
+    return -(-offset // align) * align
+
+
+@attr.s(auto_attribs=True, frozen=True)
+class DataLayout:
+    """The parts of an LLVM target data layout that decide type layouts
+
+    Alignments are in bytes, keyed by the size of the type in bits.
+    """
+
+    pointer_size: int = 8
+    pointer_align: int = 8
+    int_aligns: Mapping[int, int] = attr.ib(factory=lambda: {
+        1: 1,
+        8: 1,
+        16: 2,
+        32: 4,
+        64: 8,
+        128: 16,
+    })
+    float_aligns: Mapping[int, int] = attr.ib(factory=lambda: {
+        16: 2,
+        32: 4,
+        64: 8,
+        128: 16,
+    })
+
+    @classmethod
+    def from_string(cls, layout: str) -> 'DataLayout':
+        """Parse an LLVM data layout string, like
+        ``e-m:e-i64:64-f80:128-n8:16:32:64-S128``"""
+        default = cls()
+        pointer_size = default.pointer_size
+        pointer_align = default.pointer_align
+        int_aligns = dict(default.int_aligns)
+        float_aligns = dict(default.float_aligns)
+
+        for spec in filter(None, layout.split('-')):
+            kind, *fields = spec.split(':')
+            if kind in ('p', 'p0'):
+                pointer_size = int(fields[0]) // 8
+                pointer_align = int(fields[1]) // 8
+            elif kind[0] == 'i' and kind[1:].isdigit():
+                int_aligns[int(kind[1:])] = int(fields[0]) // 8
+            elif kind[0] == 'f' and kind[1:].isdigit():
+                float_aligns[int(kind[1:])] = int(fields[0]) // 8
+
+        return cls(pointer_size=pointer_size,
+                   pointer_align=pointer_align,
+                   int_aligns=int_aligns,
+                   float_aligns=float_aligns)
+
+    def int_align(self, bits: int) -> int:
+        # same fallback as LLVM: the next larger specified integer, or the
+        # largest one if there is none
+        if bits in self.int_aligns:
+            return self.int_aligns[bits]
+        larger = [size for size in self.int_aligns if size > bits]
+        if larger:
+            return self.int_aligns[min(larger)]
+        return self.int_aligns[max(self.int_aligns)]
+
+    def float_align(self, bits: int) -> int:
+        return self.float_aligns.get(bits, bits // 8)
+
+
+@attr.s(auto_attribs=True, frozen=True)
+class Niche:
+    """A scalar inside a type that has bit patterns no valid value uses
+
+    The scalar is `size` bytes at `offset`, and only the values from `start` to
+    `end` (inclusive) are valid. Unions can store their tag in the values
+    after `end`.
+    """
+
+    offset: int
+    size: int
+    start: int
+    end: int
+
+    @property
+    def available(self) -> int:
+        return (1 << (8 * self.size)) - 1 - self.end
+
+    def reserve(self, count: int) -> Optional['Niche']:
+        if count >= self.available:
+            return None
+        return Niche(self.offset, self.size, self.start, self.end + count)
+
+    def moved(self, offset: int) -> 'Niche':
+        return Niche(self.offset + offset, self.size, self.start, self.end)
+
+
+def tag_niche(size: int, n_values: int) -> Optional[Niche]:
+    return Niche(0, size, 0, n_values - 1).reserve(0) if n_values else None
+
+
+@attr.s(auto_attribs=True, frozen=True, kw_only=True)
+class Layout:
+    """Size and alignment of a type in bytes
+
+    For aggregates, `offsets` holds the offset of each field or element in
+    declaration order, and `memory_order` the order they are stored in.
+    `niche` is the niche with the most unused values, if there is one.
+    """
+
+    size: int
+    align: int
+    offsets: Tuple[int, ...] = ()
+    memory_order: Tuple[int, ...] = ()
+    niche: Optional[Niche] = None
+
+
+@attr.s(auto_attribs=True, frozen=True, kw_only=True)
+class UnionLayout(Layout):
+    """Layout of a tagged union
+
+    Usually every variant is stored as if it were a struct starting with the
+    tag, and `payload_size` is the number of bytes after the tag, as in
+    ``{ i8, [payload_size x i8] }``.
+
+    When a variant has a niche big enough to tell the others apart, the union
+    is stored in the space of that variant instead. `niche_variant` is then
+    the variant stored as is, the tag is the niche scalar at `tag_offset`, and
+    the other variants are numbered from `niche_start` in it.
+
+    Either way, each entry of `variants` has the offsets of that variant's
+    fields relative to the start of the union.
+    """
+
+    tag_offset: int = 0
+    tag_size: int
+    payload_offset: int
+    payload_size: int
+    variants: Tuple[Layout, ...]
+    niche_variant: Optional[int] = None
+    niche_start: int = 0
+
+    def tag_value(self, variant: int) -> Optional[int]:
+        """The tag that marks a variant, or None if its payload is enough"""
+        if self.niche_variant is None:
+            return variant
+        if variant == self.niche_variant:
+            return None
+        return self.niche_start + variant - (variant > self.niche_variant)
+
+    def variant_of(self, tag: int) -> int:
+        if self.niche_variant is None:
+            return tag
+        index = tag - self.niche_start
+        if not 0 <= index < len(self.variants) - 1:
+            return self.niche_variant
+        return index + (index >= self.niche_variant)
+
+
+def tag_size(n_variants: int) -> int:
+    size = 1
+    while n_variants > 1 << (8 * size):
+        size *= 2
+    return size
+
+
+class LayoutEngine:
+    """Computes and caches type layouts for one target
+
+    With `reorder_fields`, struct fields are stored from the most to the least
+    aligned, which never needs more padding than declaration order. Unless
+    `niche_filling` is turned off, unions store their tag in a niche of their
+    largest variant whenever that makes them smaller.
+    """
+    def __init__(self,
+                 data_layout: Optional[DataLayout] = None,
+                 *,
+                 reorder_fields: bool = False,
+                 niche_filling: bool = True):
+        self.data_layout = data_layout or DataLayout()
+        self.reorder_fields = reorder_fields
+        self.niche_filling = niche_filling
+        self.cache: Dict[Hashable, Layout] = {}
+
+    def layout(self, ty: types.Type) -> Layout:
+        try:
+            key = (type(ty), ty)
+            cached = self.cache.get(key)
+        except builtins.TypeError:
+            # types holding lists can't be hashed, so can't be cached
+            return self._layout(ty)
+
+        if cached is None:
+            cached = self.cache[key] = self._layout(ty)
+        return cached
+
+    def size_of(self, ty: types.Type) -> int:
+        return self.layout(ty).size
+
+    def align_of(self, ty: types.Type) -> int:
+        return self.layout(ty).align
+
+    def field_offset(self, ty: types.StructType, name: str) -> int:
+        for i, (field_name, _field_type) in enumerate(ty.fields):
+            if field_name == name:
+                return self.layout(ty).offsets[i]
+        raise TypeError(f'Struct type {ty} has no field "{name}"')
+
+    def aggregate(self,
+                  members: Iterable[types.Type],
+                  *,
+                  start: int = 0,
+                  start_align: int = 1,
+                  reorder: bool = False) -> Layout:
+        layouts = [self.layout(member) for member in members]
+        order = range(len(layouts))
+        if reorder:
+            order = sorted(order, key=lambda i: -layouts[i].align)
+
+        offsets = [0] * len(layouts)
+        offset = start
+        align = start_align
+        niche = None
+        for i in order:
+            offset = align_to(offset, layouts[i].align)
+            offsets[i] = offset
+            offset += layouts[i].size
+            align = max(align, layouts[i].align)
+            niche = best_niche(niche, layouts[i].niche, offsets[i])
+
+        return Layout(size=align_to(offset, align),
+                      align=align,
+                      offsets=tuple(offsets),
+                      memory_order=tuple(order),
+                      niche=niche)
+
+    @singledispatchmethod
+    def _layout(self, ty: types.Type) -> Layout:
+        raise TypeError(f'Cannot compute the layout of unresolved type {ty}')
+
+    @_layout.register
+    def _layout_int(self, ty: types.IntType) -> Layout:
+        return Layout(size=ty.size // 8,
+                      align=self.data_layout.int_align(ty.size))
+
+    @_layout.register
+    def _layout_float(self, ty: types.FloatType) -> Layout:
+        return Layout(size=ty.size // 8,
+                      align=self.data_layout.float_align(ty.size))
+
+    @_layout.register
+    def _layout_bool(self, ty: types.BoolType) -> Layout:
+        return Layout(size=1,
+                      align=self.data_layout.int_align(1),
+                      niche=tag_niche(1, 2))
+
+    @_layout.register(types.SymbolType)
+    @_layout.register(types.FunctionType)
+    def _layout_pointer_sized(self, ty: types.Type) -> Layout:
+        return Layout(size=self.data_layout.pointer_size,
+                      align=self.data_layout.pointer_align)
+
+    @_layout.register
+    def _layout_void(self, ty: types.VoidType) -> Layout:
+        return Layout(size=0, align=1)
+
+    @_layout.register
+    def _layout_enum(self, ty: types.EnumType) -> Layout:
+        size = tag_size(len(ty.variants))
+        return Layout(size=size,
+                      align=self.data_layout.int_align(size * 8),
+                      niche=tag_niche(size, len(ty.variants)))
+
+    @_layout.register
+    def _layout_newtype(self, ty: types.NewType) -> Layout:
+        return self.layout(ty.inner_type)
+
+    @_layout.register
+    def _layout_struct(self, ty: types.StructType) -> Layout:
+        return self.aggregate(map(itemgetter(1), ty.fields),
+                              reorder=self.reorder_fields)
+
+    @_layout.register
+    def _layout_tuple(self, ty: types.TupleType) -> Layout:
+        return self.aggregate(ty.elements)
+
+    @_layout.register
+    def _layout_array(self, ty: types.ArrayType) -> Layout:
+        element = self.layout(ty.element_type)
+        return Layout(size=element.size * ty.length,
+                      align=element.align,
+                      offsets=tuple(element.size * i
+                                    for i in range(ty.length)),
+                      niche=element.niche if ty.length else None)
+
+    @_layout.register
+    def _layout_slice(self, ty: types.SliceType) -> Layout:
+        # { i32 len, T* elems }
+        pointer = align_to(4, self.data_layout.pointer_align)
+        align = max(self.data_layout.int_align(32),
+                    self.data_layout.pointer_align)
+        return Layout(size=align_to(pointer + self.data_layout.pointer_size,
+                                    align),
+                      align=align,
+                      offsets=(0, pointer))
+
+    def _variant_layout(self, variant: types.Type, start: int,
+                        start_align: int) -> Layout:
+        if isinstance(variant, types.TupleType):
+            return self.aggregate(variant.elements,
+                                  start=start,
+                                  start_align=start_align)
+        return self.aggregate(map(itemgetter(1), variant.fields),
+                              start=start,
+                              start_align=start_align,
+                              reorder=self.reorder_fields)
+
+    @_layout.register
+    def _layout_union(self, ty: types.UnionType) -> Layout:
+        variants = list(map(itemgetter(1), ty.variants))
+        tagged = self._tagged_union_layout(variants)
+        if self.niche_filling:
+            niche_filled = self._niche_filled_union_layout(variants)
+            if niche_filled is not None and niche_filled.size < tagged.size:
+                return niche_filled
+        return tagged
+
+    def _tagged_union_layout(self, variants) -> UnionLayout:
+        tag = tag_size(len(variants))
+        tag_align = self.data_layout.int_align(tag * 8)
+        layouts = [
+            self._variant_layout(variant, tag, tag_align)
+            for variant in variants
+        ]
+
+        size = max((v.size for v in layouts), default=tag)
+        align = max((v.align for v in layouts), default=tag_align)
+        return UnionLayout(size=size,
+                           align=align,
+                           tag_size=tag,
+                           payload_offset=tag,
+                           payload_size=size - tag,
+                           variants=tuple(layouts),
+                           niche=tag_niche(tag, len(variants)))
+
+    def _niche_filled_union_layout(self, variants) -> Optional[UnionLayout]:
+        layouts = [self._variant_layout(variant, 0, 1) for variant in variants]
+        if not layouts:
+            return None
+
+        def niche_key(i):
+            niche = layouts[i].niche
+            return layouts[i].size, niche.available if niche else -1
+
+        dataful = max(range(len(layouts)), key=niche_key)
+        niche = layouts[dataful].niche
+        needed = len(layouts) - 1
+        if niche is None or niche.available < needed:
+            return None
+
+        # the other variants must fit entirely before or after the niche
+        niche_end = niche.offset + niche.size
+        for i, layout in enumerate(layouts):
+            if i != dataful and layout.size > niche.offset:
+                layouts[i] = self._variant_layout(variants[i], niche_end, 1)
+
+        align = max(v.align for v in layouts)
+        size = align_to(max(v.size for v in layouts), align)
+        return UnionLayout(size=size,
+                           align=align,
+                           tag_offset=niche.offset,
+                           tag_size=niche.size,
+                           payload_offset=0,
+                           payload_size=size,
+                           variants=tuple(layouts),
+                           niche_variant=dataful,
+                           niche_start=niche.end + 1,
+                           niche=niche.reserve(needed))
+
+
+def best_niche(best: Optional[Niche], niche: Optional[Niche],
+               offset: int) -> Optional[Niche]:
+    if niche is None:
+        return best
+    if best is None or niche.available > best.available:
+        return niche.moved(offset)
+    return best
@@ -0,0 +1,211 @@
+import builtins
+
+from functools import singledispatch, singledispatchmethod
+from operator import itemgetter
+from typing import Dict, Hashable, Optional, Union
+
+from llvmlite import ir
+
+from .. import types
+from ..errors import TypeError
+from .layout import LayoutEngine, UnionLayout
+
+__all__ = ('TypeLowering', 'mangle')
+
+
+@singledispatch
+def mangle(ty: types.Type) -> str:
+    """A name for `ty` made of letters, digits and underscores, which no
+    other type has"""
+    raise TypeError(f'Cannot lower unresolved type {ty}')
+
+
+@mangle.register
+def mangle_int(ty: types.IntType) -> str:
+    return f'{"i" if ty.signed else "u"}{ty.size}'
+
+
+@mangle.register
+def mangle_float(ty: types.FloatType) -> str:
+    return f'f{ty.size}'
+
+
+@mangle.register
+def mangle_bool(ty: types.BoolType) -> str:
+    return 'b'
+
+
+@mangle.register
+def mangle_symbol(ty: types.SymbolType) -> str:
+    return 'y'
+
+
+@mangle.register
+def mangle_void(ty: types.VoidType) -> str:
+    return 'v'
+
+
+@mangle.register
+def mangle_newtype(ty: types.NewType) -> str:
+    # a newtype is the same type as what it wraps
+    return mangle(ty.inner_type)
+
+
+@mangle.register(types.EnumType)
+@mangle.register(types.StructType)
+@mangle.register(types.UnionType)
+def mangle_named(ty) -> str:
+    # the length says where the name ends
+    name = f'{len(ty.name)}{ty.name}'
+    arguments = getattr(ty, 'type_arguments', ())
+    if arguments:
+        return f'{name}I{"".join(map(mangle, arguments))}E'
+    return name
+
+
+@mangle.register
+def mangle_tuple(ty: types.TupleType) -> str:
+    return f'T{"".join(map(mangle, ty.elements))}E'
+
+
+@mangle.register
+def mangle_array(ty: types.ArrayType) -> str:
+    return f'A{ty.length}_{mangle(ty.element_type)}'
+
+
+@mangle.register
+def mangle_slice(ty: types.SliceType) -> str:
+    return f'S{mangle(ty.element_type)}'
+
+
+@mangle.register
+def mangle_function(ty: types.FunctionType) -> str:
+    parameters = ''.join(mangle(param) for _, param in ty.parameters)
+    return f'F{mangle(ty.return_type)}{parameters}E'
+
+
+class TypeLowering:
+    """Lowers types to the LLVM types their docstrings describe
+
+    Enums, structs and unions become identified struct types named like
+    ``%struct.Token`` in `context`, and instances of generic types are named
+    by their mangled type arguments, like ``%struct.Pair.i64.3BoxIf64E`` for
+    ``Pair<int64, Box<float64>>``. A type that is already declared there is
+    used as is, even while its body is still being lowered, so types can
+    refer to themselves through slices.
+
+    Every type is lowered once, so modules sharing a lowering (and its
+    context) share their types.
+    """
+    def __init__(self,
+                 context: ir.Context,
+                 layouts: Optional[LayoutEngine] = None):
+        self.context = context
+        self.layouts = layouts or LayoutEngine()
+        self.cache: Dict[Hashable, ir.Type] = {}
+
+    def lower(self, ty: types.Type) -> ir.Type:
+        try:
+            key = (type(ty), ty)
+            cached = self.cache.get(key)
+        except builtins.TypeError:
+            # types holding lists can't be hashed, so can't be cached
+            return self._lower(ty)
+
+        if cached is None:
+            cached = self.cache[key] = self._lower(ty)
+        return cached
+
+    def name(self, kind: str, ty: Union[types.StructType,
+                                        types.UnionType]) -> str:
+        arguments = ty.type_arguments
+        if not arguments:
+            return f'{kind}.{ty.name}'
+        return f'{kind}.{ty.name}.{".".join(map(mangle, arguments))}'
+
+    def identified(self, name: str, *elements: ir.Type) -> ir.Type:
+        declared = name in self.context.identified_types
+        struct = self.context.get_identified_type(name)
+        if not declared:
+            struct.set_body(*elements)
+        return struct
+
+    @singledispatchmethod
+    def _lower(self, ty: types.Type) -> ir.Type:
+        raise TypeError(f'Cannot lower unresolved type {ty}')
+
+    @_lower.register
+    def _lower_int(self, ty: types.IntType) -> ir.Type:
+        return ir.IntType(ty.size)
+
+    @_lower.register
+    def _lower_float(self, ty: types.FloatType) -> ir.Type:
+        return ir.FloatType() if ty.size == 32 else ir.DoubleType()
+
+    @_lower.register
+    def _lower_bool(self, ty: types.BoolType) -> ir.Type:
+        return ir.IntType(1)
+
+    @_lower.register
+    def _lower_symbol(self, ty: types.SymbolType) -> ir.Type:
+        return ir.IntType(8 * self.layouts.data_layout.pointer_size)
+
+    @_lower.register
+    def _lower_void(self, ty: types.VoidType) -> ir.Type:
+        return ir.VoidType()
+
+    @_lower.register
+    def _lower_enum(self, ty: types.EnumType) -> ir.Type:
+        size = self.layouts.size_of(ty)
+        return self.identified(f'enum.{ty.name}', ir.IntType(8 * size))
+
+    @_lower.register
+    def _lower_newtype(self, ty: types.NewType) -> ir.Type:
+        return self.lower(ty.inner_type)
+
+    @_lower.register
+    def _lower_struct(self, ty: types.StructType) -> ir.Type:
+        name = self.name('struct', ty)
+        if name in self.context.identified_types:
+            return self.context.get_identified_type(name)
+        # declared before its fields are lowered, in case they refer to it
+        struct = self.context.get_identified_type(name)
+        struct.set_body(*(self.lower(field)
+                          for field in map(itemgetter(1), ty.fields)))
+        return struct
+
+    @_lower.register
+    def _lower_union(self, ty: types.UnionType) -> ir.Type:
+        layout = self.layouts.layout(ty)
+        assert isinstance(layout, UnionLayout)
+        if layout.niche_variant is not None:
+            # the tag is inside one of the variants
+            return self.identified(self.name('union', ty),
+                                   ir.ArrayType(ir.IntType(8), layout.size))
+        return self.identified(
+            self.name('union', ty), ir.IntType(8 * layout.tag_size),
+            ir.ArrayType(ir.IntType(8), layout.payload_size))
+
+    @_lower.register
+    def _lower_tuple(self, ty: types.TupleType) -> ir.Type:
+        return ir.LiteralStructType([self.lower(e) for e in ty.elements])
+
+    @_lower.register
+    def _lower_array(self, ty: types.ArrayType) -> ir.Type:
+        return ir.ArrayType(self.lower(ty.element_type), ty.length)
+
+    @_lower.register
+    def _lower_slice(self, ty: types.SliceType) -> ir.Type:
+        # { i32 len, T* elems }
+        return ir.LiteralStructType(
+            [ir.IntType(32),
+             self.lower(ty.element_type).as_pointer()])
+
+    @_lower.register
+    def _lower_function(self, ty: types.FunctionType) -> ir.Type:
+        return self.function_type(ty).as_pointer()
+
+    def function_type(self, ty: types.FunctionType) -> ir.FunctionType:
+        return ir.FunctionType(
+            self.lower(ty.return_type),
+            [self.lower(param) for param in map(itemgetter(1), ty.parameters)])
@@ -0,0 +1,361 @@
+import builtins
+import collections.abc
+import enum
+import struct
+
+from array import array
+from typing import Dict, Hashable, Iterator, List, Mapping, Optional, Tuple
+
+from .. import types
+
+__all__ = (
+    'Kind',
+    'TypeTable',
+    'TypeTableMapping',
+)
+
+
+class Kind(enum.IntEnum):
+    INT = enum.auto()
+    FLOAT = enum.auto()
+    BOOL = enum.auto()
+    SYMBOL = enum.auto()
+    VOID = enum.auto()
+    ENUM = enum.auto()
+    TYPE_VARIABLE = enum.auto()
+    TYPE_REF = enum.auto()
+    NEWTYPE = enum.auto()
+    UNION = enum.auto()
+    STRUCT = enum.auto()
+    TUPLE = enum.auto()
+    ARRAY = enum.auto()
+    SLICE = enum.auto()
+    FUNCTION = enum.auto()
+
+
+KINDS = {
+    types.IntType: Kind.INT,
+    types.FloatType: Kind.FLOAT,
+    types.BoolType: Kind.BOOL,
+    types.SymbolType: Kind.SYMBOL,
+    types.VoidType: Kind.VOID,
+    types.EnumType: Kind.ENUM,
+    types.TypeVariable: Kind.TYPE_VARIABLE,
+    types.TypeRef: Kind.TYPE_REF,
+    types.NewType: Kind.NEWTYPE,
+    types.UnionType: Kind.UNION,
+    types.StructType: Kind.STRUCT,
+    types.TupleType: Kind.TUPLE,
+    types.ArrayType: Kind.ARRAY,
+    types.SliceType: Kind.SLICE,
+    types.FunctionType: Kind.FUNCTION,
+}
+
+NONE = -1
+# the IDs of the types interned so far, by their fields
+Memo = Dict[Hashable, int]
+
+MAGIC = b'LLTT\x01'
+ARRAYS = ('kinds', 'names', 'values', 'starts', 'n_parameters', 'n_arguments',
+          'children', 'child_names')
+
+
+class TypeTable:
+    """Compact storage for the types of one compilation
+
+    Every distinct type is stored once and identified by an integer, so two
+    IDs are equal exactly when the types they stand for are structurally
+    identical. The kind, name and scalar value (int/float size or array
+    length) of each type live in typed arrays. Its children are a slice of
+    `children`, made of its type parameters, then its type arguments, then its
+    members (fields, variants, elements, parameters...), with the name of each
+    member in `child_names`.
+
+    `get` turns an ID back into the usual `types.*` object for code that still
+    needs one.
+    """
+    def __init__(self):
+        self.kinds = array('B')
+        self.names = array('i')
+        self.values = array('q')
+        self.starts = array('i', [0])
+        self.n_parameters = array('H')
+        self.n_arguments = array('H')
+        self.children = array('i')
+        self.child_names = array('i')
+
+        self.symbols: List[str] = []
+        self.symbol_ids: Dict[str, int] = {}
+        self.ids: Dict[tuple, int] = {}
+        self.objects: Dict[int, types.Type] = {}
+
+    def __len__(self) -> int:
+        return len(self.kinds)
+
+    def symbol(self, name: Optional[str]) -> int:
+        if name is None:
+            return NONE
+        symbol = self.symbol_ids.get(name)
+        if symbol is None:
+            symbol = self.symbol_ids[name] = len(self.symbols)
+            self.symbols.append(name)
+        return symbol
+
+    def name(self, type_id: int) -> Optional[str]:
+        symbol = self.names[type_id]
+        return None if symbol == NONE else self.symbols[symbol]
+
+    def kind(self, type_id: int) -> Kind:
+        return Kind(self.kinds[type_id])
+
+    def members(self, type_id: int) -> array:
+        start = (self.starts[type_id] + self.n_parameters[type_id] +
+                 self.n_arguments[type_id])
+        return self.children[start:self.starts[type_id + 1]]
+
+    def member_names(self, type_id: int) -> List[Optional[str]]:
+        start = (self.starts[type_id] + self.n_parameters[type_id] +
+                 self.n_arguments[type_id])
+        return [
+            None if symbol == NONE else self.symbols[symbol]
+            for symbol in self.child_names[start:self.starts[type_id + 1]]
+        ]
+
+    def _add(self, kind: Kind, name: int, value: int,
+             parameters: Tuple[int, ...], arguments: Tuple[int, ...],
+             members: Tuple[int, ...], member_names: Tuple[int, ...]) -> int:
+        key = (kind, name, value, parameters, arguments, members, member_names)
+        type_id = self.ids.get(key)
+        if type_id is not None:
+            return type_id
+
+        type_id = self.ids[key] = len(self.kinds)
+        self.kinds.append(kind)
+        self.names.append(name)
+        self.values.append(value)
+        self.n_parameters.append(len(parameters))
+        self.n_arguments.append(len(arguments))
+        self.children.extend(parameters)
+        self.children.extend(arguments)
+        self.children.extend(members)
+        self.child_names.extend([NONE] * (len(parameters) + len(arguments)))
+        self.child_names.extend(member_names)
+        self.starts.append(len(self.children))
+        return type_id
+
+    def intern(self, ty: types.Type, _memo: Optional[Memo] = None) -> int:
+        """Add a type and everything it contains, returning its ID"""
+        memo = {} if _memo is None else _memo
+        # equal subtrees are only walked once; types that can't be hashed, or
+        # that compare loosely like newtypes, are remembered by identity
+        key: Hashable = (type(ty), id(ty))
+        if not isinstance(ty, types.NewType):
+            try:
+                key = (type(ty), ty)
+                hash(key)
+            except builtins.TypeError:
+                key = (type(ty), id(ty))
+
+        type_id = memo.get(key)
+        if type_id is None:
+            type_id = memo[key] = self._intern(ty, memo)
+        return type_id
+
+    def intern_all(self,
+                   declared_types: Mapping[str, types.Type]) -> Dict[str, int]:
+        memo: Memo = {}
+        return {
+            name: self.intern(ty, memo)
+            for name, ty in declared_types.items()
+        }
+
+    def _intern(self, ty: types.Type, memo: Memo) -> int:  # noqa C901
+        kind = KINDS[type(ty)]
+        name = self.symbol(getattr(ty, 'name', None))
+        value = 0
+        parameters: Tuple[int, ...] = ()
+        arguments: Tuple[int, ...] = ()
+        members: Tuple[int, ...] = ()
+        member_names: Tuple[int, ...] = ()
+
+        def intern_named(pairs):
+            return (tuple(self.intern(t, memo) for _name, t in pairs),
+                    tuple(self.symbol(name) for name, _t in pairs))
+
+        if isinstance(ty, types.ScopedType):
+            parameters = tuple(
+                self.intern(t, memo) for t in ty.type_parameters)
+            arguments = tuple(NONE if t is None else self.intern(t, memo)
+                              for t in ty.type_arguments)
+
+        if kind == Kind.INT:
+            value = ty.size if ty.signed else -ty.size
+        elif kind == Kind.FLOAT:
+            value = ty.size
+        elif kind == Kind.ENUM:
+            members = (NONE, ) * len(ty.variants)
+            member_names = tuple(map(self.symbol, ty.variants))
+        elif kind == Kind.TYPE_REF:
+            arguments = tuple(self.intern(t, memo) for t in ty.type_arguments)
+        elif kind == Kind.NEWTYPE:
+            members = (self.intern(ty.inner_type, memo), )
+            member_names = (NONE, )
+        elif kind == Kind.UNION:
+            members, member_names = intern_named(ty.variants)
+        elif kind == Kind.STRUCT:
+            members, member_names = intern_named(ty.fields)
+        elif kind == Kind.TUPLE:
+            members = tuple(self.intern(t, memo) for t in ty.elements)
+            member_names = (NONE, ) * len(members)
+        elif kind == Kind.ARRAY:
+            value = ty.length
+            members = (self.intern(ty.element_type, memo), )
+            member_names = (NONE, )
+        elif kind == Kind.SLICE:
+            members = (self.intern(ty.element_type, memo), )
+            member_names = (NONE, )
+        elif kind == Kind.FUNCTION:
+            members, member_names = intern_named(ty.parameters)
+            return_type = NONE if ty.return_type is None else self.intern(
+                ty.return_type, memo)
+            members = (return_type, ) + members
+            member_names = (NONE, ) + member_names
+
+        return self._add(kind, name, value, parameters, arguments, members,
+                         member_names)
+
+    def get(self, type_id: int) -> types.Type:
+        """The `types.*` object for an ID, built once and then reused"""
+        ty = self.objects.get(type_id)
+        if ty is None:
+            ty = self.objects[type_id] = self._build(type_id)
+        return ty
+
+    def _build(self, type_id: int) -> types.Type:  # noqa C901
+        kind = self.kind(type_id)
+        name = self.name(type_id)
+        value = self.values[type_id]
+        start = self.starts[type_id]
+        n_parameters = self.n_parameters[type_id]
+        n_arguments = self.n_arguments[type_id]
+        members = [
+            None if t == NONE else self.get(t) for t in self.members(type_id)
+        ]
+        member_names = self.member_names(type_id)
+        scoped = dict(type_parameters=tuple(
+            map(self.get, self.children[start:start + n_parameters])),
+                      type_arguments=tuple(
+                          None if t == NONE else self.get(t)
+                          for t in self.children[start + n_parameters:start +
+                                                 n_parameters + n_arguments]))
+
+        if kind == Kind.INT:
+            return types.IntType(size=abs(value), signed=value > 0)
+        elif kind == Kind.FLOAT:
+            return types.FloatType(size=value)
+        elif kind == Kind.BOOL:
+            return types.BoolType()
+        elif kind == Kind.SYMBOL:
+            return types.SymbolType()
+        elif kind == Kind.VOID:
+            return types.VoidType()
+        elif kind == Kind.ENUM:
+            return types.EnumType(name=name, variants=tuple(member_names))
+        elif kind == Kind.TYPE_VARIABLE:
+            return types.TypeVariable(name=name)
+        elif kind == Kind.TYPE_REF:
+            return types.TypeRef(name=name,
+                                 type_arguments=scoped['type_arguments'])
+        elif kind == Kind.NEWTYPE:
+            return types.NewType(name=name, inner_type=members[0], **scoped)
+        elif kind == Kind.UNION:
+            return types.UnionType(name=name,
+                                   variants=tuple(zip(member_names, members)),
+                                   **scoped)
+        elif kind == Kind.STRUCT:
+            return types.StructType(name=name,
+                                    fields=tuple(zip(member_names, members)),
+                                    **scoped)
+        elif kind == Kind.TUPLE:
+            return types.TupleType(elements=tuple(members))
+        elif kind == Kind.ARRAY:
+            return types.ArrayType(length=value, element_type=members[0])
+        elif kind == Kind.SLICE:
+            return types.SliceType(element_type=members[0])
+        elif kind == Kind.FUNCTION:
+            return types.FunctionType(name=name,
+                                      return_type=members[0],
+                                      parameters=tuple(
+                                          zip(member_names[1:], members[1:])),
+                                      **scoped)
+        raise NotImplementedError(kind)
+
+    def to_bytes(self) -> bytes:
+        """Serialize the table, in native byte order"""
+        chunks = [MAGIC]
+        for attribute in ARRAYS:
+            data = getattr(self, attribute).tobytes()
+            chunks.append(struct.pack('<Q', len(data)))
+            chunks.append(data)
+        symbols = '\0'.join(self.symbols).encode('utf-8')
+        chunks.append(struct.pack('<QQ', len(self.symbols), len(symbols)))
+        chunks.append(symbols)
+        return b''.join(chunks)
+
+    @classmethod
+    def from_bytes(cls, data: bytes) -> 'TypeTable':
+        if not data.startswith(MAGIC):
+            raise ValueError('Not a serialized type table')
+        table = cls()
+        offset = len(MAGIC)
+        for attribute in ARRAYS:
+            size, = struct.unpack_from('<Q', data, offset)
+            offset += 8
+            storage = array(getattr(table, attribute).typecode)
+            storage.frombytes(data[offset:offset + size])
+            setattr(table, attribute, storage)
+            offset += size
+
+        n_symbols, size = struct.unpack_from('<QQ', data, offset)
+        offset += 16
+        if n_symbols:
+            table.symbols = data[offset:offset +
+                                 size].decode('utf-8').split('\0')
+        table.symbol_ids = {
+            name: symbol
+            for symbol, name in enumerate(table.symbols)
+        }
+
+        for type_id in range(len(table)):
+            start = table.starts[type_id]
+            n_scoped = table.n_parameters[type_id] + table.n_arguments[type_id]
+            end = table.starts[type_id + 1]
+            children = table.children[start:end]
+            key = (Kind(table.kinds[type_id]), table.names[type_id],
+                   table.values[type_id],
+                   tuple(children[:table.n_parameters[type_id]]),
+                   tuple(children[table.n_parameters[type_id]:n_scoped]),
+                   tuple(children[n_scoped:]),
+                   tuple(table.child_names[start + n_scoped:end]))
+            table.ids[key] = type_id
+        return table
+
+
+class TypeTableMapping(collections.abc.Mapping):
+    """A read-only `declared_types` table backed by a `TypeTable`
+
+    Types are only turned into `types.*` objects when they are looked up, so
+    existing passes can use it in place of a dict.
+    """
+    def __init__(self, table: TypeTable, ids: Dict[str, int]):
+        self.table = table
+        self.ids = ids
+
+    def __getitem__(self, name: str) -> types.Type:
+        return self.table.get(self.ids[name])
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self.ids)
+
+    def __len__(self) -> int:
+        return len(self.ids)
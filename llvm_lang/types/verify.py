@@ -1,6 +1,8 @@
-from collections import Counter
-from functools import singledispatch
+import builtins
+
+from functools import singledispatch, singledispatchmethod
 from operator import itemgetter
+from typing import FrozenSet, Hashable, Iterable, Mapping, Optional, Set
 
 from .. import types
 from ..errors import ReferenceError, TypeError
@@ -13,6 +15,7 @@ def verify(t):
 
 @verify.register(types.BoolType)
 @verify.register(types.SymbolType)
+@verify.register(types.VoidType)
 def verify_always_valid(_self):
     pass
 
@@ -44,10 +47,11 @@ def verify_float_type(self: types.FloatType):
 
 
 def verify_no_duplicate(elems, msg):
-    counted = Counter(elems)
-    most_common, times = counted.most_common(1)[0]
-    if times > 1:
-        raise TypeError(msg % most_common)
+    seen = set()
+    for elem in elems:
+        if elem in seen:
+            raise TypeError(msg % (elem, ))
+        seen.add(elem)
 
 
 @verify.register
@@ -111,3 +115,125 @@ def verify_function_type(self: types.FunctionType):
         verify(self.return_type)
     for _name, ty in self.parameters:
         verify(ty)
+
+
+class DeclaredTypesVerifier:
+    """Verifies a whole table of declared types in one batch
+
+    Unlike `verify`, references to other declared types are checked against
+    the table instead of being rejected, and every distinct type is only
+    verified once, no matter how many declarations share it.
+    """
+    def __init__(self, declared_types: Mapping[str, types.Type]):
+        self.declared_types = declared_types
+        self.verified: Set[Hashable] = set()
+        self.type_variables: FrozenSet[types.TypeVariable] = frozenset()
+
+    def verify_all(self, names: Optional[Iterable[str]] = None):
+        """Verify the types declared as `names`, or all of them"""
+        if names is None:
+            names = self.declared_types
+        for name in names:
+            self.verify(self.declared_types[name])
+
+    def verify(self, ty: types.Type):
+        key = self._memo_key(ty)
+        if key in self.verified:
+            return
+        self._verify(ty)
+        self.verified.add(key)
+
+    def _memo_key(self, ty: types.Type) -> Hashable:
+        # newtypes compare equal to their inner type, so only identity can
+        # tell them apart
+        if not isinstance(ty, types.NewType):
+            key = (type(ty), ty, self.type_variables)
+            try:
+                hash(key)
+                return key
+            except builtins.TypeError:
+                pass
+        return (type(ty), id(ty), self.type_variables)
+
+    @singledispatchmethod
+    def _verify(self, ty: types.Type):
+        verify(ty)
+
+    @_verify.register
+    def _verify_type_variable(self, ty: types.TypeVariable):
+        if ty not in self.type_variables:
+            raise ReferenceError(f"Type variable {ty.name} is not defined")
+
+    @_verify.register
+    def _verify_type_ref(self, ty: types.TypeRef):
+        if types.TypeVariable(ty.name) in self.type_variables:
+            if ty.type_arguments:
+                raise TypeError(
+                    f"Type variable {ty.name} does not take type arguments")
+            return
+        if ty.name not in self.declared_types:
+            raise ReferenceError(f"Type {ty.name} is not defined")
+
+        declared = self.declared_types[ty.name]
+        if isinstance(declared, types.ScopedType):
+            expected = len(declared.type_parameters)
+            if len(ty.type_arguments) != expected:
+                raise TypeError(f"Type {ty.name} expects {expected} type "
+                                f"arguments, got {len(ty.type_arguments)}")
+        for argument in ty.type_arguments:
+            self.verify(argument)
+
+    def _verify_scoped(self, ty: types.ScopedType, children):
+        verify_scopedtype(ty)
+        outer = self.type_variables
+        if ty.type_parameters:
+            self.type_variables = outer.union(ty.type_parameters)
+        try:
+            for child in children:
+                self.verify(child)
+        finally:
+            self.type_variables = outer
+
+    @_verify.register
+    def _verify_newtype(self, ty: types.NewType):
+        self._verify_scoped(ty, (ty.inner_type, ))
+
+    @_verify.register
+    def _verify_union_type(self, ty: types.UnionType):
+        verify_no_duplicate(map(itemgetter(0), ty.variants),
+                            "Duplicate union variant %s")
+        self._verify_scoped(ty, map(itemgetter(1), ty.variants))
+
+    @_verify.register
+    def _verify_struct_type(self, ty: types.StructType):
+        verify_no_duplicate(map(itemgetter(0), ty.fields),
+                            "Duplicate field name %s")
+        self._verify_scoped(ty, map(itemgetter(1), ty.fields))
+
+    @_verify.register
+    def _verify_tuple_type(self, ty: types.TupleType):
+        for element in ty.elements:
+            self.verify(element)
+
+    @_verify.register
+    def _verify_array_type(self, ty: types.ArrayType):
+        if ty.length < 0:
+            raise TypeError("Array length must be a positive integer")
+        self.verify(ty.element_type)
+
+    @_verify.register
+    def _verify_slice_type(self, ty: types.SliceType):
+        self.verify(ty.element_type)
+
+    @_verify.register
+    def _verify_function_type(self, ty: types.FunctionType):
+        verify_no_duplicate(map(itemgetter(0), ty.parameters),
+                            "Duplicate parameter name %s")
+        children = [ty.return_type] if ty.return_type else []
+        children.extend(map(itemgetter(1), ty.parameters))
+        self._verify_scoped(ty, children)
+
+
+def verify_types(declared_types: Mapping[str, types.Type],
+                 names: Optional[Iterable[str]] = None):
+    DeclaredTypesVerifier(declared_types).verify_all(names)
@@ -0,0 +1,105 @@
+import pytest
+
+from llvm_lang import ast, errors, types
+from llvm_lang.ast.types import infer_type
+from llvm_lang.compiler import Compiler, compiler, passes
+from llvm_lang.passes.check_types import check_types
+from llvm_lang.scopes import Scopes
+from llvm_lang.types import primitive_types as p
+
+SOURCE = '''
+function main(): int32 {
+    let a: int32 = add(1, 2) * 3;
+    let b: int64 = 4;
+    add(a, a);
+    return a;
+}
+
+function add(x: int32, y: int32): int32 {
+    return x + y;
+}
+'''
+
+
+def expressions(node):
+    found = []
+
+    class Finder(ast.Visitor):
+        def visit_Expression(self, n):
+            found.append(n)
+            self.generic_visit(n)
+
+    Finder().visit(node)
+    return found
+
+
+# stops before the optimizations, which would remove the unused `b`
+checker = Compiler(passes=passes[:passes.index(check_types) + 1])
+
+
+def test_every_expression_is_typed():
+    ctx = checker.compile(SOURCE)
+    exprs = expressions(ctx.ast_root)
+
+    assert not any(isinstance(e, ast.TypedExpression) for e in exprs)
+    assert len(ctx.expression_types) == len(exprs) == 15
+    assert all(id(e) in ctx.expression_types for e in exprs)
+
+    main = ctx.ast_root[0]
+    a, b = main.body[:2]
+    # literals take their type from the variable they initialize
+    assert ctx.expression_types[id(a.initializer)] == p['int32']
+    assert ctx.expression_types[id(a.initializer.rhs)] == p['int32']
+    assert ctx.expression_types[id(b.initializer)] == p['int64']
+
+    fn_type = ctx.expression_types[id(a.initializer.lhs.target)]
+    assert isinstance(fn_type, types.FunctionType)
+    assert fn_type.return_type == p['int32']
+
+
+def test_infer_type_reuses_recorded_types():
+    node = ast.BinaryOperation(lhs=ast.Identifier('a'),
+                               op=ast.Op.plus,
+                               rhs=ast.IntegerLiteral(1))
+    expression_types = {id(node.lhs): p['int8']}
+
+    # `a` is unbound, so it can only come from the table
+    assert infer_type(node, Scopes(), None, expression_types) == p['int8']
+    assert expression_types[id(node.rhs)] == p['int8']
+    assert expression_types[id(node)] == p['int8']
+
+
+def test_check_types_errors():
+    with pytest.raises(errors.TypeError):
+        compiler.compile('''
+function f(x: int64): int64 { return x; }
+function g(): int64 { return f(1, 2); }
+''')
+
+    with pytest.raises(errors.TypeError):
+        compiler.compile('function f(x: int64): int32 { return x; }')
+
+    with pytest.raises(errors.TypeError):
+        compiler.compile('function f(): int32 { return; }')
+
+    compiler.compile('function f(): void { return; }')
+
+
+def test_only_numbers_are_negated():
+    with pytest.raises(errors.TypeError, match='must be numeric'):
+        compiler.compile('function f(s: uint8[]): uint8[] { return -s; }')
+
+    with pytest.raises(errors.TypeError, match='must be numeric'):
+        compiler.compile('''
+struct Point {
+    x: int64
+}
+
+function f(p: Point): Point { return -p; }
+''')
+
+    compiler.compile('''
+newtype Meters = float64;
+function f(a: Meters): Meters { return -a; }
+function g(b: int8): int8 { return -b; }
+''')
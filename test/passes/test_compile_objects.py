@@ -0,0 +1,99 @@
+import pytest
+from llvmlite import binding as llvm
+
+from llvm_lang.compiler import Compiler, collecting_compiler, passes
+from llvm_lang.jit import JIT
+from llvm_lang.passes.evaluate_globals import evaluate_globals
+from llvm_lang.passes.generate_ir import INIT_GLOBALS, split_ir
+from llvm_lang.passes.optimize_ir import OptimizationOptions
+
+checker = Compiler(passes=passes[:passes.index(evaluate_globals) + 1])
+
+SOURCE = '''
+let counter: int64 = 0;
+let bumped: int64 = bump();
+let name: uint8[] = "abc";
+
+function bump(): int64 {
+    counter = counter + 1;
+    return counter;
+}
+
+function get(): int64 {
+    return counter;
+}
+
+function second(s: uint8[]): uint8 {
+    return s[1];
+}
+
+function t2(x: int64): int64 {
+    return x * 7 + 1;
+}
+
+function t1(x: int64): int64 {
+    return t2(x) / 3 + t2(x + 1);
+}
+
+function t0(x: int64): int64 {
+    return t1(x) / 3 + t1(x + 1);
+}
+
+function main(x: int64): int64 {
+    return t0(x) + get();
+}
+
+function second_of_name(): uint8 {
+    return second(name);
+}
+'''
+
+
+def defined(module):
+    return {
+        function.name
+        for function in module.functions if not function.is_declaration
+    }
+
+
+def test_split_ir():
+    globals_module, *modules = split_ir(checker.compile(SOURCE), 3)
+    assert defined(globals_module) == {INIT_GLOBALS}
+    assert len(modules) == 3
+
+    groups = [defined(module) for module in modules]
+    assert all(groups)
+    assert sorted(name for group in groups for name in group) == [
+        'bump', 'get', 'main', 'second', 'second_of_name', 't0', 't1', 't2'
+    ]
+    for module in [globals_module] + modules:
+        llvm.parse_assembly(str(module)).verify()
+
+
+@pytest.mark.parametrize('workers', [1, 2])
+@pytest.mark.parametrize('level', [None, 'O2'])
+def test_same_results_as_serial(workers, level):
+    optimization = level and OptimizationOptions(level)
+    serial = JIT().load(
+        Compiler(passes=passes, optimization=optimization).compile(SOURCE))
+    ctx = Compiler(passes=passes, optimization=optimization,
+                   workers=workers).compile(SOURCE)
+    assert len(ctx.objects) == workers
+    parallel = JIT().load(ctx)
+    assert parallel['main'](5) == serial['main'](5)
+    assert parallel['get']() == serial['get']() == 1
+    assert parallel['second_of_name']() == ord('b')
+
+
+def test_collecting_compiler_keeps_workers():
+    diagnostics = []
+    base = Compiler(passes=passes, workers=2)
+    ctx = collecting_compiler(base, diagnostics).compile(SOURCE)
+    assert not diagnostics
+    assert len(ctx.objects) == 2
+    assert JIT().load(ctx)['get']() == 1
+
+    failed = collecting_compiler(
+        base, diagnostics).compile('function main(): int64 { return "x"; }')
+    assert diagnostics
+    assert not hasattr(failed, 'objects')
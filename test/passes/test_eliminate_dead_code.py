@@ -0,0 +1,67 @@
+from llvm_lang import ast
+from llvm_lang.ast.iter import walk
+from llvm_lang.compiler import Compiler, passes
+from llvm_lang.passes.eliminate_dead_code import eliminate_dead_functions
+from llvm_lang.passes.inline_functions import inline_functions
+
+# calls are kept to show they're not removed
+compiler = Compiler(
+    passes=[pass_ for pass_ in passes if pass_ is not inline_functions])
+
+SOURCE = '''
+function helper(x: int64): int64 {
+    return x * 2;
+}
+
+function only_from_dead_code(): int64 {
+    return 1;
+}
+
+function main(a: int64): int64 {
+    let unused: int64 = a + 1;
+    let chained: int64 = a * 3;
+    let also_unused: int64 = chained - 1;
+    let called: int64 = helper(a);
+    let used: int64 = a + 2;
+    a + used;
+    a = used;
+    return a;
+    let after: int64 = only_from_dead_code();
+    helper(after);
+}
+'''
+
+
+def body(ctx, name):
+    for node in ctx.ast_root:
+        if node.name == name:
+            return [str(statement) for statement in node.body]
+
+
+def test_dead_statements_are_removed():
+    ctx = compiler.compile(SOURCE)
+    assert body(ctx, 'main') == [
+        # calls and assignments may have side effects
+        'let called: int64 = helper(a);',
+        'let used: int64 = a + 2;',
+        'a = used;',
+        'return a;',
+    ]
+
+
+def test_removed_expressions_are_untyped():
+    ctx = compiler.compile(SOURCE)
+    assert set(ctx.expression_types) == {
+        id(node)
+        for node in walk(ctx.ast_root) if isinstance(node, ast.Expression)
+    }
+
+
+def test_functions_only_used_from_dead_code_are_removed():
+    ctx = compiler.compile(SOURCE)
+    assert [node.name for node in ctx.ast_root
+            ] == ['helper', 'only_from_dead_code', 'main']
+
+    ctx = Compiler(passes=compiler.passes +
+                   [eliminate_dead_functions(['main'])]).compile(SOURCE)
+    assert [node.name for node in ctx.ast_root] == ['helper', 'main']
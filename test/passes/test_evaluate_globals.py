@@ -0,0 +1,102 @@
+import math
+
+import pytest
+
+from llvm_lang import errors
+from llvm_lang.compiler import compiler
+from llvm_lang.session import CompilerSession
+
+SOURCE = '''
+let counter: int64 = 0;
+let later: int64 = 1 - 2;
+let sum: int64 = add(later, 2) * 3;
+
+function add(a: int64, b: int64): int64 {
+    let total: int64 = a;
+    total = total + b;
+    return total;
+}
+
+function bump(): int64 {
+    counter = counter + 1;
+    return counter;
+}
+
+function forever(n: int64): int64 {
+    return forever(n + 1);
+}
+
+function second(s: uint8[3]): uint8 {
+    return s[1];
+}
+'''
+
+
+def evaluate(source: str):
+    return compiler.compile(source)
+
+
+@pytest.mark.parametrize('typ, literal, value', [
+    ('int8', '127 + 1', -128),
+    ('uint8', '300', 44),
+    ('int16', '-32769', 32767),
+    ('uint16', '-1', 65535),
+    ('int32', '2147483647', 2147483647),
+    ('uint32', '4294967296', 0),
+    ('int64', '-1', -1),
+    ('uint64', '-1', 2**64 - 1),
+    ('int128', '2 * 2', 4),
+    ('uint128', '0 - 1', 2**128 - 1),
+])
+def test_integer_literals(typ, literal, value):
+    ctx = evaluate(f'let g: {typ} = {literal};')
+    assert ctx.initial_values == {'g': value}
+
+
+def test_float_literals():
+    ctx = evaluate('let a: float64 = 0.1 * 3.0;\n'
+                   'let b: float32 = 0.1;\n'
+                   'let c: float32 = 1e38 * 10.0;')
+    assert ctx.initial_values['a'] == 0.1 * 3.0
+    assert ctx.initial_values['b'] != 0.1
+    assert abs(ctx.initial_values['b'] - 0.1) < 1e-8
+    assert ctx.initial_values['c'] == math.inf
+
+
+def test_string_literals():
+    ctx = evaluate(SOURCE + 'let s: uint8[3] = "abc";\n'
+                   'let b: uint8 = second(s);')
+    assert ctx.initial_values['s'] == (97, 98, 99)
+    assert ctx.initial_values['b'] == 98
+
+
+def test_calls_and_other_globals():
+    ctx = evaluate(SOURCE)
+    assert ctx.initial_values == {'counter': 0, 'later': -1, 'sum': 3}
+    assert ctx.runtime_initialized == {}
+
+
+def test_runtime_initialized():
+    ctx = evaluate(SOURCE + 'let bumped: int64 = bump();\n'
+                   'let looped: int64 = forever(0);\n'
+                   'let uses_bumped: int64 = bumped + 1;')
+    assert {
+        name: str(error)
+        for name, error in ctx.runtime_initialized.items()
+    } == {
+        'bumped': 'counter = counter + 1 can\'t be evaluated at compile time',
+        'looped': 'Calls nest too deeply to evaluate forever(n + 1)',
+        'uses_bumped': 'bumped is not a constant',
+    }
+    assert 'sum' in ctx.initial_values
+
+
+def test_division_by_zero():
+    with pytest.raises(errors.ArithmeticError, match='Division by zero'):
+        evaluate(SOURCE + 'let broken: int64 = 1 / (later + 1);')
+
+
+def test_prelude():
+    session = CompilerSession(SOURCE)
+    ctx = session.compile('let g: int64 = add(sum, later);')
+    assert ctx.initial_values == {'g': 2}
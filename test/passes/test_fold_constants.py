@@ -0,0 +1,86 @@
+import math
+
+import pytest
+
+from llvm_lang import ast, errors, types
+from llvm_lang.ast.iter import walk
+from llvm_lang.compiler import compiler
+from llvm_lang.jit import load
+
+INT_TYPES = [
+    types.IntType(size=size, signed=signed)
+    for size in types.IntType.VALID_SIZES for signed in (True, False)
+]
+
+
+def fold(return_type: str, expression: str):
+    ctx = compiler.compile(f'''
+function f(a: {return_type}): {return_type} {{
+    return {expression};
+}}''')
+    value = ctx.ast_root[0].body[0].value
+    return value, ctx.expression_types
+
+
+@pytest.mark.parametrize('typ', INT_TYPES, ids=str)
+def test_integer_wraparound(typ):
+    top = 2**(typ.size - 1) if typ.signed else 2**typ.size
+    bottom = -top if typ.signed else 0
+
+    value, expression_types = fold(str(typ), f'{top - 1} + 1')
+    assert value == ast.IntegerLiteral(bottom)
+    assert expression_types[id(value)] == typ
+
+    assert fold(str(typ), f'{bottom} - 1')[0] == ast.IntegerLiteral(top - 1)
+    doubled = -2 if typ.signed else top - 2
+    assert fold(str(typ), f'{top - 1} * 2')[0] == ast.IntegerLiteral(doubled)
+    negated = -1 if typ.signed else top - 1
+    assert fold(str(typ), '-1')[0] == ast.IntegerLiteral(negated)
+
+
+@pytest.mark.parametrize('typ', INT_TYPES, ids=str)
+def test_integer_division(typ):
+    assert fold(str(typ), '7 / 2')[0] == ast.IntegerLiteral(3)
+    if typ.signed:
+        # truncates toward zero
+        assert fold(str(typ), '-7 / 2')[0] == ast.IntegerLiteral(-3)
+        with pytest.raises(errors.ArithmeticError, match='overflows'):
+            fold(str(typ), f'-{2**(typ.size - 1)} / -1')
+    else:
+        # -2 wraps around to the largest value less one
+        half = 2**(typ.size - 1) - 1
+        assert fold(str(typ), '-2 / 2')[0] == ast.IntegerLiteral(half)
+
+    with pytest.raises(errors.ArithmeticError, match='Division by zero'):
+        fold(str(typ), '1 / (2 - 2)')
+
+
+def test_floats():
+    assert fold('float64', '0.1 + 0.2')[0] == ast.FloatLiteral(0.1 + 0.2)
+    value = fold('float32', '0.1 + 0.2')[0].value
+    assert value != 0.1 + 0.2 and abs(value - 0.3) < 1e-7
+    assert fold('float32', '1e38 * 10.0')[0] == ast.FloatLiteral(math.inf)
+    assert fold('float64', '-1.0 / 0.0')[0] == ast.FloatLiteral(-math.inf)
+    assert math.isnan(fold('float64', '0.0 / 0.0')[0].value)
+
+
+def test_float32_matches_runtime():
+    # folded in single precision, like the multiplication at runtime
+    program = load(
+        compiler.compile('''
+function f(): float32 {
+    return 1.3436424 * 8.4743374;
+}
+
+function g(a: float32, b: float32): float32 {
+    return a * b;
+}'''))
+    assert program['f']() == program['g'](1.3436424, 8.4743374)
+
+
+def test_only_literals_are_folded():
+    value, expression_types = fold('int32', 'a + 2 * 3')
+    assert str(value) == 'a + 6'
+    # the rebuilt expression keeps its type, and the replaced ones are gone
+    assert {id(node) for node in walk(value)} == set(expression_types)
+    assert expression_types[id(value)] == types.IntType(size=32)
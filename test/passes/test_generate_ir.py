@@ -0,0 +1,265 @@
+import pytest
+from llvmlite import binding as llvm
+
+from llvm_lang.compiler import (Compiler, collecting_compiler, compiler,
+                                lazy_compiler, passes)
+from llvm_lang.passes.generate_ir import INIT_GLOBALS
+from llvm_lang.passes.resolve_names import resolve_names
+from llvm_lang.session import CompilerSession
+
+SOURCE = '''
+struct Point {
+    x: int64
+    y: int64
+}
+
+enum Color {
+    Red
+    Green
+}
+
+union Shape {
+    Empty
+    Circle(float64,)
+    Box {
+        w: int32
+        h: int32
+    }
+}
+
+newtype Meters = float64;
+
+let counter: int64 = 0;
+let computed: int64 = twice(21);
+let bumped: int64 = bump();
+let name: uint8[] = "abc";
+
+function twice(a: int64): int64 {
+    return a * 2;
+}
+
+function bump(): int64 {
+    counter = counter + 1;
+    return counter;
+}
+
+function first(s: uint8[]): uint8 {
+    return s[0];
+}
+
+function divide(x: uint32, y: int32, f: float32): float32 {
+    let a: uint32 = x / 2;
+    let b: int32 = y / 2;
+    x = a;
+    y = b;
+    return -f / 2.0;
+}
+
+function moved(p: Point): Point {
+    p.x = p.x + 1;
+    return p;
+}
+
+function paint(c: Color, s: Shape, m: Meters): void {
+}
+
+function set(a: uint8[4], i: uint8): uint8 {
+    let s: uint8[] = "ab";
+    a[i] = first(s);
+    return a[i];
+}
+'''
+
+
+def verified(ctx):
+    module = llvm.parse_assembly(str(ctx.module))
+    module.verify()
+    return module
+
+
+def define(ctx, name):
+    for line in str(ctx.module).splitlines():
+        if line.startswith('define') and f'@"{name}"(' in line:
+            return line
+
+
+def body(ctx, name):
+    return str(ctx.module.get_global(name))
+
+
+def test_module_verifies():
+    module = verified(compiler.compile(SOURCE))
+    assert {function.name
+            for function in module.functions} >= {
+                'twice', 'bump', 'first', 'divide', 'moved', 'paint', 'set',
+                INIT_GLOBALS
+            }
+
+
+def test_same_code_with_and_without_resolution():
+    # identifiers are looked up by slot, or by name without resolve_names
+    ctx = compiler.compile(SOURCE)
+    assert ctx.names is not None
+    without = Compiler(passes=[p for p in passes if p is not resolve_names])
+    assert str(ctx.module) == str(without.compile(SOURCE).module)
+
+
+def test_types_are_lowered():
+    ctx = compiler.compile(SOURCE)
+    assert define(
+        ctx,
+        'moved') == ('define %"struct.Point" @"moved"(%"struct.Point" %"p")')
+    assert define(ctx, 'paint') == (
+        'define void @"paint"(%"enum.Color" %"c", %"union.Shape" %"s",'
+        ' double %"m")')
+    assert define(ctx, 'first') == 'define i8 @"first"({i32, i8*} %"s")'
+    assert define(ctx, 'set') == 'define i8 @"set"([4 x i8] %"a", i8 %"i")'
+
+    identified = {
+        name: [str(element) for element in ty.elements]
+        for name, ty in ctx.module.context.identified_types.items()
+    }
+    assert identified == {
+        'struct.Point': ['i64', 'i64'],
+        'enum.Color': ['i8'],
+        # the tag, then room for the largest variant
+        'union.Shape': ['i8', '[15 x i8]'],
+    }
+
+
+GENERIC_SOURCE = '''
+struct Box<T> {
+    value: T
+}
+
+struct Pair<A, B> {
+    first: A
+    second: B
+}
+
+union Maybe<T> {
+    Nothing
+    Just(T,)
+}
+
+function unbox(b: Box<int64>): int64 {
+    return b.value;
+}
+
+function unbox_float(b: Box<float64>): float64 {
+    return b.value;
+}
+
+function first(p: Pair<Box<int64>, bool>): int64 {
+    return unbox(p.first);
+}
+
+function swap(p: Pair<Box<int64>, bool>,
+              q: Pair<bool, Box<int64>>): Pair<Box<int64>, bool> {
+    p.second = q.first;
+    return p;
+}
+
+function boxes(m: Maybe<Box<int64>>, b: Box<int64>[2]): Box<int64>[] {
+    return b;
+}
+'''
+
+
+def test_generic_instances_are_named_by_their_arguments():
+    ctx = compiler.compile(GENERIC_SOURCE)
+    verified(ctx)
+    assert define(
+        ctx,
+        'first') == ('define i64 @"first"(%"struct.Pair.3BoxIi64E.b" %"p")')
+
+    identified = {
+        name: [str(element) for element in ty.elements]
+        for name, ty in ctx.module.context.identified_types.items()
+    }
+    assert identified == {
+        'struct.Box.i64': ['i64'],
+        'struct.Box.f64': ['double'],
+        'struct.Pair.3BoxIi64E.b': ['%"struct.Box.i64"', 'i1'],
+        'struct.Pair.b.3BoxIi64E': ['i1', '%"struct.Box.i64"'],
+        'union.Maybe.3BoxIi64E': ['i8', '[15 x i8]'],
+    }
+    # each instance is defined once, however often it is used
+    text = str(ctx.module)
+    for name in identified:
+        assert text.count(f'%"{name}" = type') == 1
+
+
+def test_arithmetic():
+    text = body(compiler.compile(SOURCE), 'divide')
+    assert 'udiv i32' in text
+    assert 'sdiv i32' in text
+    assert 'fneg float' in text
+    assert 'fdiv float' in text
+
+
+def test_newtype_negation():
+    ctx = compiler.compile('''
+newtype Meters = float64;
+let m: Meters = 2.0;
+let n: Meters = -m;
+
+function negate(a: Meters): Meters {
+    return -a;
+}''')
+    verified(ctx)
+    assert 'fneg double' in body(ctx, 'negate')
+    assert 'fneg double' in body(ctx, INIT_GLOBALS)
+
+
+def test_globals():
+    ctx = compiler.compile(SOURCE)
+    assert str(ctx.module.get_global('computed').initializer) == 'i64 42'
+    assert str(ctx.module.get_global('bumped').initializer) == 'i64 0'
+    assert 'call i64 @"bump"()' in body(ctx, INIT_GLOBALS)
+    assert INIT_GLOBALS in str(
+        ctx.module.get_global('llvm.global_ctors').initializer)
+
+    name = str(ctx.module.get_global('name').initializer)
+    assert name.startswith('{i32, i8*} {i32 3, i8* getelementptr')
+
+
+def test_arrays_convert_to_slices():
+    text = body(compiler.compile(SOURCE), 'set')
+    assert 'getelementptr [2 x i8], [2 x i8]*' in text
+    assert 'insertvalue {i32, i8*}' in text
+
+
+def test_prelude_is_declared():
+    session = CompilerSession('''
+let base: int64 = 10;
+
+function offset(x: int64): int64 {
+    let y: int64 = x * x * x * x * x * x * x * x * x * x;
+    return y * y * y * y * y * y * y * y * y * y + base;
+}
+''')
+    ctx = session.compile('''
+function main(): int64 {
+    return offset(base);
+}
+''')
+    verified(ctx)
+    assert ctx.module.get_global('offset').is_declaration
+    assert 'declare i64 @"offset"(i64 %"x")' in str(ctx.module)
+    assert str(ctx.module.get_global('base')).startswith(
+        '@"base" = external global i64')
+
+
+def test_no_code_for_errors():
+    diagnostics = []
+    ctx = collecting_compiler(
+        compiler,
+        diagnostics).compile('function main(): int64 { return "x"; }')
+    assert diagnostics
+    assert not hasattr(ctx, 'module')
+
+
+@pytest.mark.parametrize('entry_point', ['set', 'paint'])
+def test_lazy_compiles_verify(entry_point):
+    verified(lazy_compiler([entry_point]).compile(SOURCE))
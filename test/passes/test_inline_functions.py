@@ -0,0 +1,253 @@
+from llvm_lang import ast
+from llvm_lang.ast.iter import walk
+from llvm_lang.compiler import Compiler, compiler, passes
+from llvm_lang.jit import load
+from llvm_lang.passes.check_types import check_types
+from llvm_lang.passes.evaluate_globals import evaluate_globals
+from llvm_lang.passes.inline_functions import (inline_functions,
+                                               inline_functions_up_to)
+from llvm_lang.session import CompilerSession
+
+checker = Compiler(passes=passes[:passes.index(check_types) + 1])
+inliner = Compiler(passes=checker.passes + (inline_functions, ))
+# everything up to code generation
+generator_input = Compiler(passes=passes[:passes.index(evaluate_globals) + 1])
+not_inlining = Compiler(
+    passes=[pass_ for pass_ in passes if pass_ is not inline_functions])
+
+SOURCE = '''
+let scale: int64 = 3;
+let result: int64 = main(4);
+
+function square(x: int64): int64 {
+    let y: int64 = x * x;
+    return y;
+}
+
+function add_to(a: int64, b: int64): int64 {
+    a = a + b;
+    return a;
+}
+
+function scaled(x: int64): int64 {
+    return square(x) * scale;
+}
+
+function fact(n: int64): int64 {
+    return n * fact(n - 1);
+}
+
+function ping(n: int64): int64 {
+    return pong(n);
+}
+
+function pong(n: int64): int64 {
+    return ping(n);
+}
+
+function main(x: int64): int64 {
+    let y: int64 = square(x) + add_to(x, 2);
+    x = scaled(add_to(y, square(2)));
+    return x + add_to(x, y);
+}
+'''
+
+
+def called(ctx, name):
+    for node in ctx.ast_root:
+        if node.name == name:
+            return sorted(child.target.name for child in walk(node)
+                          if isinstance(child, ast.CallExpression))
+
+
+def body(ctx, name):
+    for node in ctx.ast_root:
+        if node.name == name:
+            return [str(statement) for statement in node.body]
+
+
+def test_same_results():
+    inlined = compiler.compile(SOURCE)
+    assert called(inlined, 'main') == []
+    assert inlined.initial_values == not_inlining.compile(
+        SOURCE).initial_values
+
+
+def test_every_expression_is_typed():
+    ctx = inliner.compile(SOURCE)
+    expressions = {
+        id(node)
+        for node in walk(ctx.ast_root) if isinstance(node, ast.Expression)
+    }
+    assert expressions <= set(ctx.expression_types)
+
+
+def test_bindings_get_slots():
+    ctx = generator_input.compile(SOURCE)
+    resolutions = ctx.names.resolutions
+    for function in ctx.ast_root:
+        if not isinstance(function, ast.FunctionDeclaration):
+            continue
+        declarations = {
+            node.name: resolutions[id(node)]
+            for node in function.parameters + function.body
+            if isinstance(node, (ast.FunctionParameter,
+                                 ast.VariableDeclaration))
+        }
+        slots = {binding.slot for binding in declarations.values()}
+        assert len(slots) == len(declarations)
+        assert max(slots, default=-1) < ctx.names.frame_sizes[id(function)]
+
+        fields = {
+            id(node.rhs)
+            for node in walk(function) if isinstance(node, ast.BinaryOperation)
+            and node.op == ast.Op.field
+        }
+        for node in walk(function):
+            if isinstance(node, ast.Identifier) and id(node) not in fields:
+                binding = resolutions[id(node)]
+                if node.name in declarations:
+                    assert binding == declarations[node.name]
+                else:
+                    assert binding.depth == 0
+
+
+def test_recursive_functions_are_not_inlined():
+    ctx = inliner.compile(SOURCE + '''
+function calls_recursive(n: int64): int64 {
+    return fact(n) + ping(n);
+}
+''')
+    assert called(ctx, 'fact') == ['fact']
+    assert called(ctx, 'ping') == ['pong']
+    assert called(ctx, 'calls_recursive') == ['fact', 'ping']
+
+
+def test_bindings_are_renamed():
+    ctx = inliner.compile('''
+function f(x: int64): int64 {
+    let y: int64 = x + 1;
+    x = y;
+    return x;
+}
+
+function main(x: int64, y: int64): int64 {
+    return f(y);
+}
+''')
+    assert body(ctx, 'main') == [
+        'let f.x.0: int64 = y;',
+        'let f.y.1: int64 = f.x.0 + 1;',
+        'f.x.0 = f.y.1;',
+        'return f.x.0;',
+    ]
+
+
+def test_arrays_passed_as_slices_are_bound():
+    source = '''
+function first(s: uint8[]): uint8 {
+    return s[0];
+}
+
+function main(): uint8 {
+    let a: uint8[3] = "abc";
+    return first(a);
+}
+'''
+    # the array is converted to a slice where it's bound, not substituted
+    assert body(inliner.compile(source),
+                'main')[1] == ('let first.s.0: uint8[] = a;')
+    assert load(compiler.compile(source))['main']() == ord('a')
+
+
+def test_free_names_are_not_captured():
+    source = '''
+let g: int64 = 1;
+
+function get(): int64 {
+    return g;
+}
+
+function main(): int64 {
+    let g: int64 = 2;
+    return g + get();
+}
+'''
+    assert called(inliner.compile(source), 'main') == ['get']
+
+
+def test_size_budget():
+    source = SOURCE + '''
+function big(x: int64): int64 {
+    let a: int64 = x * x + x * x + x * x + x * x;
+    return a * a + a * a + a * a + a * a;
+}
+
+function uses_big(x: int64): int64 {
+    return big(x);
+}
+'''
+    assert called(inliner.compile(source), 'uses_big') == []
+    small = Compiler(passes=checker.passes + (inline_functions_up_to(7), ))
+    ctx = small.compile(source)
+    assert called(ctx, 'uses_big') == ['big']
+    assert called(ctx, 'main') == ['add_to', 'add_to', 'add_to', 'scaled']
+
+
+def test_side_effects_stay_in_order():
+    ctx = inliner.compile('''
+let counter: int64 = 0;
+
+function bump(): int64 {
+    counter = counter + 1;
+    return counter;
+}
+
+function read(): int64 {
+    return counter;
+}
+
+function reset(): void {
+    counter = 0;
+}
+
+function main(x: int64): int64 {
+    reset();
+    let a: int64 = x + bump();
+    let b: int64 = counter + bump();
+    let c: int64 = opaque() + bump();
+    return read() + x;
+}
+
+function opaque(): int64 {
+    return opaque();
+}
+''')
+    assert body(ctx, 'main') == [
+        'counter = 0;',
+        'counter = counter + 1;',
+        'let bump.result.0: int64 = counter;',
+        'let a: int64 = x + bump.result.0;',
+        # reading counter has to happen before bump changes it
+        'let b: int64 = counter + bump();',
+        'let c: int64 = opaque() + bump();',
+        'let read.result.1: int64 = counter;',
+        'return read.result.1 + x;',
+    ]
+
+
+def test_prelude_functions_are_inlined():
+    session = CompilerSession('''
+function double(x: int64): int64 {
+    return x + x;
+}
+''')
+    ctx = session.compile('''
+let four: int64 = quadruple(1);
+
+function quadruple(x: int64): int64 {
+    return double(double(x));
+}
+''')
+    assert called(ctx, 'quadruple') == []
+    assert ctx.initial_values == {'four': 4}
@@ -0,0 +1,82 @@
+import pytest
+
+from llvm_lang.compiler import Compiler, collecting_compiler, passes
+from llvm_lang.jit import JIT
+from llvm_lang.passes.inline_functions import inline_functions
+from llvm_lang.passes.optimize_ir import LEVELS, OptimizationOptions
+
+# LLVM's inliner is tested on its own
+not_inlining = [pass_ for pass_ in passes if pass_ is not inline_functions]
+
+SOURCE = '''
+struct Point {
+    x: int64
+    y: int64
+}
+
+function f(x: int64, y: int64): int64 {
+    let a: int64 = x * y + x / (y + 1);
+    let b: int64 = a * y + x / (a + 2);
+    let c: int64 = b * y + x / (b + 3);
+    return c * y + x / (c + 4);
+}
+
+function moved(p: Point, x: int64): int64 {
+    p.x = x;
+    p.y = x * 2;
+    return p.x + p.y;
+}
+
+function main(x: int64): int64 {
+    return f(x, x + 1) + f(x + 2, x * 3);
+}
+'''
+
+
+def optimized(options, source=SOURCE):
+    return Compiler(passes=not_inlining, optimization=options).compile(source)
+
+
+def function(ctx, name):
+    return str(ctx.optimized.get_function(name))
+
+
+@pytest.mark.parametrize('level', LEVELS)
+def test_levels_run_the_same(level):
+    ctx = optimized(OptimizationOptions(level))
+    assert ctx.optimization_time > 0
+    program = JIT().load(ctx)
+    assert program['main'](5) == 360855
+    assert program['moved']((0, 0), 3) == 9
+
+
+def test_levels():
+    assert 'alloca' in function(optimized(OptimizationOptions('O0')), 'moved')
+    assert 'alloca' not in function(optimized(OptimizationOptions('O1')),
+                                    'moved')
+    assert 'call' not in function(optimized(OptimizationOptions('O2')), 'main')
+
+
+def test_inlining_threshold():
+    ctx = optimized(OptimizationOptions('O2', inlining_threshold=0))
+    assert function(ctx, 'main').count('call') == 2
+
+
+def test_options():
+    assert OptimizationOptions('O3').inlining == 250
+    assert OptimizationOptions('Os').inlining == 75
+    assert OptimizationOptions('Os').speed_level == 2
+    assert not OptimizationOptions('Os').loop_vectorization
+    assert OptimizationOptions('O2').slp_vectorization
+    assert not OptimizationOptions('O2', slp_vectorize=False).slp_vectorization
+    with pytest.raises(ValueError):
+        OptimizationOptions('O4')
+
+
+def test_not_optimized_with_errors():
+    diagnostics = []
+    ctx = collecting_compiler(
+        Compiler(passes=passes, optimization=OptimizationOptions()),
+        diagnostics).compile('function main(): int64 { return "x"; }')
+    assert diagnostics
+    assert ctx.optimized is None
@@ -0,0 +1,76 @@
+import pytest
+
+from llvm_lang import errors
+from llvm_lang.compiler import Compiler, compiler, lazy_compiler, passes
+from llvm_lang.passes.prune_unreachable import (UnreachableWarning,
+                                                prune_unreachable)
+from llvm_lang.passes.verify_declared_types import verify_declared_types
+from llvm_lang.session import CompilerSession
+
+SOURCE = '''
+struct Point {
+    x: int64
+    y: int64
+}
+
+struct Unused {
+    a: int64
+}
+
+let origin_x: int64 = 0;
+
+function norm(p: Point): int64 {
+    return p.x * p.x + p.y * p.y - origin_x;
+}
+
+function main(p: Point): int64 {
+    return norm(p);
+}
+
+function broken(): int64 {
+    return missing;
+}
+'''
+
+
+def names(ctx):
+    return [node.name for node in ctx.ast_root]
+
+
+def test_only_reachable_declarations_are_checked():
+    with pytest.raises(errors.ReferenceError):
+        compiler.compile(SOURCE)
+
+    ctx = lazy_compiler(['main']).compile(SOURCE)
+    # norm is inlined into main, and then never called
+    assert names(ctx) == ['Point', 'origin_x', 'main']
+    # every type is still declared
+    assert 'Unused' in ctx.declared_types
+
+
+def test_unreachable_errors_are_found_from_their_entry_point():
+    with pytest.raises(errors.ReferenceError):
+        lazy_compiler(['main', 'broken']).compile(SOURCE)
+
+
+def test_unknown_entry_point():
+    with pytest.raises(errors.ReferenceError, match='Unknown entry point'):
+        lazy_compiler(['start']).compile(SOURCE)
+
+
+def test_warn_unreachable():
+    with pytest.warns(UnreachableWarning) as record:
+        lazy_compiler(['main'], warn_unreachable=True).compile(SOURCE)
+    assert sorted(str(warning.message) for warning in record) == [
+        'Unused is never used',
+        'broken is never used',
+    ]
+
+
+def test_prelude_is_kept():
+    session = CompilerSession('function twice(a: int64): int64 { return a; }')
+    index = passes.index(verify_declared_types) + 1
+    front_end = Compiler(passes=session.compiler.passes[:index])
+    ctx = front_end.compile('function main(): int64 { return twice(1); }')
+    pruned = prune_unreachable(['main'])(ctx)
+    assert pruned.prelude is session.prelude
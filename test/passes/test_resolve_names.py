@@ -0,0 +1,119 @@
+import pytest
+
+from llvm_lang import ast, errors
+from llvm_lang.compiler import compiler, passes, Compiler
+from llvm_lang.passes.resolve_names import resolve_names
+
+resolve = Compiler(passes=passes[:passes.index(resolve_names) + 1]).compile
+
+SOURCE = '''
+struct Pair<T> {
+    first: T
+    second: T
+}
+
+let offset: int64 = 1;
+
+function main(): int64 {
+    let a: int64 = add(offset, 2);
+    return a;
+}
+
+function add(x: int64, y: int64): int64 {
+    let z: int64 = x + y;
+    return z;
+}
+'''
+
+
+def find(node, pred):
+    found = []
+
+    class Finder(ast.Visitor):
+        def generic_visit(self, n):
+            if pred(n):
+                found.append(n)
+            return super().generic_visit(n)
+
+    Finder().visit(node)
+    return found
+
+
+def identifiers(node, name):
+    return find(node,
+                lambda n: isinstance(n, ast.Identifier) and n.name == name)
+
+
+def test_slots():
+    ctx = resolve(SOURCE)
+    _, offset, main, add = ctx.ast_root
+
+    # functions are declared before anything else so they can be called early
+    assert ctx.globals_size == 3
+    assert ctx.resolutions[id(main)].slot == 0
+    assert ctx.resolutions[id(add)].slot == 1
+    assert ctx.resolutions[id(offset)].slot == 2
+
+    assert ctx.frame_sizes[id(main)] == 1
+    assert ctx.frame_sizes[id(add)] == 3
+
+    [x] = identifiers(add, 'x')
+    [y] = identifiers(add, 'y')
+    assert ctx.resolutions[id(x)] == ctx.resolutions[id(add.parameters[0])]
+    assert (ctx.resolutions[id(y)].depth, ctx.resolutions[id(y)].slot) == (1,
+                                                                           1)
+
+    [call_add] = identifiers(main, 'add')
+    assert ctx.resolutions[id(call_add)].declaration is add
+
+    [offset_ref] = identifiers(main, 'offset')
+    assert ctx.resolutions[id(offset_ref)].declaration is offset
+
+
+def test_type_expressions():
+    ctx = resolve(SOURCE)
+    pair = ctx.ast_root[0]
+
+    [t, _] = find(
+        pair,
+        lambda n: isinstance(n, ast.NamedTypeExpression) and n.name == 'T')
+    binding = ctx.type_resolutions[id(t)]
+    assert (binding.depth, binding.slot) == (1, 0)
+    # types' slots would be mistaken for values'
+    assert id(t) not in ctx.resolutions
+    assert binding.declaration is pair
+
+    main = ctx.ast_root[2]
+    binding = ctx.type_resolutions[id(main.return_type)]
+    assert binding.depth == 0
+    assert list(ctx.declared_types)[binding.slot] == 'int64'
+
+
+def test_field_names_are_not_resolved():
+    resolve('''
+struct Point { x: int64 }
+function f(p: Point): int64 {
+    let x: int64 = p.x;
+    return x;
+}
+''')
+
+
+def test_unbound_identifier():
+    with pytest.raises(errors.ReferenceError):
+        resolve('''
+function f(): int64 {
+    let a: int64 = b;
+    return a;
+}
+''')
+
+    # a variable isn't in scope in its own initializer
+    with pytest.raises(errors.ReferenceError):
+        resolve('let a: int64 = a;')
+
+
+def test_compile_with_and_without_resolution():
+    without = Compiler(passes=[p for p in passes if p is not resolve_names])
+    assert (str(compiler.compile(SOURCE).ast_root) == str(
+        without.compile(SOURCE).ast_root))
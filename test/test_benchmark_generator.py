@@ -0,0 +1,21 @@
+import pytest
+
+from benchmarks.generator import Shape, generate_program
+from llvm_lang.compiler import compiler
+
+
+@pytest.mark.parametrize('shape', [
+    Shape(declarations=8),
+    Shape(declarations=8, body_length=20),
+    Shape(declarations=8, expression_depth=6),
+    Shape(declarations=8, generics=1.0),
+    Shape(declarations=8, struct_width=16),
+    Shape(declarations=1, generics=0.0),
+])
+def test_generated_programs_compile(shape):
+    compiler.compile(generate_program(shape))
+
+
+def test_seeded():
+    assert generate_program(Shape(seed=1)) == generate_program(Shape(seed=1))
+    assert generate_program(Shape(seed=1)) != generate_program(Shape(seed=2))
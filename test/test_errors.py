@@ -0,0 +1,89 @@
+import pickle
+
+import pytest
+
+from llvm_lang import errors, types
+from llvm_lang.compiler import collecting_compiler, compiler
+from llvm_lang.driver import compile_source
+from llvm_lang.types import primitive_types as p
+
+SOURCE = '''
+function add(x: int32, y: int32): int32 {
+    return x + y;
+}
+
+function main(): int32 {
+    let a: int32 = add(1, "x");
+    let b: int64 = a;
+    let c: int32 = a * 2;
+    return b;
+}
+'''
+
+
+class Printed:
+    def __init__(self):
+        self.count = 0
+
+    def __str__(self):
+        self.count += 1
+        return 'printed'
+
+
+def test_message_is_rendered_when_shown():
+    printed = Printed()
+    error = errors.TypeError('Cannot assign {actual} to {expected}',
+                             expected=p['int32'],
+                             actual=printed)
+    assert printed.count == 0
+    assert str(error) == 'Cannot assign printed to int32'
+    assert printed.count == 1
+
+
+def test_message_without_fields_is_used_as_is():
+    assert str(errors.TypeError('Type {T} is not defined')) == \
+        'Type {T} is not defined'
+
+
+def test_errors_pickle_with_their_fields():
+    error = pickle.loads(
+        pickle.dumps(
+            errors.ReferenceError('Unbound identifier {name}', name='b')))
+    assert error.fields == {'name': 'b'}
+    assert str(error) == 'Unbound identifier b'
+
+
+def test_first_error_stops_compile():
+    with pytest.raises(errors.TypeError, match='is not assignable to int32'):
+        compiler.compile(SOURCE)
+
+
+def test_collect_every_type_error():
+    diagnostics = []
+    collecting_compiler(compiler, diagnostics).compile(SOURCE)
+
+    assert [str(error) for error in diagnostics] == [
+        'Type uint8[1] is not assignable to int32',
+        'Cannot assign (a)::int32 to variable of type int64',
+        'Returned value (b)::int64 is not assignable to type int32',
+    ]
+    assert diagnostics[0].expected == p['int32']
+    assert diagnostics[0].actual == types.ArrayType(element_type=p['uint8'],
+                                                    length=1)
+
+
+def test_collect_no_errors():
+    diagnostics = []
+    collecting_compiler(compiler, diagnostics).compile(
+        SOURCE.replace('"x"', '2').replace('return b', 'return c').replace(
+            'b: int64', 'b: int32'))
+    assert diagnostics == []
+
+
+def test_all_errors_response():
+    response = compile_source(SOURCE, all_errors=True)
+    assert not response['ok']
+    assert response['error'] == response['errors'][0]
+    assert len(response['errors']) == 3
+
+    assert 'errors' not in compile_source(SOURCE)
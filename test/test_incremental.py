@@ -0,0 +1,104 @@
+import pytest
+
+from llvm_lang import ast, errors
+from llvm_lang.ast.iter import walk
+from llvm_lang.incremental import IncrementalCompiler, load
+
+SOURCE = '''
+struct Point {
+    x: int64
+    y: int64
+}
+
+function norm(p: Point): int64 {
+    return p.x * p.x + p.y * p.y;
+}
+
+function double(a: int64): int64 {
+    return a + a;
+}
+
+function main(p: Point): int64 {
+    let n: int64 = norm(p);
+    return double(n);
+}
+'''
+
+
+@pytest.fixture
+def compiler(tmp_path):
+    return IncrementalCompiler(str(tmp_path / 'cache'))
+
+
+def assert_typed(ctx):
+    for node in walk(ctx.ast_root):
+        if isinstance(node, (ast.CallExpression, ast.BinaryOperation)):
+            assert id(node) in ctx.expression_types
+
+
+def test_first_build_checks_everything(compiler):
+    ctx = compiler.compile(SOURCE)
+    assert ctx.rechecked == {'norm', 'double', 'main'}
+    assert_typed(ctx)
+
+    graph = load(compiler.graph_path)
+    assert graph['main'].dependencies == {'Point', 'norm', 'double'}
+    assert graph['norm'].interface_dependencies == {'Point'}
+
+
+def test_unchanged_build_reuses_everything(compiler):
+    compiler.compile(SOURCE)
+    ctx = compiler.compile(SOURCE)
+    assert ctx.rechecked == set()
+    assert [node.name for node in ctx.ast_root] == \
+        ['Point', 'norm', 'double', 'main']
+    assert_typed(ctx)
+
+
+def test_body_edit_only_rechecks_the_function(compiler):
+    compiler.compile(SOURCE)
+    ctx = compiler.compile(SOURCE.replace('a + a', 'a * 2'))
+    assert ctx.rechecked == {'double'}
+    assert_typed(ctx)
+
+
+def test_signature_edit_rechecks_callers(compiler):
+    compiler.compile(SOURCE)
+    source = SOURCE.replace('double(a: int64): int64',
+                            'double(a: int64): int32')
+    with pytest.raises(errors.TypeError):
+        compiler.compile(source)
+
+
+def test_type_edit_rechecks_transitive_dependents(compiler):
+    compiler.compile(SOURCE)
+    ctx = compiler.compile(
+        SOURCE.replace('y: int64\n', 'y: int64\n    z: bool\n'))
+    # main only uses Point through the signature of norm
+    assert ctx.rechecked == {'norm', 'main'}
+
+
+def test_removed_dependency_is_reported(compiler):
+    compiler.compile(SOURCE)
+    source = SOURCE.replace(
+        '''function double(a: int64): int64 {
+    return a + a;
+}''', '')
+    with pytest.raises(errors.ReferenceError):
+        compiler.compile(source)
+
+
+def test_cache_is_reused_by_other_processes(compiler):
+    compiler.compile(SOURCE)
+    ctx = IncrementalCompiler(compiler.cache_dir).compile(
+        SOURCE.replace('a + a', 'a * 2'))
+    assert ctx.rechecked == {'double'}
+    assert_typed(ctx)
+
+
+def test_unreadable_cache_is_ignored(compiler):
+    compiler.compile(SOURCE)
+    with open(compiler.function_path('main'), 'w') as f:
+        f.write('not a cache')
+    ctx = IncrementalCompiler(compiler.cache_dir).compile(SOURCE)
+    assert ctx.rechecked == {'main'}
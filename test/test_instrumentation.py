@@ -0,0 +1,70 @@
+import io
+import json
+
+from llvm_lang.compiler import compiler, passes
+from llvm_lang.instrumentation import Instrumentation
+
+SOURCE = '''
+function main(): int64 {
+    let a: int64 = 1 + 2;
+    return a;
+}
+'''
+
+
+def test_records():
+    instrumentation = Instrumentation()
+    compiler.compile(SOURCE, instrumentation)
+
+    records = instrumentation.records
+    assert [r.name for r in records] == [p.__name__ for p in passes]
+    assert all(r.wall_time >= 0 and r.cpu_time >= 0 for r in records)
+    assert all(r.peak_memory >= 0 for r in records)
+    assert [r.start for r in records] == sorted(r.start for r in records)
+
+    # the source isn't an AST, the parsed program is
+    assert records[0].input_nodes is None
+    assert records[0].output_nodes == records[1].input_nodes > 0
+
+
+def test_disabled_measurements():
+    instrumentation = Instrumentation(memory=False, node_counts=False)
+    compiler.compile(SOURCE, instrumentation)
+
+    for record in instrumentation.records:
+        assert record.peak_memory is None
+        assert record.input_nodes is None and record.output_nodes is None
+
+
+def test_report():
+    instrumentation = Instrumentation()
+    compiler.compile(SOURCE, instrumentation)
+    lines = instrumentation.report().splitlines()
+
+    assert 'Pass execution timing report' in lines[1]
+    assert lines[3].startswith('  Total Execution Time:')
+    assert '--- Name ---' in lines[5]
+    rows = lines[6:]
+    assert len(rows) == len(passes) + 1
+    assert sorted(row.split()[-1]
+                  for row in rows[:-1]) == sorted(p.__name__ for p in passes)
+    assert rows[-1].split()[-1] == 'Total'
+    assert '(100.0%)' in rows[-1]
+
+
+def test_chrome_trace():
+    instrumentation = Instrumentation()
+    compiler.compile(SOURCE, instrumentation)
+    file = io.StringIO()
+    instrumentation.write_chrome_trace(file)
+    trace = json.loads(file.getvalue())
+
+    events = trace['traceEvents']
+    assert len(events) == len(passes)
+    for event, record in zip(events, instrumentation.records):
+        assert event['name'] == record.name
+        assert event['ph'] == 'X'
+        assert event['dur'] == record.wall_time * 1e6
+        assert set(event['args']) == {
+            'cpu_time', 'peak_memory', 'input_nodes', 'output_nodes'
+        }
@@ -0,0 +1,125 @@
+import pytest
+
+from llvm_lang.compiler import compiler
+from llvm_lang.jit import JIT
+from llvm_lang.session import CompilerSession
+
+SOURCE = '''
+struct Point {
+    x: int64
+    y: float64
+}
+
+enum Color {
+    Red
+    Green
+}
+
+let counter: int64 = 0;
+let bumped: int64 = bump();
+
+function bump(): int64 {
+    counter = counter + 1;
+    return counter;
+}
+
+function get(): int64 {
+    return counter;
+}
+
+function add(a: int64, b: int64): int64 {
+    return a + b;
+}
+
+function half(f: float32): float32 {
+    return f / 2.0;
+}
+
+function wrapped(x: uint8): uint8 {
+    return x + 1;
+}
+
+function moved(p: Point): Point {
+    p.x = p.x + 1;
+    return p;
+}
+
+function second(s: uint8[]): uint8 {
+    return s[1];
+}
+
+function reset(a: uint8[3]): uint8[3] {
+    a[0] = 9;
+    return a;
+}
+
+function pair(t: (int32, bool)): (int32, bool) {
+    return t;
+}
+
+function same(c: Color): Color {
+    return c;
+}
+
+function nothing(): void {
+}
+'''
+
+
+@pytest.fixture(scope='module')
+def program():
+    return JIT().load(compiler.compile(SOURCE))
+
+
+def test_scalars(program):
+    assert program['add'](2, 3) == 5
+    assert program['half'](3.0) == 1.5
+    assert program['wrapped'](255) == 0
+    assert program['same'](1) == 1
+    assert program['nothing']() is None
+
+
+def test_aggregates(program):
+    assert program['moved']((1, 2.5)) == (2, 2.5)
+    assert program['second'](b'abc') == ord('b')
+    assert program['reset']((1, 2, 3)) == (9, 2, 3)
+    assert program['pair']((5, True)) == (5, True)
+
+
+def test_globals_are_initialized(program):
+    # bump ran once, to initialize bumped
+    assert program['get']() == 1
+
+
+def test_argument_count(program):
+    with pytest.raises(TypeError):
+        program['add'](1)
+
+
+def test_programs_are_cached():
+    jit = JIT()
+    program = jit.load(compiler.compile(SOURCE))
+    assert jit.load(compiler.compile(SOURCE)) is program
+    assert jit.load(
+        compiler.compile(SOURCE + '''
+function more(): void {
+}
+''')) is not program
+
+
+def test_prelude_is_linked():
+    session = CompilerSession('''
+let base: int64 = twice(5);
+
+function twice(x: int64): int64 {
+    return x * 2;
+}
+''')
+    program = JIT().load(
+        session.compile('''
+function main(x: int64): int64 {
+    return twice(x) + base;
+}
+'''))
+    assert program['main'](3) == 16
+    assert program['twice'](4) == 8
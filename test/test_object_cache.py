@@ -0,0 +1,61 @@
+import os
+
+from llvm_lang.compiler import Compiler, compiler, passes
+from llvm_lang.jit import JIT
+from llvm_lang.object_cache import ObjectCache
+from llvm_lang.passes.optimize_ir import OptimizationOptions, target_machine
+
+SOURCE = '''
+let counter: int64 = 0;
+let bumped: int64 = bump();
+
+function bump(): int64 {
+    counter = counter + 1;
+    return counter;
+}
+
+function get(): int64 {
+    return counter;
+}
+'''
+
+
+def test_object_files_are_reused(tmp_path):
+    ctx = compiler.compile(SOURCE)
+    cold = ObjectCache(str(tmp_path))
+    assert JIT(cold).load(ctx)['get']() == 1
+    # the program and the wrappers that call it from Python
+    assert (cold.hits, cold.misses) == (0, 2)
+    assert len(os.listdir(tmp_path)) == 2
+
+    warm = ObjectCache(str(tmp_path))
+    program = JIT(warm).load(ctx)
+    assert (warm.hits, warm.misses) == (2, 0)
+    # the static constructors still run
+    assert program['get']() == 1
+    assert program['bump']() == 2
+
+
+def test_optimization_level_is_part_of_the_key(tmp_path):
+    cache = ObjectCache(str(tmp_path))
+    for level in ('O0', 'O2'):
+        JIT(cache).load(
+            Compiler(passes=passes,
+                     optimization=OptimizationOptions(level)).compile(SOURCE))
+    assert cache.hits == 0
+
+    machine = target_machine()
+    assert cache.key('', machine, 0) != cache.key('', machine, 2)
+
+
+def test_least_recently_used_are_evicted(tmp_path):
+    cache = ObjectCache(str(tmp_path), max_size=25)
+    for i, key in enumerate('abc'):
+        cache.store(key, b'x' * 10)
+        os.utime(cache.path(key), (i, i))
+    # c pushed the cache over its limit when it was added
+    assert sorted(os.listdir(tmp_path)) == ['b.o', 'c.o']
+
+    cache.load('b')
+    cache.store('d', b'x' * 10)
+    assert sorted(os.listdir(tmp_path)) == ['b.o', 'd.o']
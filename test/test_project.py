@@ -0,0 +1,76 @@
+import pytest
+
+from llvm_lang import ast, errors, types
+from llvm_lang.ast.iter import walk
+from llvm_lang.project import compile_project
+
+SOURCES = {
+    'point.ll': '''
+struct Point {
+    x: int64
+    y: int64
+}
+
+function norm(p: Point): int64 {
+    return p.x * p.x + p.y * p.y;
+}
+''',
+    'main.ll': '''
+function main(p: Point): int64 {
+    let n: int64 = norm(p);
+    return n + helper(3);
+}
+''',
+    'helper.ll': '''
+function helper(a: int64): int64 {
+    return a + 1;
+}
+''',
+}
+
+
+@pytest.mark.parametrize('workers', [1, 2])
+def test_cross_file_references(workers):
+    ctx = compile_project(SOURCES, workers=workers)
+
+    assert set(ctx.files) == set(SOURCES)
+    assert ctx.declared_in == {
+        'Point': 'point.ll',
+        'norm': 'point.ll',
+        'main': 'main.ll',
+        'helper': 'helper.ll',
+    }
+    assert isinstance(ctx.declared_types['Point'], types.StructType)
+
+    for file in ctx.files.values():
+        for node in walk(file.ast_root):
+            if isinstance(node, (ast.CallExpression, ast.BinaryOperation)):
+                assert id(node) in file.expression_types
+
+
+def test_cross_file_type_errors():
+    sources = dict(SOURCES)
+    sources['main.ll'] = '''
+function main(p: Point): int64 {
+    return helper(p);
+}
+'''
+    with pytest.raises(errors.TypeError):
+        compile_project(sources, workers=1)
+
+
+def test_redeclaration_across_files():
+    sources = dict(SOURCES)
+    sources['other.ll'] = '''
+function helper(): int64 {
+    return 0;
+}
+'''
+    with pytest.raises(errors.TypeError, match='helper'):
+        compile_project(sources, workers=1)
+
+
+def test_empty_project():
+    ctx = compile_project({})
+    assert ctx.files == {}
+    assert ctx.declared_types == types.primitive_types
@@ -0,0 +1,55 @@
+import pytest
+
+from llvm_lang import errors
+from llvm_lang.scopes import Scopes
+
+
+def test_resolve_binding():
+    scopes = Scopes([("a", 1), ("b", 2)])
+    assert scopes.resolve_binding("a") == 1
+    assert scopes.has_binding("b")
+    assert not scopes.has_binding("c")
+
+    with pytest.raises(errors.ReferenceError):
+        scopes.resolve_binding("c")
+
+
+def test_shadowing():
+    scopes = Scopes([("a", 1)])
+
+    with scopes.new_scope():
+        scopes.add_binding("a", 2)
+        scopes.add_binding("b", 3)
+        assert scopes.resolve_binding("a") == 2
+
+        with scopes.new_scope():
+            assert scopes.depth == 2
+            assert scopes.resolve_binding("b") == 3
+
+    assert scopes.resolve_binding("a") == 1
+    assert not scopes.has_binding("b")
+    assert scopes.depth == 0
+
+
+def test_redeclaration():
+    scopes = Scopes([("a", 1)])
+
+    with pytest.raises(errors.SyntaxError):
+        scopes.add_binding("a", 2)
+
+    with scopes.new_scope():
+        scopes.add_binding("a", 2)
+        with pytest.raises(errors.SyntaxError):
+            scopes.add_binding("a", 3)
+
+
+def test_new_scope_pops_on_error():
+    scopes = Scopes()
+
+    with pytest.raises(errors.ReferenceError):
+        with scopes.new_scope():
+            scopes.add_binding("a", 1)
+            scopes.resolve_binding("b")
+
+    assert scopes.depth == 0
+    assert not scopes.has_binding("a")
@@ -0,0 +1,97 @@
+import asyncio
+import os
+import threading
+
+import pytest
+
+from llvm_lang.client import Client
+from llvm_lang.protocol import HEADER, ProtocolError, decode_length
+from llvm_lang.server import CompileServer
+
+SOURCE = '''
+function double(a: int64): int64 {
+    return a + a;
+}
+'''
+
+
+@pytest.fixture(scope='module')
+def socket_path(tmp_path_factory):
+    path = str(tmp_path_factory.mktemp('server') / 'server.sock')
+    loop = asyncio.new_event_loop()
+    stop = asyncio.Event()
+    thread = threading.Thread(target=loop.run_until_complete,
+                              args=(CompileServer(path,
+                                                  workers=1).serve(stop), ))
+    thread.start()
+    while not os.path.exists(path):
+        assert thread.is_alive()
+        thread.join(0.01)
+    yield path
+    loop.call_soon_threadsafe(stop.set)
+    thread.join()
+    loop.close()
+    assert not os.path.exists(path)
+
+
+def test_compile(socket_path):
+    with Client(socket_path) as client:
+        assert client.compile(SOURCE) == {
+            'ok': True,
+            'declarations': ['double']
+        }
+        # connections can be reused
+        assert client.compile(SOURCE)['ok']
+
+
+def test_errors(socket_path):
+    with Client(socket_path) as client:
+        response = client.compile(SOURCE.replace('a + a', 'b'))
+    assert response == {
+        'ok': False,
+        'error': {
+            'type': 'ReferenceError',
+            'message': 'Unbound identifier b',
+        },
+    }
+
+
+def test_incremental(socket_path, tmp_path):
+    with Client(socket_path) as client:
+        response = client.compile(SOURCE, cache_dir=str(tmp_path))
+        assert response['rechecked'] == ['double']
+        response = client.compile(SOURCE, cache_dir=str(tmp_path))
+        assert response['rechecked'] == []
+
+
+def test_invalid_request(socket_path):
+    with Client(socket_path) as client:
+        response = client.request({'source': 1})
+        assert response['error']['type'] == 'ProtocolError'
+        # the connection is still usable after a well-formed bad request
+        assert client.compile(SOURCE)['ok']
+
+
+def test_invalid_frame(socket_path):
+    with Client(socket_path) as client:
+        client.socket.sendall(HEADER.pack(3) + b'[1]')
+        length = decode_length(client.receive_exactly(HEADER.size))
+        assert b'ProtocolError' in client.receive_exactly(length)
+
+
+def test_frame_too_large():
+    with pytest.raises(ProtocolError):
+        decode_length(HEADER.pack(2**32 - 1))
+
+
+def test_entry_points(socket_path):
+    source = SOURCE + 'function unused(): int64 { return 0; }\n'
+    with Client(socket_path) as client:
+        response = client.compile(source,
+                                  entry_points=['double'],
+                                  warn_unreachable=True)
+    assert response == {
+        'ok': True,
+        'declarations': ['double'],
+        'warnings': ['unused is never used'],
+    }
@@ -0,0 +1,77 @@
+import pytest
+
+from llvm_lang import ast, errors
+from llvm_lang.ast.iter import walk
+from llvm_lang.compiler import compiler
+from llvm_lang.session import CompilerSession
+
+PRELUDE = '''
+struct Point {
+    x: int64
+    y: int64
+}
+
+let origin: int64 = 5;
+
+function norm(p: Point): int64 {
+    return p.x * p.x + p.y * p.y - origin;
+}
+
+function twice(a: int64): int64 {
+    return a + a;
+}
+'''
+
+PROGRAM = '''
+struct Line {
+    from: Point
+    to: Point
+}
+
+function main(l: Line): int64 {
+    let n: int64 = norm(l.from) + norm(l.to);
+    return twice(n) - origin;
+}
+'''
+
+
+@pytest.fixture(scope='module')
+def session():
+    return CompilerSession(PRELUDE)
+
+
+def typed(ctx):
+    return [
+        str(ctx.expression_types[id(node)]) for node in walk(ctx.ast_root) if
+        isinstance(node, ast.Expression) and id(node) in ctx.expression_types
+    ]
+
+
+def test_same_types_as_compiling_together(session):
+    ctx = session.compile(PROGRAM)
+    assert [node.name for node in ctx.ast_root] == ['Line', 'main']
+    assert 'norm' in ctx.declared_types and 'Line' in ctx.declared_types
+
+    together = compiler.compile(PRELUDE + PROGRAM)
+    main, = (node for node in together.ast_root if node.name == 'main')
+    together.ast_root = ast.Program([main])
+    assert typed(ctx) == typed(together)
+
+
+def test_programs_are_independent(session):
+    session.compile(PROGRAM)
+    # a second program can declare the same names as the first
+    session.compile(PROGRAM.replace('twice(n)', 'n'))
+    assert 'Line' not in session.prelude.declared_types
+    assert not session.prelude.value_bindings.has_binding('main')
+
+
+@pytest.mark.parametrize('source, error', [
+    ('function twice(): int64 { return 1; }', errors.TypeError),
+    ('struct Point { x: int64 }', errors.TypeError),
+    ('let origin: int64 = 1;', errors.SyntaxError),
+    ('function main(): int64 { return missing; }', errors.ReferenceError),
+])
+def test_errors(session, source, error):
+    with pytest.raises(error):
+        session.compile(source)
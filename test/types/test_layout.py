@@ -0,0 +1,179 @@
+import pytest
+
+from llvm_lang import types, errors
+from llvm_lang.types import primitive_types as p
+from llvm_lang.types.layout import DataLayout, LayoutEngine
+
+
+def test_primitive_layouts():
+    engine = LayoutEngine()
+
+    for size in types.IntType.VALID_SIZES:
+        layout = engine.layout(types.IntType(size))
+        assert layout.size == size // 8
+        assert layout.align == size // 8
+
+    assert engine.size_of(p['float32']) == 4
+    assert engine.size_of(p['float64']) == 8
+    assert engine.size_of(p['bool']) == 1
+    assert engine.size_of(p['symbol']) == 8
+    assert engine.size_of(p['void']) == 0
+    assert engine.size_of(types.EnumType("E", ("A", "B", "C"))) == 1
+
+
+def test_struct_layout():
+    engine = LayoutEngine()
+    typ = types.StructType("S",
+                           fields=(("a", p['bool']), ("b", p['int64']),
+                                   ("c", p['uint8']), ("d", p['int32'])))
+
+    layout = engine.layout(typ)
+    assert layout.offsets == (0, 8, 16, 20)
+    assert (layout.size, layout.align) == (24, 8)
+    assert engine.field_offset(typ, "d") == 20
+
+    with pytest.raises(errors.TypeError):
+        engine.field_offset(typ, "e")
+
+
+def test_struct_layout_reordered():
+    engine = LayoutEngine(reorder_fields=True)
+    typ = types.StructType("S",
+                           fields=(("a", p['bool']), ("b", p['int64']),
+                                   ("c", p['uint8']), ("d", p['int32'])))
+
+    layout = engine.layout(typ)
+    assert layout.size == 16
+    assert layout.memory_order == (1, 3, 0, 2)
+    assert layout.offsets == (12, 0, 13, 8)
+
+
+def test_aggregate_layouts():
+    engine = LayoutEngine()
+    pair = types.TupleType((p['int64'], p['bool']))
+
+    assert engine.size_of(pair) == 16
+    assert engine.size_of(types.TupleType()) == 0
+    assert engine.layout(types.ArrayType(3, pair)).offsets == (0, 16, 32)
+
+    slice_layout = engine.layout(types.SliceType(p['uint8']))
+    assert slice_layout.offsets == (0, 8)
+    assert slice_layout.size == 16
+
+    newtype = types.NewType(name="string",
+                            inner_type=types.SliceType(p['uint8']))
+    assert engine.layout(newtype) == slice_layout
+
+
+def test_union_layout():
+    engine = LayoutEngine()
+    typ = types.UnionType("Token",
+                          variants=(
+                              ("EOF", types.TupleType()),
+                              ("String",
+                               types.TupleType(
+                                   (types.SliceType(p['uint8']), ))),
+                              ("Integer", types.TupleType((p['int32'], ))),
+                          ))
+
+    layout = engine.layout(typ)
+    assert (layout.size, layout.align) == (24, 8)
+    assert layout.tag_size == 1
+    assert layout.payload_size == 23
+    assert [v.offsets for v in layout.variants] == [(), (8, ), (4, )]
+
+
+def test_unresolved_layout():
+    with pytest.raises(errors.TypeError):
+        LayoutEngine().layout(types.TypeRef("T", ()))
+
+
+def test_layout_is_cached():
+    engine = LayoutEngine()
+    typ = types.StructType("S", fields=(("a", p['int64']), ))
+    assert engine.layout(typ) is engine.layout(
+        types.StructType("S", fields=(("a", p['int64']), )))
+
+
+def test_data_layout_from_string():
+    data_layout = DataLayout.from_string("e-m:e-p:32:32-i64:32-f64:32-n32")
+    assert data_layout.pointer_size == 4
+    assert data_layout.int_align(64) == 4
+
+    engine = LayoutEngine(data_layout)
+    assert engine.size_of(types.TupleType((p['bool'], p['int64']))) == 12
+    assert engine.size_of(types.SliceType(p['uint8'])) == 8
+
+
+def option(typ):
+    return types.UnionType("Option",
+                           variants=(("Some", types.TupleType(
+                               (typ, ))), ("None", types.TupleType())))
+
+
+def result(ok, err):
+    return types.UnionType("Result",
+                           variants=(("Ok", types.TupleType(
+                               (ok, ))), ("Err", types.TupleType((err, )))))
+
+
+def test_niche_filled_option_layouts():
+    engine = LayoutEngine()
+    enum = types.EnumType("Ordering", ("Less", "Equal", "Greater"))
+    pair = types.TupleType((p['int64'], p['bool']))
+
+    assert engine.size_of(option(p['bool'])) == 1
+    assert engine.size_of(option(option(p['bool']))) == 1
+    assert engine.size_of(option(option(option(enum)))) == 1
+    assert engine.size_of(option(pair)) == 16
+    assert engine.size_of(option(p['int64'])) == 16, "int64 has no niche"
+    assert engine.size_of(types.ArrayType(1000, option(pair))) == 16000
+
+    layout = engine.layout(option(pair))
+    assert (layout.niche_variant, layout.tag_offset, layout.tag_size) == \
+        (0, 8, 1)
+    assert layout.tag_value(0) is None
+    assert layout.tag_value(1) == 2
+    assert layout.variant_of(2) == 1
+    assert layout.variant_of(1) == 0
+    assert layout.variant_of(0) == 0
+
+
+def test_niche_filled_result_layouts():
+    engine = LayoutEngine()
+    pair = types.TupleType((p['int64'], p['bool']))
+
+    assert engine.size_of(result(p['int64'], p['int32'])) == 16
+    assert engine.size_of(result(p['int64'], p['bool'])) == 16
+
+    layout = engine.layout(result(pair, p['int32']))
+    assert layout.size == 16, "Err fits in front of the bool niche"
+    assert layout.variants[1].offsets == (0, )
+
+    layout = engine.layout(result(pair, p['bool']))
+    assert layout.size == 16
+    assert layout.variants[1].offsets == (0, )
+
+
+def test_nested_unions_share_tag_space():
+    engine = LayoutEngine()
+    inner = result(p['int64'], p['int32'])
+    outer = types.UnionType("Outer",
+                            variants=(("Inner", types.TupleType(
+                                (inner, ))), ("A", types.TupleType()),
+                                      ("B", types.TupleType())))
+
+    layout = engine.layout(outer)
+    assert layout.size == engine.size_of(inner) == 16
+    assert layout.tag_offset == 0
+    assert [layout.tag_value(i) for i in range(3)] == [None, 2, 3]
+    assert layout.niche.end == 3
+
+
+def test_niche_filling_disabled():
+    engine = LayoutEngine(niche_filling=False)
+    pair = types.TupleType((p['int64'], p['bool']))
+
+    assert engine.size_of(option(p['bool'])) == 2
+    assert engine.size_of(option(pair)) == 24
+    assert engine.layout(option(pair)).niche_variant is None
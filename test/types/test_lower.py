@@ -0,0 +1,82 @@
+import pytest
+from llvmlite import ir
+
+from llvm_lang import errors, types
+from llvm_lang.types import primitive_types as p
+from llvm_lang.types.lower import TypeLowering, mangle
+
+
+def lowered(ty) -> str:
+    return str(TypeLowering(ir.Context()).lower(ty))
+
+
+def test_primitive_types():
+    assert lowered(p['int8']) == 'i8'
+    assert lowered(p['uint128']) == 'i128'
+    assert lowered(p['float32']) == 'float'
+    assert lowered(p['float64']) == 'double'
+    assert lowered(p['bool']) == 'i1'
+    assert lowered(p['symbol']) == 'i64'
+    assert lowered(p['void']) == 'void'
+
+
+def test_aggregates():
+    assert lowered(types.TupleType(
+        (p['int32'], p['float32']))) == '{i32, float}'
+    assert lowered(types.ArrayType(length=3,
+                                   element_type=p['uint8'])) == '[3 x i8]'
+    assert lowered(types.SliceType(p['int64'])) == '{i32, i64*}'
+    assert lowered(
+        types.FunctionType(name='f',
+                           return_type=p['void'],
+                           parameters=(('x', p['int64']), ))) == 'void (i64)*'
+    assert lowered(types.NewType(name='Meters',
+                                 inner_type=p['float64'])) == 'double'
+
+
+def test_recursive_struct():
+    lowering = TypeLowering(ir.Context())
+    # the inner Node is never lowered past its name, so its unresolved
+    # reference to itself is fine
+    node = types.StructType(name='Node',
+                            fields=(('value', p['int64']),
+                                    ('children',
+                                     types.SliceType(types.TypeRef('Node',
+                                                                   ())))))
+    node = types.StructType(name='Node',
+                            fields=(('value', p['int64']),
+                                    ('children', types.SliceType(node))))
+    struct = lowering.lower(node)
+    assert str(struct) == '%"struct.Node"'
+    assert [str(e)
+            for e in struct.elements] == ['i64', '{i32, %"struct.Node"*}']
+
+
+def box(ty):
+    return types.StructType(name='Box',
+                            fields=(('value', ty), ),
+                            type_arguments=(ty, ))
+
+
+def test_mangle():
+    assert mangle(p['int64']) == 'i64'
+    assert mangle(p['uint8']) == 'u8'
+    assert mangle(box(p['float64'])) == '3BoxIf64E'
+    assert mangle(types.TupleType((p['bool'], p['symbol']))) == 'TbyE'
+    assert mangle(types.ArrayType(length=2,
+                                  element_type=p['int32'])) == 'A2_i32'
+    assert mangle(types.SliceType(p['uint8'])) == 'Su8'
+    with pytest.raises(errors.TypeError):
+        mangle(types.TypeRef('T', ()))
+
+
+def test_generic_instances_are_lowered_once():
+    lowering = TypeLowering(ir.Context())
+    struct = lowering.lower(box(p['int64']))
+    assert str(struct) == '%"struct.Box.i64"'
+    assert lowering.lower(box(p['int64'])) is struct
+    assert str(lowering.lower(box(box(
+        p['int64'])))) == '%"struct.Box.3BoxIi64E"'
+    assert list(lowering.context.identified_types) == [
+        'struct.Box.i64', 'struct.Box.3BoxIi64E'
+    ]
@@ -0,0 +1,70 @@
+from llvm_lang import types
+from llvm_lang.types import primitive_types as p
+from llvm_lang.types.table import Kind, TypeTable, TypeTableMapping
+from llvm_lang.types.verify import verify_types
+
+T = types.TypeVariable("T")
+
+EXAMPLES = (
+    *types.primitive_types.values(),
+    types.EnumType("Color", ("Red", "Green")),
+    types.TypeVariable("T"),
+    types.TypeRef("Box", (p['int8'], )),
+    types.NewType(name="string", inner_type=types.SliceType(p['uint8'])),
+    types.UnionType("Option",
+                    variants=(("Some", types.TupleType(
+                        (T, ))), ("None", types.TupleType())),
+                    type_parameters=(T, )),
+    types.StructType("Box",
+                     fields=(("value", T), ),
+                     type_parameters=(T, ),
+                     type_arguments=(p['int32'], )),
+    types.TupleType((p['int8'], p['float32'])),
+    types.ArrayType(3, p['bool']),
+    types.FunctionType(name="main",
+                       return_type=p['void'],
+                       parameters=(("argc", p['int32']), )),
+)
+
+
+def test_round_trip():
+    table = TypeTable()
+    for typ in EXAMPLES:
+        type_id = table.intern(typ)
+        assert table.get(type_id) == typ
+        assert type(table.get(type_id)) is type(typ)
+
+
+def test_structural_identity():
+    table = TypeTable()
+    a = table.intern(types.TupleType((p['int8'], types.ArrayType(2, T))))
+    b = table.intern(types.TupleType((p['int8'], types.ArrayType(2, T))))
+    c = table.intern(types.TupleType((p['int8'], types.ArrayType(3, T))))
+
+    assert a == b
+    assert a != c
+    assert table.kind(a) == Kind.TUPLE
+    assert len(table) == 6, "shared children are only stored once"
+
+
+def test_serialization():
+    table = TypeTable()
+    ids = [table.intern(typ) for typ in EXAMPLES]
+
+    loaded = TypeTable.from_bytes(table.to_bytes())
+    assert [loaded.get(type_id) for type_id in ids] == list(EXAMPLES)
+    assert [loaded.intern(typ) for typ in EXAMPLES] == ids
+    assert len(loaded) == len(table)
+
+
+def test_mapping():
+    declared_types = types.primitive_types.copy()
+    declared_types["Point"] = types.StructType(
+        "Point", fields=(("x", types.TypeRef("int64", ())), ))
+
+    table = TypeTable()
+    mapping = TypeTableMapping(table, table.intern_all(declared_types))
+
+    assert dict(mapping) == declared_types
+    assert mapping["Point"] is mapping["Point"]
+    assert verify_types(mapping) is None
@@ -1,7 +1,8 @@
 import pytest
 
 from llvm_lang import types, errors
-from llvm_lang.types.verify import verify, verify_no_duplicate
+from llvm_lang.types.verify import (DeclaredTypesVerifier, verify,
+                                    verify_no_duplicate, verify_types)
 
 
 def test_inttype_verify():
@@ -41,6 +42,7 @@ def test_verify_no_duplicate():
         ], "%s")
 
     assert verify_no_duplicate([1, 2, 3], "%s") is None
+    assert verify_no_duplicate([], "%s") is None
 
 
 def test_enumtype_verify():
@@ -146,3 +148,52 @@ def test_functiontemplate_verify():
 
     with pytest.raises(errors.TypeError):
         verify(typ)
+
+
+def test_verify_types():
+    declared_types = types.primitive_types.copy()
+    declared_types["Point"] = types.StructType(
+        "Point",
+        fields=(("x", types.TypeRef("int64",
+                                    ())), ("y", types.TypeRef("int64", ()))))
+    declared_types["Box"] = types.StructType(
+        "Box",
+        type_parameters=(types.TypeVariable("T"), ),
+        fields=(("value", types.TypeRef("T", ())), ))
+    declared_types["Line"] = types.StructType(
+        "Line",
+        fields=(("start", types.TypeRef("Point", ())),
+                ("end", types.TypeRef("Box", (types.TypeRef("Point", ()), )))))
+
+    assert verify_types(declared_types) is None, \
+        "References to declared types and bound type variables are ok"
+
+    declared_types["Broken"] = types.StructType(
+        "Broken", fields=(("a", types.TypeRef("Missing", ())), ))
+    with pytest.raises(errors.ReferenceError):
+        verify_types(declared_types)
+
+    declared_types["Broken"] = types.StructType(
+        "Broken", fields=(("a", types.TypeRef("T", ())), ))
+    with pytest.raises(errors.ReferenceError):
+        verify_types(declared_types)
+
+    declared_types["Broken"] = types.StructType(
+        "Broken", fields=(("a", types.TypeRef("Box", ())), ))
+    with pytest.raises(errors.TypeError):
+        verify_types(declared_types)
+
+
+def test_verify_types_shared_subtypes():
+    shared = types.TupleType((types.IntType(8), types.FloatType(64)))
+    declared_types = {
+        "A": types.StructType("A", fields=(("a", shared), )),
+        "B": types.StructType("B", fields=(("b", shared), ("c", shared))),
+    }
+
+    verifier = DeclaredTypesVerifier(declared_types)
+    verifier.verify_all()
+
+    verified = [ty for _cls, ty, _type_variables in verifier.verified]
+    assert verified.count(shared) == 1, "Shared types are verified once"
+    assert verified.count(types.IntType(8)) == 1